@@ -1,34 +1,109 @@
+import asyncio
+import logging
+import time
+import uuid
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, END
 from typing import Literal, TypedDict, Annotated
-from tools import rag_search_tool, web_search_tool
+from tools import web_search_tool, web_search_fanout, search_knowledge_base
 from schemas import RouteDecision, RagJudge
-from llms import LLMModel
-
-memory=MemorySaver()
+from llms import LLMModel, create_chat_model
+from cascade import ModelCascade, build_cascade
+from fast_router import FastRouter
+from speculation import SpeculativeRetrieval
+from sufficiency import SufficiencyPolicy, SufficiencyDecision
+from checkpointer import BoundedSQLiteSaver
+from chunking import citation_label
+from context_packing import PackedContext, pack_context, parse_budgets, remove_overlaps, split_web_results
+from vectorstore import get_embedding
+from lazy import LazyComponent
+from resilience import guard_model, parse_deadlines
+from metrics import JUDGE_VERDICTS, RETRIEVALS, RETRIEVAL_DURATION, ROUTES
+from config import (DEFAULT_NAMESPACE, FAST_ROUTER_ENABLED, FAST_ROUTER_MIN_SIMILARITY,
+                    FAST_ROUTER_MIN_MARGIN, SPECULATIVE_RETRIEVAL, SPECULATIVE_WEB_SEARCH,
+                    RAG_SUFFICIENT_SCORE, RAG_INSUFFICIENT_SCORE, CHECKPOINT_DB_PATH,
+                    CHECKPOINT_MAX_THREADS, CHECKPOINT_THREAD_TTL_SECONDS, CHECKPOINT_MAX_PER_THREAD,
+                    CHECKPOINT_HOT_CACHE_SIZE, CONTEXT_TOKEN_BUDGETS, CONTEXT_TOKEN_BUDGET_DEFAULT,
+                    CASCADE_ENABLED, JUDGE_CASCADE, ANSWER_CASCADE, JUDGE_CASCADE_MIN_CONFIDENCE,
+                    JUDGE_DEFAULT_CONFIDENCE, CASCADE_SMALL_TIER_MAX_TOKENS, LATENCY_SLO_SECONDS,
+                    LATENCY_SLO_PERCENTILE, LATENCY_SLO_PROBE_RATIO)
+
+memory=BoundedSQLiteSaver(
+    CHECKPOINT_DB_PATH,
+    max_threads=CHECKPOINT_MAX_THREADS,
+    thread_ttl_seconds=CHECKPOINT_THREAD_TTL_SECONDS,
+    max_checkpoints_per_thread=CHECKPOINT_MAX_PER_THREAD,
+    hot_cache_size=CHECKPOINT_HOT_CACHE_SIZE,
+)
+
+logger=logging.getLogger(__name__)
+
+llm_models=LazyComponent("llms", LLMModel)
 
 class AgentState(TypedDict, total=False):
     messages: Annotated[list[BaseMessage], add_messages]
     route: Literal["rag", "web", "answer", "end"]
     rag: str
+    rag_passages: list[str]
     web: str
     web_search_enabled: bool
+    initial_router_decision: str
+    router_override_reason: str
+    router_source: Literal["fast_path", "llm"]
+    router_confidence: float
+    speculation: dict
+    # Identifies this run's speculative lookups in AxonBotAgent.speculation.
+    speculation_key: str | None
+    sufficiency: dict
+    model_tier: dict
+
+def get_namespace(config: RunnableConfig) -> str:
+    return config.get("configurable", {}).get("namespace", DEFAULT_NAMESPACE)
+
+def latest_user_query(state: AgentState) -> str:
+    return next((m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), "")
 
 class AxonBotAgent:
     def __init__(self):
-        llm_models=LLMModel()
-        self.router_llm=llm_models.get_router_model()
-        self.judge_llm=llm_models.get_judge_model()
-        self.answer_llm=llm_models.get_answer_model()
-
-    def router_node(self,state: AgentState,config : RunnableConfig):
-        print("\n--- Entering router_node ---")
-        query = next((m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), "")
-        web_search_enabled = config.get("configurable", {}).get("web_search_enabled", True)
+        models=llm_models.get()
+        self.router_llm=guard_model(models.get_router_model(),models.router_provider,"router")
+        slos=parse_deadlines(LATENCY_SLO_SECONDS)
+        self.judge_cascade=build_cascade(
+            "judge",JUDGE_CASCADE if CASCADE_ENABLED else "",
+            models.judge_provider,models.judge_model_name,models.get_judge_model(),
+            lambda provider,model_name: create_chat_model(provider,model_name,0).with_structured_output(RagJudge),
+            slo_seconds=slos.get("judge"),slo_percentile=LATENCY_SLO_PERCENTILE,probe_ratio=LATENCY_SLO_PROBE_RATIO
+        )
+        self.answer_cascade=build_cascade(
+            "answer",ANSWER_CASCADE if CASCADE_ENABLED else "",
+            models.answer_provider,models.answer_model_name,models.get_answer_model(),
+            lambda provider,model_name: create_chat_model(provider,model_name,0.5),
+            slo_seconds=slos.get("answer"),slo_percentile=LATENCY_SLO_PERCENTILE,probe_ratio=LATENCY_SLO_PROBE_RATIO
+        )
+        # Context is packed for the largest tier; smaller tiers are skipped when it exceeds what they handle well.
+        budgets=parse_budgets(CONTEXT_TOKEN_BUDGETS)
+        self.judge_context_tokens=budgets.get(self.judge_cascade.largest_model_name,CONTEXT_TOKEN_BUDGET_DEFAULT)
+        self.answer_context_tokens=budgets.get(self.answer_cascade.largest_model_name,CONTEXT_TOKEN_BUDGET_DEFAULT)
+        self.small_tier_max_tokens=parse_budgets(CASCADE_SMALL_TIER_MAX_TOKENS)
+        for cascade,packed_tokens in ((self.judge_cascade,self.judge_context_tokens),(self.answer_cascade,self.answer_context_tokens)):
+            limit=self.small_tier_max_tokens.get(cascade.role)
+            if cascade.size > 1 and limit is not None and limit >= packed_tokens:
+                logger.warning("CASCADE_SMALL_TIER_MAX_TOKENS for %s (%d) is not below its %d-token context budget, "
+                               "so the small tier is never skipped for long contexts", cascade.role, limit, packed_tokens)
+        self.fast_router=FastRouter(
+            get_embedding(),
+            min_similarity=FAST_ROUTER_MIN_SIMILARITY,
+            min_margin=FAST_ROUTER_MIN_MARGIN
+        ) if FAST_ROUTER_ENABLED else None
+        self.speculation=SpeculativeRetrieval()
+        self.sufficiency_policy=SufficiencyPolicy(
+            sufficient_score=RAG_SUFFICIENT_SCORE,
+            insufficient_score=RAG_INSUFFICIENT_SCORE
+        )
 
+    def _router_messages(self,query: str,web_search_enabled: bool):
         system_prompt = (
         "You are an intelligent routing agent designed to direct user queries to the most appropriate tool."
         "Your primary goal is to provide accurate and relevant information by selecting the best source."
@@ -64,25 +139,27 @@ class AxonBotAgent:
             "\n- User: 'Hello there!' -> Route: 'end', reply='Hello! How can I assist you today?'"
         )
 
-        messages = [
+        return [
             ("system", system_prompt),
             ("user", query)
         ]
-        result: RouteDecision = self.router_llm.invoke(messages)
 
+    def _router_output(self,result: RouteDecision,web_search_enabled: bool):
         initial_router_decision = result.route 
         router_override_reason = None
 
         if not web_search_enabled and result.route == "web":
             result.route = "rag" 
             router_override_reason = "Web search disabled by user; redirected to RAG."
-            print(f"Router decision overridden: changed from 'web' to 'rag' because web search is disabled.")
+            logger.info("Router decision overridden: changed from 'web' to 'rag' because web search is disabled.")
 
-        print(f"Router final decision: {result.route}, Reply (if 'end'): {result.reply}")
+        logger.info("Router final decision: %s, Reply (if 'end'): %s", result.route, result.reply)
+        ROUTES.inc(result.route, "llm")
 
         out = {
             "route": result.route,
-            "web_search_enabled": web_search_enabled
+            "web_search_enabled": web_search_enabled,
+            "router_source": "llm"
         }
 
         if router_override_reason: 
@@ -94,26 +171,81 @@ class AxonBotAgent:
 
         return out
 
+    def _fast_route(self,query: str,web_search_enabled: bool):
+        """Local pre-router: returns the node output for a confident decision, else None."""
+        if self.fast_router is None:
+            return None
+        try:
+            decision = self.fast_router.route(query, web_search_enabled)
+        except Exception as e:
+            logger.warning("Fast router failed, falling back to LLM router: %s", e)
+            return None
+        if decision is None:
+            return None
+
+        logger.info("Fast router decision: %s (intent=%s, confidence=%.3f, margin=%.3f)",
+                    decision.route, decision.intent, decision.confidence, decision.margin)
+        ROUTES.inc(decision.route, "fast_path")
+        out = {
+            "route": decision.route,
+            "web_search_enabled": web_search_enabled,
+            "router_source": "fast_path",
+            "router_confidence": round(decision.confidence, 4)
+        }
+        if decision.route == "end":
+            out["messages"] = [AIMessage(content=decision.reply or "Hello!")]
+        return out
 
-    def rag_node(self,state: AgentState,config:RunnableConfig):
-        print("\n--- Entering rag_node ---")
-        query = next((m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), "")
+    def router_node(self,state: AgentState,config : RunnableConfig):
+        logger.debug("Entering router_node")
+        query = latest_user_query(state)
         web_search_enabled = config.get("configurable", {}).get("web_search_enabled", True)
 
-        print(f"RAG query: {query}")
-        chunks = rag_search_tool.invoke(query)
+        fast = self._fast_route(query, web_search_enabled)
+        if fast is not None:
+            return fast
 
-        if chunks.startswith("RAG_ERROR::"):
-            print(f"{chunks}. Checking web search enabled status.")
-            next_route = "web" if web_search_enabled else "answer"
-            return {"rag": "", "route": next_route}
-        
-        if chunks:
-            print(f"Retrieved RAG chunks (first 500 chars): {chunks[:500]}...")
-        else:
-            print("No RAG chunks retrieved.")
+        result: RouteDecision = self.router_llm.invoke(self._router_messages(query, web_search_enabled))
+        return self._router_output(result, web_search_enabled)
+
+    def _start_speculation(self,query: str,config: RunnableConfig,web_search_enabled: bool) -> tuple[str | None, list[str]]:
+        """Opt-in: start retrieval concurrently with routing, since most queries route to RAG."""
+        configurable = config.get("configurable", {})
+        if not configurable.get("speculative_retrieval", SPECULATIVE_RETRIEVAL):
+            return None, []
+
+        lookups = {"rag": asyncio.to_thread(self._retrieve, query, get_namespace(config))}
+        if web_search_enabled and configurable.get("speculative_web_search", SPECULATIVE_WEB_SEARCH):
+            lookups["web"] = web_search_tool.ainvoke(query)
+        key = uuid.uuid4().hex
+        return key, self.speculation.launch(key, query, lookups)
 
-        judge_messages = [
+    async def arouter_node(self,state: AgentState,config : RunnableConfig):
+        logger.debug("Entering router_node (async)")
+        query = latest_user_query(state)
+        web_search_enabled = config.get("configurable", {}).get("web_search_enabled", True)
+        key, launched = self._start_speculation(query, config, web_search_enabled)
+
+        out = await asyncio.to_thread(self._fast_route, query, web_search_enabled)
+        if out is None:
+            result: RouteDecision = await self.router_llm.ainvoke(self._router_messages(query, web_search_enabled))
+            out = self._router_output(result, web_search_enabled)
+
+        out["speculation"] = {"launched": launched} if launched else {}
+        # Always set, so a key left in the checkpoint by an earlier turn is never reused.
+        out["speculation_key"] = key
+        if launched:
+            # RAG results are only useful on the rag route; web results on the
+            # web route or as the fallback after an insufficient RAG verdict.
+            keep = {"rag": ["rag", "web"], "web": ["web"]}.get(out["route"], [])
+            self.speculation.keep_only(key, keep)
+            logger.info("Speculative lookups launched: %s; kept for route '%s': %s",
+                        launched, out["route"], [k for k in launched if k in keep])
+        return out
+
+
+    def _judge_messages(self,query: str,chunks: str):
+        return [
             ("system", (
                 "You are a judge evaluating if the **retrieved information** is **sufficient and relevant** "
                 "to fully and accurately answer the user's question. "
@@ -121,64 +253,207 @@ class AxonBotAgent:
                 "If the information is incomplete, vague, outdated, or doesn't directly answer the question, it's NOT sufficient."
                 "If it provides a clear, direct, and comprehensive answer, it IS sufficient."
                 "If no relevant information was retrieved at all (e.g., 'No results found'), it is definitely NOT sufficient."
-                "\n\nRespond ONLY with a JSON object: {\"sufficient\": true/false}"
-                "\n\nExample 1: Question: 'What is the capital of France?' Retrieved: 'Paris is the capital of France.' -> {\"sufficient\": true}"
-                "\nExample 2: Question: 'What are the symptoms of diabetes?' Retrieved: 'Diabetes is a chronic condition.' -> {\"sufficient\": false} (Doesn't answer symptoms)"
-                "\nExample 3: Question: 'How to fix error X in software Y?' Retrieved: 'No relevant information found.' -> {\"sufficient\": false}"
+                "\n\nRespond ONLY with a JSON object: {\"sufficient\": true/false, \"confidence\": 0.0-1.0}, "
+                "where confidence is how certain you are of the verdict."
+                "\n\nExample 1: Question: 'What is the capital of France?' Retrieved: 'Paris is the capital of France.' -> {\"sufficient\": true, \"confidence\": 0.95}"
+                "\nExample 2: Question: 'What are the symptoms of diabetes?' Retrieved: 'Diabetes is a chronic condition.' -> {\"sufficient\": false, \"confidence\": 0.85} (Doesn't answer symptoms)"
+                "\nExample 3: Question: 'How to fix error X in software Y?' Retrieved: 'No relevant information found.' -> {\"sufficient\": false, \"confidence\": 0.99}"
             )),
             ("user", f"Question: {query}\n\nRetrieved info: {chunks}\n\nIs this sufficient to answer the question?")
         ]
 
-        verdict: RagJudge = self.judge_llm.invoke(judge_messages)
-        print(f"RAG Judge verdict: {verdict.sufficient}")
-        print("--- Exiting rag_node ---")
+    def _rag_error_output(self,chunks: str,web_search_enabled: bool):
+        logger.warning("%s. Checking web search enabled status.", chunks)
+        next_route = "web" if web_search_enabled else "answer"
+        return {"rag": "", "rag_passages": [], "route": next_route}
 
-        if verdict.sufficient:
+    def _rag_output(self,passages: list[str],sufficient: bool,decided_by: str,decision: SufficiencyDecision,web_search_enabled: bool):
+        logger.info("RAG sufficiency verdict: %s (decided by %s; %s)", sufficient, decided_by, decision.reason)
+        JUDGE_VERDICTS.inc("sufficient" if sufficient else "insufficient", decided_by)
+
+        if sufficient:
             next_route = "answer"
         else:
             next_route = "web" if web_search_enabled else "answer" 
-            print(f"RAG not sufficient. Web search enabled: {web_search_enabled}. Next route: {next_route}")
+            logger.info("RAG not sufficient. Web search enabled: %s. Next route: %s", web_search_enabled, next_route)
         
         return {
-            "rag": chunks,
+            "rag": "\n\n".join(passages),
+            "rag_passages": passages,
             "route": next_route,
-            "web_search_enabled": web_search_enabled 
+            "web_search_enabled": web_search_enabled,
+            "sufficiency": {
+                "decided_by": decided_by,
+                "reason": decision.reason,
+                "top_score": round(decision.top_score, 4) if decision.top_score is not None else None
+            }
         }
-        
-        
 
-    def web_node(self,state: AgentState,config:RunnableConfig):
-        print("\n--- Entering web_node ---")
-        query = next((m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), "")
+    def _rag_passages(self,scored_chunks):
+        # Chunks arrive best first, so the text they share through the splitter's
+        # chunk_overlap is kept in the more relevant chunk and trimmed from the other.
+        # Each passage is prefixed with the pages and section it comes from, for citing.
+        passages = remove_overlaps([d.page_content for d, _ in scored_chunks],
+                                   labels=[citation_label(d.metadata) for d, _ in scored_chunks])
+        if passages:
+            logger.info("Retrieved %d RAG chunks, %d passages after overlap removal", len(scored_chunks), len(passages))
+            logger.debug("First passage (first 500 chars): %s...", passages[0][:500])
+        else:
+            logger.info("No RAG chunks retrieved.")
+        return passages
+
+    def _judge_context(self,passages: list[str]) -> PackedContext:
+        packed = pack_context([("rag", passages)], self.judge_context_tokens)
+        logger.debug("Judge context: %d/%d tokens, %d passages dropped, %d truncated",
+                     packed.tokens, self.judge_context_tokens, packed.dropped, packed.truncated)
+        return packed
+
+    def _cascade_start(self,cascade: ModelCascade,context_tokens: int):
+        """(first tier, reason): the small tier is skipped when the context is longer than it handles well."""
+        limit = self.small_tier_max_tokens.get(cascade.role)
+        if cascade.size > 1 and limit is not None and context_tokens > limit:
+            return 1, f"context of {context_tokens} tokens exceeds the small tier's {limit}"
+        return 0, None
+
+    def _judge_needs_escalation(self,verdict: RagJudge):
+        # The small judge's self-check: an unsure verdict goes to the larger model.
+        # A verdict without a confidence counts as JUDGE_DEFAULT_CONFIDENCE.
+        confidence = JUDGE_DEFAULT_CONFIDENCE if verdict.confidence is None else verdict.confidence
+        if confidence < JUDGE_CASCADE_MIN_CONFIDENCE:
+            return f"judge confidence {confidence:.2f} below {JUDGE_CASCADE_MIN_CONFIDENCE:g}"
+        return None
+
+    def _judge_call(self,query: str,passages: list[str]):
+        """The judge messages and the cascade arguments for them."""
+        packed = self._judge_context(passages)
+        start_tier, start_reason = self._cascade_start(self.judge_cascade, packed.tokens)
+        return self._judge_messages(query, packed.render()), {
+            "start_tier": start_tier,
+            "start_reason": start_reason,
+            "needs_escalation": self._judge_needs_escalation
+        }
+
+    def _retrieve(self,query: str,namespace: str):
+        """Returns (scored_chunks, None), or (None, 'RAG_ERROR::...') on failure."""
+        started = time.perf_counter()
+        try:
+            scored_chunks = search_knowledge_base(query, namespace)
+        except Exception as e:
+            RETRIEVALS.inc("kb", "error")
+            return None, f"RAG_ERROR::{e}"
+        finally:
+            RETRIEVAL_DURATION.observe(time.perf_counter() - started, "kb")
+        RETRIEVALS.inc("kb", "hit" if scored_chunks else "empty")
+        return scored_chunks, None
+
+    def rag_node(self,state: AgentState,config:RunnableConfig):
+        logger.debug("Entering rag_node")
+        query = latest_user_query(state)
         web_search_enabled = config.get("configurable", {}).get("web_search_enabled", True)
 
-        if not web_search_enabled:
-            print("Web search node entered but web search is disabled. Skipping actual search.")
-            return {"web": "Web search was disabled by the user.", "route": "answer"}
-        
-        print(f"Web search query: {query}")
-        snippets = web_search_tool.invoke(query)
+        logger.info("RAG query: %s", query)
+        scored_chunks, error = self._retrieve(query, get_namespace(config))
+
+        if error:
+            return self._rag_error_output(error, web_search_enabled)
+        passages = self._rag_passages(scored_chunks)
+
+        decision = self.sufficiency_policy.decide(
+            [score for _, score in scored_chunks],
+            exact_match=any(d.metadata.get("exact_match") for d, _ in scored_chunks)
+        )
+        if decision.sufficient is not None:
+            return self._rag_output(passages, decision.sufficient, "score_policy", decision, web_search_enabled)
+
+        messages, cascade_args = self._judge_call(query, passages)
+        judged = self.judge_cascade.invoke(messages, **cascade_args)
+        verdict: RagJudge = judged.output
+        return {**self._rag_output(passages, verdict.sufficient, "judge_llm", decision, web_search_enabled), "model_tier": judged.tier}
+
+    async def arag_node(self,state: AgentState,config:RunnableConfig):
+        logger.debug("Entering rag_node (async)")
+        query = latest_user_query(state)
+        web_search_enabled = config.get("configurable", {}).get("web_search_enabled", True)
+
+        logger.info("RAG query: %s", query)
+        speculative = self.speculation.take(state.get("speculation_key"), "rag", query)
+        if speculative is not None:
+            scored_chunks, error = await speculative
+            speculation = self.speculation.outcome("rag", hit=True)
+        else:
+            scored_chunks, error = await asyncio.to_thread(self._retrieve, query, get_namespace(config))
+            speculation = {}
+
+        if error:
+            return {**self._rag_error_output(error, web_search_enabled), "speculation": speculation}
+        passages = self._rag_passages(scored_chunks)
+
+        decision = self.sufficiency_policy.decide(
+            [score for _, score in scored_chunks],
+            exact_match=any(d.metadata.get("exact_match") for d, _ in scored_chunks)
+        )
+        if decision.sufficient is not None:
+            return {**self._rag_output(passages, decision.sufficient, "score_policy", decision, web_search_enabled), "speculation": speculation}
 
+        messages, cascade_args = self._judge_call(query, passages)
+        judged = await self.judge_cascade.ainvoke(messages, **cascade_args)
+        verdict: RagJudge = judged.output
+        return {**self._rag_output(passages, verdict.sufficient, "judge_llm", decision, web_search_enabled),
+                "speculation": speculation, "model_tier": judged.tier}
+
+    def _web_output(self,snippets: str):
         if snippets.startswith("WEB_ERROR::"):
-            print(f"{snippets}. Proceeding to answer with limited info.")
+            logger.warning("%s. Proceeding to answer with limited info.", snippets)
             return {"web": "", "route": "answer"}
         
-        print(f"Web snippets retrieved: {snippets[:200]}...")
-        print("--- Exiting web_node ---")
+        logger.debug("Web snippets retrieved: %s...", snippets[:200])
         return {"web": snippets, "route": "answer"}
-    
 
-    def answer_node(self,state: AgentState):
-        print("\n--- Entering answer_node ---")
-        user_q = next((m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), "")
+    def web_node(self,state: AgentState,config:RunnableConfig):
+        logger.debug("Entering web_node")
+        query = latest_user_query(state)
+        web_search_enabled = config.get("configurable", {}).get("web_search_enabled", True)
+
+        if not web_search_enabled:
+            logger.info("Web search node entered but web search is disabled. Skipping actual search.")
+            return {"web": "Web search was disabled by the user.", "route": "answer"}
+        
+        logger.info("Web search query: %s", query)
+        return self._web_output(web_search_tool.invoke(query))
+
+    async def aweb_node(self,state: AgentState,config:RunnableConfig):
+        logger.debug("Entering web_node (async)")
+        query = latest_user_query(state)
+        web_search_enabled = config.get("configurable", {}).get("web_search_enabled", True)
 
-        ctx_parts = []
-        if state.get("rag"):
-            ctx_parts.append("Knowledge Base Information:\n" + state["rag"])
+        if not web_search_enabled:
+            logger.info("Web search node entered but web search is disabled. Skipping actual search.")
+            return {"web": "Web search was disabled by the user.", "route": "answer"}
+        
+        logger.info("Web search query: %s", query)
+        speculative = self.speculation.take(state.get("speculation_key"), "web", query)
+        if speculative is not None:
+            return {**self._web_output(await speculative), "speculation": self.speculation.outcome("web", hit=True)}
+
+        variants = config.get("configurable", {}).get("web_query_variants") or []
+        if variants:
+            logger.info("Web search fan-out over %d query variants", len(variants) + 1)
+            return {**self._web_output(await web_search_fanout([query, *variants])), "speculation": {}}
+        return {**self._web_output(await web_search_tool.ainvoke(query)), "speculation": {}}
+
+    def _answer_prompt(self,state: AgentState) -> tuple[list, int]:
+        """The answer messages and how many tokens of context they carry."""
+        user_q = latest_user_query(state)
+
+        rag_passages = state.get("rag_passages") or ([state["rag"]] if state.get("rag") else [])
+        web_passages = []
         if state.get("web") and not state["web"].startswith("Web search was disabled"):
-            ctx_parts.append("Web Search Results:\n" + state["web"])
+            web_passages = split_web_results(state["web"])
 
-        context = "\n\n".join(ctx_parts)
+        packed = pack_context([("rag", rag_passages), ("web", web_passages)], self.answer_context_tokens)
+        logger.debug("Answer context: %d/%d tokens, %d passages dropped, %d truncated",
+                     packed.tokens, self.answer_context_tokens, packed.dropped, packed.truncated)
+        context = packed.render({"rag": "Knowledge Base Information:", "web": "Web Search Results:"})
 
         if not context.strip():
             context = "No external context was available for this query. Try to answer based on general knowledge if possible."
@@ -191,13 +466,38 @@ class AxonBotAgent:
                 Context:
                 {context}
 
+                Knowledge base passages start with the pages and section they come from, like [p. 3, §Results];
+                cite the pages you draw on, like (p. 3).
+
                 Provide a helpful, accurate, and concise response based on the available information."""
         
-        print(f"Prompt sent to answer_llm: {prompt[:500]}...")
-        ans = self.answer_llm.invoke([HumanMessage(content=prompt)]).content
-        print(f"Final answer generated: {ans[:200]}...")
-        print("--- Exiting answer_node ---")
-        return {"messages": [AIMessage(content=ans)]}
+        logger.debug("Prompt sent to answer_llm: %s...", prompt[:500])
+        return [HumanMessage(content=prompt)], packed.tokens
+
+    def _answer_call(self,state: AgentState):
+        # Answers stream to the client as they are generated, so the answer cascade
+        # picks its tier up front instead of second-guessing a streamed answer.
+        messages, context_tokens = self._answer_prompt(state)
+        start_tier, start_reason = self._cascade_start(self.answer_cascade, context_tokens)
+        return messages, {"start_tier": start_tier, "start_reason": start_reason}
+
+    def _answer_output(self,ans: str,tier: dict):
+        logger.debug("Final answer generated: %s...", ans[:200])
+        return {"messages": [AIMessage(content=ans)], "model_tier": tier}
+
+    def answer_node(self,state: AgentState):
+        logger.debug("Entering answer_node")
+        messages, cascade_args = self._answer_call(state)
+        answered = self.answer_cascade.invoke(messages, **cascade_args)
+        return self._answer_output(answered.output.content, answered.tier)
+
+    async def aanswer_node(self,state: AgentState,config:RunnableConfig):
+        logger.debug("Entering answer_node (async)")
+        # A speculative web search that RAG made unnecessary.
+        self.speculation.discard(state.get("speculation_key"))
+        messages, cascade_args = self._answer_call(state)
+        answered = await self.answer_cascade.ainvoke(messages, **cascade_args)
+        return self._answer_output(answered.output.content, answered.tier)
     
     def from_router(self,st: AgentState) -> Literal["rag", "web", "answer", "end"]:
         return st["route"]
@@ -206,11 +506,13 @@ class AxonBotAgent:
         return st["route"]
 
     def workflow(self):
+        # Each node carries a sync and an async implementation, so the compiled
+        # graph serves both `stream` and `astream` without blocking the event loop.
         self.graph=StateGraph(AgentState)
-        self.graph.add_node("router",self.router_node)
-        self.graph.add_node("rag_lookup",self.rag_node)
-        self.graph.add_node("web_search",self.web_node)
-        self.graph.add_node("answer",self.answer_node)
+        self.graph.add_node("router",RunnableLambda(self.router_node,afunc=self.arouter_node))
+        self.graph.add_node("rag_lookup",RunnableLambda(self.rag_node,afunc=self.arag_node))
+        self.graph.add_node("web_search",RunnableLambda(self.web_node,afunc=self.aweb_node))
+        self.graph.add_node("answer",RunnableLambda(self.answer_node,afunc=self.aanswer_node))
 
         self.graph.set_entry_point("router")
 
@@ -229,4 +531,4 @@ class AxonBotAgent:
         self.graph.add_edge("answer",END)
 
         self.app=self.graph.compile(checkpointer=memory)
-        return self.app
\ No newline at end of file
+        return self.app
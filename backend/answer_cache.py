@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# (namespace, knowledge-base version, web search enabled)
+PartitionKey = Tuple[str, int, bool]
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    vector: np.ndarray
+    response: str
+    trace_events: List[dict]
+    expires_at: float
+    similarity: float = field(default=1.0, compare=False)
+
+
+class SemanticAnswerCache:
+    """
+    Returns a previously generated answer when a new query embeds within
+    `threshold` cosine similarity of a cached one.
+
+    Entries are partitioned by (namespace, kb_version, web_search_enabled), so
+    uploading or deleting a document implicitly invalidates every answer that
+    was grounded in the old knowledge base. Answers that used web search get
+    the shorter web TTL because their sources go stale.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 5000,
+                 ttl_seconds: float = 86400, web_ttl_seconds: float = 900):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.web_ttl_seconds = web_ttl_seconds
+        self._partitions: "dict[PartitionKey, OrderedDict[int, CachedAnswer]]" = {}
+        self._lru: "OrderedDict[int, PartitionKey]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _drop_locked(self, entry_id: int):
+        key = self._lru.pop(entry_id, None)
+        if key is None:
+            return
+        partition = self._partitions.get(key)
+        if partition is not None:
+            partition.pop(entry_id, None)
+            if not partition:
+                del self._partitions[key]
+
+    def lookup(self, vector: List[float], namespace: str, kb_version: int,
+               web_search_enabled: bool) -> Optional[CachedAnswer]:
+        query = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            partition = self._partitions.get((namespace, kb_version, web_search_enabled))
+            if not partition:
+                return None
+
+            for entry_id in [i for i, e in partition.items() if e.expires_at <= now]:
+                self._drop_locked(entry_id)
+            if not partition:
+                return None
+
+            entry_ids = list(partition.keys())
+            matrix = np.stack([partition[i].vector for i in entry_ids])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            entry_id = entry_ids[best]
+            self._lru.move_to_end(entry_id)
+            entry = partition[entry_id]
+            return CachedAnswer(
+                query=entry.query, vector=entry.vector, response=entry.response,
+                trace_events=entry.trace_events, expires_at=entry.expires_at,
+                similarity=float(scores[best])
+            )
+
+    def store(self, query: str, vector: List[float], namespace: str, kb_version: int,
+              web_search_enabled: bool, response: str, trace_events: List[dict], used_web: bool):
+        ttl = self.web_ttl_seconds if used_web else self.ttl_seconds
+        entry = CachedAnswer(
+            query=query, vector=self._normalize(vector), response=response,
+            trace_events=trace_events, expires_at=time.time() + ttl
+        )
+        key = (namespace, kb_version, web_search_enabled)
+        with self._lock:
+            # Partitions for older versions of this knowledge base can never match again.
+            for stale_key in [k for k in self._partitions if k[0] == namespace and k[2] == web_search_enabled and k[1] != kb_version]:
+                for entry_id in list(self._partitions[stale_key].keys()):
+                    self._drop_locked(entry_id)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._partitions.setdefault(key, OrderedDict())[entry_id] = entry
+            self._lru[entry_id] = key
+
+            while len(self._lru) > self.max_entries:
+                self._drop_locked(next(iter(self._lru)))
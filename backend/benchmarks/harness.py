@@ -0,0 +1,199 @@
+"""
+Workload generation, concurrent drivers and latency statistics for the
+offline benchmarks. Nothing here knows about the stubs; run.py installs them
+before any driver touches the agent.
+"""
+import asyncio
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage
+
+TOPICS = [
+    ("expense", "Expense reports are submitted through the finance portal within 30 days of purchase."),
+    ("onboarding", "New hires complete onboarding in their first week, including security training."),
+    ("vacation", "Employees accrue 1.5 vacation days per month, capped at 30 days."),
+    ("deployment", "Production deployments run Tuesday and Thursday after the change review board approves."),
+    ("incident", "Incident ERR-4042 is escalated to the on-call engineer after 15 minutes without acknowledgement."),
+    ("security", "Laptops must use full-disk encryption and lock after five minutes of inactivity."),
+    ("procurement", "Purchases above 5,000 USD need two quotes and approval from the procurement lead."),
+    ("travel", "Business travel is booked through the travel desk; economy class for flights under six hours."),
+]
+
+# (route the stub router will pick, share of the workload, query templates)
+QUERY_MIX = [
+    ("rag", 0.5, ["What is the {topic} policy?", "How does {topic} work here?",
+                  "Explain the rules for {topic}.", "Who approves {topic} requests?"]),
+    ("rag_fallback", 0.1, ["What does the obscure {topic} appendix say?"]),
+    ("web", 0.2, ["What is the latest news on {topic}?", "Any {topic} news today?"]),
+    ("answer", 0.1, ["What is your name?"]),
+    ("end", 0.1, ["Hi there!", "Hello, how are you?"]),
+]
+
+
+def synthetic_document(topic: str, fact: str, chars: int, seed: int) -> str:
+    """Handbook-style filler around FAQ paragraphs that answer the workload's 'rag' questions."""
+    rng = random.Random(seed)
+    questions = [q.format(topic=topic) for kind, _, templates in QUERY_MIX if kind == "rag" for q in templates]
+    words = ["policy", "team", "review", "process", "manager", "request", "approval", "system", "record",
+             "quarter", "budget", "customer", "service", "schedule", "report", "guideline"]
+    paragraphs = []
+    while sum(len(p) for p in paragraphs) < chars:
+        if rng.random() < 0.3:
+            paragraphs.append(f"{rng.choice(questions)} {fact}")
+        else:
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 18)))
+            paragraphs.append(f"The {topic} {sentence}.")
+    return "\n\n".join(paragraphs)[:chars]
+
+
+@dataclass
+class Query:
+    kind: str
+    text: str
+
+
+def build_workload(requests: int, seed: int, query_pool: int = 0, tag: str = "") -> List[Query]:
+    """
+    A deterministic mix of queries following QUERY_MIX. With query_pool > 0
+    the queries are drawn from that many distinct texts, so caches get hits;
+    with 0 every query is unique. The tag goes into every text, so runs with
+    different tags never hit each other's cache entries.
+    """
+    rng = random.Random(seed)
+    kinds = [kind for kind, _, _ in QUERY_MIX]
+    weights = [share for _, share, _ in QUERY_MIX]
+    templates = {kind: options for kind, _, options in QUERY_MIX}
+
+    def make(i: int) -> Query:
+        kind = rng.choices(kinds, weights)[0]
+        topic = rng.choice(TOPICS)[0]
+        text = rng.choice(templates[kind]).format(topic=topic)
+        return Query(kind=kind, text=f"{text} (ref {tag}{i})")
+
+    if query_pool > 0:
+        pool = [make(i) for i in range(query_pool)]
+        return [rng.choice(pool) for _ in range(requests)]
+    return [make(i) for i in range(requests)]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class Sample:
+    path: str
+    seconds: float
+    ok: bool
+
+
+@dataclass
+class RunResult:
+    name: str
+    concurrency: int
+    wall_seconds: float
+    samples: List[Sample] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, dict]:
+        groups: Dict[str, List[Sample]] = {"all": self.samples}
+        for sample in self.samples:
+            groups.setdefault(sample.path, []).append(sample)
+
+        report = {}
+        for path, samples in groups.items():
+            latencies = [s.seconds * 1000 for s in samples if s.ok]
+            report[path] = {
+                "requests": len(samples),
+                "errors": sum(not s.ok for s in samples),
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+                "throughput_rps": round(len(latencies) / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            }
+        return report
+
+
+async def run_concurrently(name: str, workload: List[Query], concurrency: int,
+                           execute: Callable[[int, Query], "asyncio.Future"]) -> RunResult:
+    """Runs execute(i, query) for the whole workload with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[Sample] = []
+
+    async def one(i: int, query: Query):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                path = await execute(i, query)
+                ok = True
+            except Exception as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                path, ok = f"error:{status or type(e).__name__}", False
+            samples.append(Sample(path=path, seconds=time.perf_counter() - start, ok=ok))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i, q) for i, q in enumerate(workload)))
+    return RunResult(name=name, concurrency=concurrency, wall_seconds=time.perf_counter() - start, samples=samples)
+
+
+def graph_executor(graph, namespace: str, web_search_enabled: bool, session_prefix: str):
+    """Drives the compiled AxonBotAgent graph directly; the path is the sequence of nodes that ran."""
+    async def execute(i: int, query: Query) -> str:
+        config = {"configurable": {"thread_id": f"{session_prefix}-{i}",
+                                   "web_search_enabled": web_search_enabled,
+                                   "namespace": namespace}}
+        nodes = []
+        async for update in graph.astream({"messages": [HumanMessage(content=query.text)]}, config=config):
+            nodes.extend(update.keys())
+        return "->".join(nodes)
+    return execute
+
+
+def api_executor(client, namespace: str, web_search_enabled: bool, session_prefix: str):
+    """Drives POST /execute through the ASGI app in-process; the path comes from the trace events."""
+    async def execute(i: int, query: Query) -> str:
+        response = await client.post("/execute", json={
+            "session_id": f"{session_prefix}-{i}",
+            "query": query.text,
+            "enable_web_search": web_search_enabled,
+            "namespace": namespace,
+        })
+        response.raise_for_status()
+        return "->".join(event["node_name"] for event in response.json()["trace_events"])
+    return execute
+
+
+def run_ingestion(documents: List[str], namespace: str, concurrency: int,
+                  add_document: Optional[Callable] = None) -> dict:
+    """Indexes the documents via add_document_to_vectorstore and reports chunk and character throughput."""
+    if add_document is None:
+        from vectorstore import add_document_to_vectorstore as add_document
+
+    def index(i: int) -> dict:
+        return add_document(documents[i], document_id=f"bench-doc-{i}", namespace=namespace,
+                            filename=f"bench-doc-{i}.txt")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        stats = list(pool.map(index, range(len(documents))))
+    seconds = time.perf_counter() - start
+
+    chunks = sum(s["chunks_added"] for s in stats)
+    chars = sum(len(d) for d in documents)
+    return {
+        "documents": len(documents),
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "documents_per_s": round(len(documents) / seconds, 2),
+        "chunks_per_s": round(chunks / seconds, 1),
+        "kchars_per_s": round(chars / 1000 / seconds, 1),
+    }
@@ -0,0 +1,25 @@
+import hashlib
+from dataclasses import dataclass
+
+
+@dataclass
+class LatencyProfile:
+    """Simulated service times in milliseconds. jitter is the +/- fraction applied to each delay."""
+    router_ms: float = 400
+    judge_ms: float = 250
+    answer_first_token_ms: float = 600
+    answer_token_ms: float = 15
+    answer_tokens: int = 60
+    embed_call_ms: float = 8
+    embed_text_ms: float = 1
+    vector_query_ms: float = 40
+    vector_upsert_ms: float = 60
+    web_ms: float = 900
+    jitter: float = 0.2
+
+    def delay(self, base_ms: float, key: str) -> float:
+        """Seconds to wait for an operation on `key`; the same key always gets the same delay."""
+        if base_ms <= 0:
+            return 0.0
+        fraction = int(hashlib.md5(key.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return base_ms * (1 + self.jitter * (2 * fraction - 1)) / 1000
@@ -0,0 +1,162 @@
+"""
+Offline benchmark for AxonBot: no Gemini, Groq, Pinecone or Tavily account needed.
+
+Replaces the external services with the deterministic, fixed-latency stubs in
+benchmarks/stubs.py, then measures:
+
+  * ingestion throughput of add_document_to_vectorstore,
+  * AxonBotAgent.workflow() driven directly ("graph"),
+  * the FastAPI app's POST /execute driven in-process ("api"),
+
+under a configurable concurrency, with p50/p95/p99 latency and throughput per
+route (the sequence of graph nodes a request went through).
+
+Run from backend/:
+
+    python -m benchmarks.run --requests 200 --concurrency 16
+    python -m benchmarks.run --mode api --query-pool 20 --json results.json
+
+Everything the app would persist (indexes, caches, checkpoints) goes to a
+temporary directory. The provider rate limits in PROVIDER_LIMITS apply to the
+stubs as well; PROVIDER_LIMITS=google=0/1/64/256,groq=0/1/64/256,tavily=0/1/64/256
+measures without them. The cross-encoder reranker is not stubbed: leave
+RERANK_ENABLED off unless the model is available locally.
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks.latency import LatencyProfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def isolate_storage(data_dir: str):
+    """Points every on-disk store at data_dir. Must run before config is imported."""
+    os.environ.update({
+        "VECTOR_BACKEND": "local",
+        "LOCAL_INDEX_DIR": os.path.join(data_dir, "index"),
+        "LEXICAL_INDEX_DIR": os.path.join(data_dir, "lexical"),
+        "EMBED_CACHE_PATH": os.path.join(data_dir, "embedding_cache.sqlite"),
+        "DOCUMENT_REGISTRY_PATH": os.path.join(data_dir, "documents.sqlite"),
+        "CHECKPOINT_DB_PATH": os.path.join(data_dir, "checkpoints.sqlite"),
+        "WARM_UP_ON_STARTUP": "false",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+
+
+def install_stubs(profile):
+    """Swaps the stubs into the lazily created components the app and the agent use."""
+    import agent
+    import tools
+    import vectorstore
+    from benchmarks.stubs import StubEmbeddings, StubLLMModel, StubTavilySearch, StubVectorBackend
+
+    # The stub goes under the real micro-batching and caching layers, not around them.
+    vectorstore.embedding_model.set(vectorstore.wrap_embedding(StubEmbeddings(profile), "stub-embedding"))
+    vectorstore.vector_backend.set(StubVectorBackend(vectorstore.get_embedding(), profile))
+    tools.tavily.set(StubTavilySearch(profile))
+    agent.llm_models.set(StubLLMModel(profile))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=["graph", "api", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=200, help="Queries per run.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16],
+                        help="One run per value, e.g. --concurrency 1 8 32.")
+    parser.add_argument("--query-pool", type=int, default=0,
+                        help="Draw queries from this many distinct texts (0: all unique, caches stay cold).")
+    parser.add_argument("--no-web-search", action="store_true", help="Run with web search disabled.")
+    parser.add_argument("--ingest-docs", type=int, default=16, help="Documents indexed before the query runs.")
+    parser.add_argument("--ingest-doc-chars", type=int, default=20_000)
+    parser.add_argument("--ingest-concurrency", type=int, default=4)
+    parser.add_argument("--namespace", default="benchmark")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--data-dir", default=None, help="Where stores are written (default: a temp dir).")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the full report here.")
+
+    latency = parser.add_argument_group("simulated service latency")
+    for f in dataclasses.fields(LatencyProfile):
+        latency.add_argument(f"--{f.name.replace('_', '-')}", type=type(f.default), default=f.default)
+    args = parser.parse_args(argv)
+    args.profile = LatencyProfile(**{f.name: getattr(args, f.name) for f in dataclasses.fields(LatencyProfile)})
+    return args
+
+
+def print_table(title: str, summary: dict):
+    print(f"\n{title}")
+    header = f"  {'route':<56}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}"
+    print(header)
+    print("  " + "-" * (len(header) - 2))
+    for path, row in sorted(summary.items(), key=lambda item: (item[0] != "all", -item[1]["requests"])):
+        print(f"  {path:<56}{row['requests']:>9}{row['errors']:>8}{row['p50_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['throughput_rps']:>9}")
+
+
+async def run_queries(args, report: dict):
+    import httpx
+    from benchmarks.harness import api_executor, build_workload, graph_executor, run_concurrently
+
+    web_search_enabled = not args.no_web_search
+    modes = ["graph", "api"] if args.mode == "both" else [args.mode]
+
+    for mode in modes:
+        for concurrency in args.concurrency:
+            # Fresh session ids and query texts per run, so no run reads another's
+            # conversation history or cached answers.
+            prefix = f"{mode}-c{concurrency}"
+            workload = build_workload(args.requests, args.seed, args.query_pool, tag=f"{prefix}-")
+            if mode == "graph":
+                from main import get_app_graph
+                execute = graph_executor(await get_app_graph(), args.namespace, web_search_enabled, prefix)
+                result = await run_concurrently(prefix, workload, concurrency, execute)
+            else:
+                from main import app
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+                    execute = api_executor(client, args.namespace, web_search_enabled, prefix)
+                    result = await run_concurrently(prefix, workload, concurrency, execute)
+
+            summary = result.summary()
+            report["runs"].append({"mode": mode, "concurrency": concurrency,
+                                   "wall_seconds": round(result.wall_seconds, 3), "routes": summary})
+            print_table(f"{mode}: {len(workload)} requests, concurrency {concurrency}, "
+                        f"{result.wall_seconds:.2f}s wall", summary)
+
+
+def main(argv=None):
+    sys.path.insert(0, BACKEND_DIR)
+    args = parse_args(argv)
+    isolate_storage(args.data_dir or tempfile.mkdtemp(prefix="axonbot-bench-"))
+    install_stubs(args.profile)
+
+    from benchmarks.harness import TOPICS, run_ingestion, synthetic_document
+
+    report = {"profile": dataclasses.asdict(args.profile), "ingestion": None, "runs": []}
+
+    if args.ingest_docs:
+        documents = [
+            synthetic_document(*TOPICS[i % len(TOPICS)], chars=args.ingest_doc_chars, seed=args.seed + i)
+            for i in range(args.ingest_docs)
+        ]
+        report["ingestion"] = run_ingestion(documents, args.namespace, args.ingest_concurrency)
+        ingestion = report["ingestion"]
+        print(f"\ningestion: {ingestion['documents']} documents, {ingestion['chunks']} chunks in "
+              f"{ingestion['seconds']}s -> {ingestion['chunks_per_s']} chunks/s, "
+              f"{ingestion['kchars_per_s']} kchars/s")
+
+    asyncio.run(run_queries(args, report))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Deterministic stand-ins for the external services AxonBot calls: the Gemini
+and Groq chat models, the embedding model, the vector store and Tavily.
+
+Every stub sleeps for a configurable latency instead of doing real work, so a
+benchmark measures AxonBot's own overhead (graph, caches, packing, batching)
+plus a known, fixed service time. Jitter is derived from a hash of the input,
+so the same workload always sees the same delays.
+"""
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from benchmarks.latency import LatencyProfile
+from schemas import RagJudge, RouteDecision
+from vectorstore import Candidate, LocalBackend
+
+EMBEDDING_DIM = 768
+
+
+def _messages_text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    parts = []
+    for message in messages:
+        if isinstance(message, BaseMessage):
+            parts.append(str(message.content))
+        elif isinstance(message, tuple):
+            parts.append(str(message[-1]))
+        else:
+            parts.append(str(message))
+    return "\n".join(parts)
+
+
+def _last_message_text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    return _messages_text(messages[-1:])
+
+
+def _structured_stub(decide, latency: float, profile: LatencyProfile) -> RunnableLambda:
+    """A with_structured_output() stand-in: returns decide(messages) after the profile's delay."""
+    def invoke(messages):
+        time.sleep(profile.delay(latency, _messages_text(messages)))
+        return decide(messages)
+
+    async def ainvoke(messages):
+        await asyncio.sleep(profile.delay(latency, _messages_text(messages)))
+        return decide(messages)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def route_query(messages: Any) -> RouteDecision:
+    """Keyword router mirroring what the real router prompt asks for."""
+    query = _last_message_text(messages).lower()
+    if re.match(r"\s*(hi|hello|hey)\b", query):
+        return RouteDecision(route="end", reply="Hello! How can I assist you today?")
+    if any(word in query for word in ("latest", "news", "today", "yesterday")):
+        return RouteDecision(route="web")
+    if "your name" in query:
+        return RouteDecision(route="answer")
+    return RouteDecision(route="rag")
+
+
+def judge_context(messages: Any) -> RagJudge:
+    """Knowledge-base context is sufficient unless the question is about something 'obscure'."""
+    return RagJudge(sufficient="obscure" not in _messages_text(messages).lower(), confidence=0.9)
+
+
+class StubChatModel(BaseChatModel):
+    """Streams a fixed-length answer with a first-token delay and a per-token delay."""
+
+    model_name: str = "stub-answer"
+    profile: LatencyProfile = LatencyProfile()
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name}
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        seed = hashlib.md5(_messages_text(messages).encode("utf-8")).hexdigest()
+        return [f"{'word' if i else 'Answer'}{seed[i % len(seed)]} " for i in range(self.profile.answer_tokens)]
+
+    def _usage(self, messages: List[BaseMessage], output_tokens: int) -> dict:
+        input_tokens = len(_messages_text(messages)) // 4
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        key = _messages_text(messages)
+        time.sleep(self.profile.delay(self.profile.answer_first_token_ms, key)
+                   + len(tokens) * self.profile.delay(self.profile.answer_token_ms, key))
+        message = AIMessage(content="".join(tokens).strip(), usage_metadata=self._usage(messages, len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        key = _messages_text(messages)
+        time.sleep(self.profile.delay(self.profile.answer_first_token_ms, key))
+        tokens = self._tokens(messages)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.profile.delay(self.profile.answer_token_ms, key))
+            usage = self._usage(messages, len(tokens)) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        key = _messages_text(messages)
+        await asyncio.sleep(self.profile.delay(self.profile.answer_first_token_ms, key))
+        tokens = self._tokens(messages)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.profile.delay(self.profile.answer_token_ms, key))
+            usage = self._usage(messages, len(tokens)) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        chunks = [chunk async for chunk in self._astream(messages, stop, run_manager, **kwargs)]
+        content = "".join(chunk.message.content for chunk in chunks).strip()
+        message = AIMessage(content=content, usage_metadata=self._usage(messages, len(chunks)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class StubLLMModel:
+    """Drop-in for llms.LLMModel: same attributes and getters, no network."""
+
+    def __init__(self, profile: LatencyProfile):
+        self.router_model_name = "stub-router"
+        self.judge_model_name = "stub-judge"
+        self.answer_model_name = "stub-answer"
+        self.router_provider = "google"
+        self.judge_provider = "groq"
+        self.answer_provider = "google"
+        self.router_model = _structured_stub(route_query, profile.router_ms, profile)
+        self.judge_model = _structured_stub(judge_context, profile.judge_ms, profile)
+        self.answer_model = StubChatModel(model_name=self.answer_model_name, profile=profile)
+
+    def get_router_model(self):
+        return self.router_model
+
+    def get_judge_model(self):
+        return self.judge_model
+
+    def get_answer_model(self):
+        return self.answer_model
+
+
+class StubEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words vectors: texts sharing words get a positive cosine
+    similarity, so retrieval, the fast router and the answer cache behave
+    plausibly. Costs embed_call_ms per call plus embed_text_ms per text.
+    """
+
+    def __init__(self, profile: LatencyProfile, dim: int = EMBEDDING_DIM):
+        self.profile = profile
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dim] += 1.0
+        if not any(vector):
+            vector[0] = 1.0
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        key = texts[0] if texts else ""
+        time.sleep(self.profile.delay(self.profile.embed_call_ms, key)
+                   + len(texts) * self.profile.delay(self.profile.embed_text_ms, key))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class StubVectorBackend(LocalBackend):
+    """The local NumPy backend plus a simulated network round trip per query and upsert, like Pinecone."""
+
+    def __init__(self, embedding: Embeddings, profile: LatencyProfile):
+        super().__init__(embedding)
+        self.profile = profile
+
+    def upsert(self, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict],
+               namespace: str):
+        time.sleep(self.profile.delay(self.profile.vector_upsert_ms, ids[0] if ids else namespace))
+        super().upsert(ids, texts, vectors, metadatas, namespace)
+
+    def query_candidates(self, vector: List[float], top_k: int, namespace: str) -> List[Candidate]:
+        time.sleep(self.profile.delay(self.profile.vector_query_ms, f"{namespace}:{vector[:8]}"))
+        return super().query_candidates(vector, top_k, namespace)
+
+
+class StubTavilySearch:
+    """Returns three synthetic results per query in Tavily's response shape."""
+
+    def __init__(self, profile: LatencyProfile):
+        self.profile = profile
+        self.calls = 0
+
+    def invoke(self, payload: dict) -> dict:
+        query = payload["query"]
+        self.calls += 1
+        time.sleep(self.profile.delay(self.profile.web_ms, query))
+        slug = hashlib.md5(query.encode("utf-8")).hexdigest()[:10]
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i + 1} for {query}",
+                    "url": f"https://example.com/{slug}/{i}",
+                    "content": f"Synthetic web content about {query}. " * 8,
+                    "score": round(0.9 - i * 0.1, 2),
+                }
+                for i in range(3)
+            ],
+        }
@@ -0,0 +1,203 @@
+import logging
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+
+from metrics import MODEL_TIERS
+from resilience import GuardedModel, OutputWatcher, get_guard, guard_model, with_callback_handler
+
+logger = logging.getLogger(__name__)
+
+# Returns why an output is not good enough and the next tier should be tried, or None to keep it.
+EscalationCheck = Callable[[Any], Optional[str]]
+
+
+def parse_cascade(spec: str) -> List[List[Tuple[str, str]]]:
+    """
+    'groq:small,groq:large|google:other' -> [[('groq', 'small')], [('groq', 'large'), ('google', 'other')]]:
+    tiers from small to large, each a primary followed by its failover alternates.
+    """
+    tiers = []
+    for tier in spec.split(","):
+        options = []
+        for option in tier.split("|"):
+            if ":" in option:
+                provider, model_name = option.split(":", 1)
+                options.append((provider.strip(), model_name.strip()))
+        if options:
+            tiers.append(options)
+    return tiers
+
+
+@dataclass
+class ModelOption:
+    provider: str
+    model_name: str
+    model: GuardedModel
+
+
+@dataclass
+class CascadeResult:
+    output: Any
+    # Which tier and model served the call and why, for the trace.
+    tier: dict
+
+
+class ModelCascade:
+    """
+    Calls one role's models from the smallest tier up. start_tier lets the
+    caller skip tiers it already knows are too small (a long context, say),
+    and needs_escalation(output) sends the call to the next tier when the
+    output is not trustworthy. The last tier's output is always kept, and if
+    every larger tier fails, the smaller tier's output is kept after all.
+
+    A tier can list alternates on other providers. While the primary's
+    observed latency percentile (timed-out and failed calls included) is over
+    the role's SLO, the alternates go first, except for a small share of probe calls that keep the primary's
+    statistics fresh. A call that fails before producing any output moves on
+    to the tier's next option.
+    """
+
+    def __init__(self, role: str, tiers: List[List[ModelOption]], slo_seconds: Optional[float] = None,
+                 slo_percentile: float = 95, probe_ratio: float = 0.05):
+        if not tiers:
+            raise ValueError(f"The {role} cascade needs at least one model")
+        self.role = role
+        self.tiers = tiers
+        self.slo_seconds = slo_seconds
+        self.slo_percentile = slo_percentile
+        self.probe_ratio = probe_ratio
+
+    @property
+    def size(self) -> int:
+        return len(self.tiers)
+
+    @property
+    def largest_model_name(self) -> str:
+        return self.tiers[-1][0].model_name
+
+    def _options(self, tier_index: int) -> List[Tuple[ModelOption, Optional[str]]]:
+        """The tier's options in call order, each with the reason it replaces the primary (None for the primary)."""
+        primary, *alternates = self.tiers[tier_index]
+        if alternates and self.slo_seconds is not None:
+            observed = get_guard(primary.provider).observed_latency(primary.model.role, self.slo_percentile)
+            if observed is not None and observed > self.slo_seconds and random.random() >= self.probe_ratio:
+                reason = (f"{primary.model_name} p{self.slo_percentile:g} latency {observed:.2f}s "
+                          f"over the {self.slo_seconds:g}s SLO")
+                return [(option, reason) for option in alternates] + [(primary, None)]
+        return [(primary, None)] + [(option, None) for option in alternates]
+
+    def _tier_info(self, tier_index: int, option: ModelOption, escalated_because: Optional[str],
+                   failover_because: Optional[str]) -> dict:
+        return {
+            "role": self.role,
+            "tier": tier_index + 1,
+            "tiers": len(self.tiers),
+            "provider": option.provider,
+            "model": option.model_name,
+            "escalated_because": escalated_because,
+            "failover_because": failover_because,
+        }
+
+    def _failed(self, option: ModelOption, error: Exception) -> str:
+        logger.warning("%s call to %s (%s) failed, trying the next option: %s",
+                       self.role, option.model_name, option.provider, error)
+        return f"{option.model_name} failed ({type(error).__name__})"
+
+    def _outcome(self, tier_index: int, option: ModelOption, output: Any, escalated_because: Optional[str],
+                 failover_because: Optional[str], needs_escalation: Optional[EscalationCheck]):
+        """(result, None) to keep the output, or (result to fall back on, reason) to try the next tier."""
+        result = CascadeResult(output, self._tier_info(tier_index, option, escalated_because, failover_because))
+        why = needs_escalation(output) if needs_escalation and tier_index < len(self.tiers) - 1 else None
+        if why is None:
+            reason = "failover" if failover_because else "escalated" if escalated_because else "first_tier"
+            MODEL_TIERS.inc(self.role, option.model_name, reason)
+        else:
+            logger.info("Escalating %s from %s: %s", self.role, option.model_name, why)
+        return result, why
+
+    def _give_up(self, error: Optional[Exception], fallback: Optional[CascadeResult]) -> CascadeResult:
+        if fallback is None:
+            raise error
+        # The smaller tier's output, kept because no larger tier could be reached.
+        MODEL_TIERS.inc(self.role, fallback.tier["model"], "fallback")
+        return fallback
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, start_tier: int = 0,
+               start_reason: Optional[str] = None, needs_escalation: Optional[EscalationCheck] = None) -> CascadeResult:
+        escalated_because, error, fallback = start_reason, None, None
+        for tier_index in range(min(start_tier, len(self.tiers) - 1), len(self.tiers)):
+            failover_because = None
+            for option, reason in self._options(tier_index):
+                failover_because = failover_because or reason
+                watcher = OutputWatcher()
+                try:
+                    output = option.model.invoke(input, with_callback_handler(ensure_config(config), watcher))
+                except Exception as e:
+                    if watcher.produced:
+                        raise
+                    error, failover_because = e, self._failed(option, e)
+                    continue
+                result, why = self._outcome(tier_index, option, output, escalated_because, failover_because,
+                                            needs_escalation)
+                if why is None:
+                    return result
+                fallback, escalated_because = result, why
+                break
+            else:
+                escalated_because = f"tier {tier_index + 1} unavailable"
+        return self._give_up(error, fallback)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, start_tier: int = 0,
+                      start_reason: Optional[str] = None,
+                      needs_escalation: Optional[EscalationCheck] = None) -> CascadeResult:
+        escalated_because, error, fallback = start_reason, None, None
+        for tier_index in range(min(start_tier, len(self.tiers) - 1), len(self.tiers)):
+            failover_because = None
+            for option, reason in self._options(tier_index):
+                failover_because = failover_because or reason
+                watcher = OutputWatcher()
+                try:
+                    output = await option.model.ainvoke(input, with_callback_handler(ensure_config(config), watcher))
+                except Exception as e:
+                    if watcher.produced:
+                        raise
+                    error, failover_because = e, self._failed(option, e)
+                    continue
+                result, why = self._outcome(tier_index, option, output, escalated_because, failover_because,
+                                            needs_escalation)
+                if why is None:
+                    return result
+                fallback, escalated_because = result, why
+                break
+            else:
+                escalated_because = f"tier {tier_index + 1} unavailable"
+        return self._give_up(error, fallback)
+
+
+def build_cascade(role: str, spec: str, default_provider: str, default_model_name: str, default_model: Runnable,
+                  create: Callable[[str, str], Runnable], slo_seconds: Optional[float] = None,
+                  slo_percentile: float = 95, probe_ratio: float = 0.05) -> ModelCascade:
+    """
+    The role's cascade from a JUDGE_CASCADE/ANSWER_CASCADE style spec; an
+    empty spec gives a single tier holding the default model. The default
+    model is reused wherever the spec names it, anything else comes from
+    create(provider, model_name). Every model goes through its provider's guard.
+    """
+    parsed = parse_cascade(spec) or [[(default_provider, default_model_name)]]
+    single = len(parsed) == 1 and len(parsed[0]) == 1
+    tiers = []
+    for options in parsed:
+        tier = []
+        for provider, model_name in options:
+            if (provider, model_name) == (default_provider, default_model_name):
+                runnable = default_model
+            else:
+                runnable = create(provider, model_name)
+            # Per-model labels keep each tier's latency statistics (used for the SLO) apart.
+            label = role if single else f"{role}:{model_name}"
+            tier.append(ModelOption(provider, model_name, guard_model(runnable, provider, role, label=label)))
+        tiers.append(tier)
+    return ModelCascade(role, tiers, slo_seconds=slo_seconds, slo_percentile=slo_percentile, probe_ratio=probe_ratio)
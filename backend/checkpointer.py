@@ -0,0 +1,389 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+# (checkpoint, metadata, parent checkpoint id)
+CachedCheckpoint = Tuple[Checkpoint, CheckpointMetadata, Optional[str]]
+
+
+class BoundedSQLiteSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer backed by a single SQLite file, so conversations
+    survive restarts and can be shared between uvicorn workers.
+
+    Storage is bounded three ways:
+      - only the newest max_checkpoints_per_thread checkpoints of a thread are kept
+        (the latest one holds the full message history, older ones are only needed
+        for time travel);
+      - threads idle for longer than thread_ttl_seconds are evicted;
+      - beyond max_threads, the least recently used threads are evicted.
+
+    Eviction and compaction run every maintenance_interval writes. Deserialized
+    checkpoints are kept in a small in-process LRU; checkpoints are immutable
+    once written, so the cache never needs invalidating across workers.
+    """
+
+    def __init__(self, path: str, max_threads: int = 10_000, thread_ttl_seconds: float = 7 * 86400,
+                 max_checkpoints_per_thread: int = 20, hot_cache_size: int = 256,
+                 maintenance_interval: int = 500):
+        super().__init__()
+        self.max_threads = max_threads
+        self.thread_ttl_seconds = thread_ttl_seconds
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.hot_cache_size = hot_cache_size
+        self.maintenance_interval = maintenance_interval
+        self._hot: "OrderedDict[Tuple[str, str, str], CachedCheckpoint]" = OrderedDict()
+        self._writes_since_maintenance = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # auto_vacuum only takes effect on a new database, before any table exists.
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT,
+                metadata BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT,
+                value BLOB,
+                task_path TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_threads_last_access ON threads(last_access);
+            """
+        )
+        self._conn.commit()
+
+    # ---- hot cache ----
+
+    def _cache_get(self, key: Tuple[str, str, str]) -> Optional[CachedCheckpoint]:
+        item = self._hot.get(key)
+        if item is not None:
+            self._hot.move_to_end(key)
+        return item
+
+    def _cache_put(self, key: Tuple[str, str, str], item: CachedCheckpoint):
+        if self.hot_cache_size <= 0:
+            return
+        self._hot[key] = item
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_cache_size:
+            self._hot.popitem(last=False)
+
+    def _cache_drop_threads(self, thread_ids: Sequence[str]):
+        doomed = set(thread_ids)
+        for key in [k for k in self._hot if k[0] in doomed]:
+            del self._hot[key]
+
+    # ---- reads ----
+
+    def _load_checkpoint_locked(self, thread_id: str, checkpoint_ns: str,
+                                checkpoint_id: str) -> Optional[CachedCheckpoint]:
+        key = (thread_id, checkpoint_ns, checkpoint_id)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        row = self._conn.execute(
+            "SELECT parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchone()
+        if row is None:
+            return None
+        parent_id, type_, blob, metadata_type, metadata_blob = row
+        item = (
+            self.serde.loads_typed((type_, blob)),
+            self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_id,
+        )
+        self._cache_put(key, item)
+        return item
+
+    def _load_writes_locked(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[tuple]:
+        rows = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _tuple_locked(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str,
+                      item: CachedCheckpoint) -> CheckpointTuple:
+        checkpoint, metadata, parent_id = item
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=copy_checkpoint(checkpoint),
+            metadata=dict(metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=self._load_writes_locked(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id: str = config["configurable"]["thread_id"]
+        checkpoint_ns: str = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        with self._lock:
+            if not checkpoint_id:
+                # Always ask the database for the latest id: another worker may have written since.
+                row = self._conn.execute(
+                    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+                if row is None:
+                    return None
+                checkpoint_id = row[0]
+
+            item = self._load_checkpoint_locked(thread_id, checkpoint_ns, checkpoint_id)
+            if item is None:
+                return None
+            return self._tuple_locked(thread_id, checkpoint_ns, checkpoint_id, item)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            keys = self._conn.execute(
+                f"SELECT thread_id, checkpoint_ns, checkpoint_id FROM checkpoints {where} "
+                "ORDER BY checkpoint_id DESC",
+                params,
+            ).fetchall()
+
+        for thread_id, checkpoint_ns, checkpoint_id in keys:
+            if limit is not None and limit <= 0:
+                break
+            with self._lock:
+                item = self._load_checkpoint_locked(thread_id, checkpoint_ns, checkpoint_id)
+                if item is None:
+                    continue
+                if filter and not all(item[1].get(k) == v for k, v in filter.items()):
+                    continue
+                result = self._tuple_locked(thread_id, checkpoint_ns, checkpoint_id, item)
+            if limit is not None:
+                limit -= 1
+            yield result
+
+    # ---- writes ----
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+        metadata = get_checkpoint_metadata(config, metadata)
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(metadata)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], parent_id, type_, blob, metadata_type, metadata_blob),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO threads (thread_id, last_access) VALUES (?, ?)", (thread_id, time.time())
+            )
+            self._prune_thread_locked(thread_id, checkpoint_ns)
+            self._conn.commit()
+            # Cache a copy: the graph keeps mutating the checkpoint object it passed in.
+            self._cache_put(
+                (thread_id, checkpoint_ns, checkpoint["id"]),
+                (copy_checkpoint(checkpoint), metadata, parent_id),
+            )
+            self._maybe_maintain_locked()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts) overwrite; regular writes are only recorded once.
+        verb = "INSERT OR REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id,
+                         WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path))
+
+        with self._lock:
+            self._conn.executemany(
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, "
+                "task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete_threads_locked([thread_id])
+            self._conn.commit()
+
+    # ---- eviction and compaction ----
+
+    def _prune_thread_locked(self, thread_id: str, checkpoint_ns: str):
+        stale = self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.max_checkpoints_per_thread),
+        ).fetchall()
+        if not stale:
+            return
+        rows = [(thread_id, checkpoint_ns, checkpoint_id) for (checkpoint_id,) in stale]
+        self._conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", rows
+        )
+        self._conn.executemany(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", rows
+        )
+        for key in rows:
+            self._hot.pop(key, None)
+
+    def _delete_threads_locked(self, thread_ids: List[str]):
+        if not thread_ids:
+            return
+        rows = [(thread_id,) for thread_id in thread_ids]
+        self._conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", rows)
+        self._conn.executemany("DELETE FROM writes WHERE thread_id = ?", rows)
+        self._conn.executemany("DELETE FROM threads WHERE thread_id = ?", rows)
+        self._cache_drop_threads(thread_ids)
+
+    def _maybe_maintain_locked(self):
+        self._writes_since_maintenance += 1
+        if self._writes_since_maintenance >= self.maintenance_interval:
+            self._maintain_locked()
+
+    def _maintain_locked(self) -> int:
+        self._writes_since_maintenance = 0
+        cutoff = time.time() - self.thread_ttl_seconds
+        expired = [row[0] for row in self._conn.execute(
+            "SELECT thread_id FROM threads WHERE last_access < ?", (cutoff,)
+        ).fetchall()]
+        self._delete_threads_locked(expired)
+
+        overflow = [row[0] for row in self._conn.execute(
+            "SELECT thread_id FROM threads ORDER BY last_access DESC LIMIT -1 OFFSET ?", (self.max_threads,)
+        ).fetchall()]
+        self._delete_threads_locked(overflow)
+        self._conn.commit()
+
+        evicted = len(expired) + len(overflow)
+        if evicted:
+            # Hand freed pages back to the filesystem and keep the WAL from growing.
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            logger.info("Checkpointer evicted %d idle and %d least recently used threads.", len(expired), len(overflow))
+        return evicted
+
+    def compact(self) -> int:
+        """Evicts idle/overflow threads and reclaims disk space now; returns the number of threads evicted."""
+        with self._lock:
+            return self._maintain_locked()
+
+    # ---- async variants ----
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
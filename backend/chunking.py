@@ -0,0 +1,233 @@
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+# (page number, page text); the page number is None for text without pages.
+Page = Tuple[Optional[int], str]
+
+_SENTENCE_END = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])")
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*#*$")
+_NUMBERED_HEADING = re.compile(r"^(\d+(?:\.\d+)*\.?)\s+([A-Z][^.!?:;]*)$")
+_HYPHENATED_BREAK = re.compile(r"(\w)-$")
+
+# Headings are short: longer lines are body text even when they look like one.
+HEADING_MAX_WORDS = 12
+
+
+def heading_title(line: str) -> Optional[str]:
+    """The section title if the line looks like a heading (markdown, numbered or ALL CAPS), else None."""
+    line = line.strip()
+    if not line or len(line.split()) > HEADING_MAX_WORDS:
+        return None
+    match = _MARKDOWN_HEADING.match(line)
+    if match:
+        return match.group(1)
+    match = _NUMBERED_HEADING.match(line)
+    if match:
+        return f"{match.group(1)} {match.group(2)}"
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and line.isupper() and line[-1] not in ".,;:":
+        return line.title()
+    return None
+
+
+def split_sentences(paragraph: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(paragraph) if s.strip()]
+
+
+@dataclass
+class Sentence:
+    text: str
+    page: Optional[int]
+    section: Optional[str]
+    # Starts a new paragraph, so the chunk text keeps the paragraph break before it.
+    paragraph_start: bool
+
+
+def iter_sentences(pages: Iterable[Page], max_chars: int) -> Iterator[Sentence]:
+    """
+    Sentences in reading order, each with its page and the section it sits
+    in. Paragraphs may run across pages, and lines wrapped by the PDF
+    extraction (hyphenated ones included) are joined back together.
+    Sentences longer than max_chars are cut into max_chars pieces.
+
+    PDF text often has no blank lines between paragraphs, so a paragraph
+    also ends with a page whose last line ends a sentence, and one that grows
+    past a few chunks is cut at a line break, which keeps the stream lazy.
+    """
+    cutter = RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=0)
+    section: Optional[str] = None
+    # The paragraph being collected, as (page, line) pairs.
+    lines: List[Tuple[Optional[int], str]] = []
+    buffered = 0
+
+    def flush() -> Iterator[Sentence]:
+        nonlocal buffered
+        buffered = 0
+        paragraph, starts = "", []
+        for page_number, line in lines:
+            starts.append((len(paragraph), page_number))
+            paragraph += line + " "
+        lines.clear()
+        cursor, first = 0, True
+        for sentence in split_sentences(paragraph):
+            cursor = paragraph.find(sentence, cursor)
+            # The page of the line the sentence starts on.
+            page = next(page for offset, page in reversed(starts) if offset <= cursor)
+            for piece in (cutter.split_text(sentence) if len(sentence) > max_chars else [sentence]):
+                yield Sentence(piece, page, section, first)
+                first = False
+
+    for page_number, text in pages:
+        for raw_line in text.splitlines():
+            line = raw_line.strip()
+            title = heading_title(line)
+            if not line or title:
+                yield from flush()
+                if title:
+                    section = title
+                continue
+            if lines and _HYPHENATED_BREAK.search(lines[-1][1]):
+                lines[-1] = (lines[-1][0], lines[-1][1][:-1] + line)
+            else:
+                lines.append((page_number, line))
+            buffered += len(line) + 1
+            if buffered > max_chars * 4:
+                yield from flush()
+        # Otherwise the paragraph carries on across the page break.
+        if lines and lines[-1][1].endswith((".", "!", "?")):
+            yield from flush()
+    yield from flush()
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class PageAwareChunker:
+    """
+    Packs sentences into chunks of at most max_chars without crossing a
+    section heading, and records the pages (page, page_end) and section each
+    chunk comes from in its metadata.
+
+    With an embedding model, sentences are embedded in windows of
+    window_sentences and a chunk also ends where the cosine distance between
+    neighbouring sentences is above the breakpoint_percentile of the recent
+    distances (a topic shift), once it holds min_chars. Those sentence vectors
+    are then mean-pooled, weighted by sentence length, into the chunk's
+    vector, so the chunks need no embedding pass of their own.
+    """
+
+    def __init__(self, embedding: Optional[Embeddings] = None, max_chars: int = 1200, min_chars: int = 200,
+                 breakpoint_percentile: float = 90, window_sentences: int = 64):
+        self.embedding = embedding
+        self.max_chars = max_chars
+        self.min_chars = min(min_chars, max_chars)
+        self.breakpoint_percentile = breakpoint_percentile
+        self.window_sentences = max(2, window_sentences)
+
+    def split_pages(self, pages: Iterable[Page],
+                    vectors: Optional[Dict[str, List[float]]] = None) -> Iterator[Document]:
+        """
+        Chunks a stream of pages lazily. With an embedding model and a vectors
+        dict, each chunk's pooled vector is stored in vectors under its text
+        before the chunk is yielded.
+        """
+        sentences = iter_sentences(pages, self.max_chars)
+        if self.embedding is None:
+            yield from self._pack(((sentence, None) for sentence in sentences), None)
+            return
+        yield from self._pack(self._embedded(sentences), vectors)
+
+    def _embedded(self, sentences: Iterator[Sentence]) -> Iterator[Tuple[Sentence, np.ndarray]]:
+        window: List[Sentence] = []
+        for sentence in sentences:
+            window.append(sentence)
+            if len(window) == self.window_sentences:
+                yield from self._embed_window(window)
+                window = []
+        if window:
+            yield from self._embed_window(window)
+
+    def _embed_window(self, window: List[Sentence]) -> Iterator[Tuple[Sentence, np.ndarray]]:
+        embedded = _unit(np.asarray(self.embedding.embed_documents([s.text for s in window]), dtype=np.float32))
+        return zip(window, embedded)
+
+    def _pack(self, embedded: Iterable[Tuple[Sentence, Optional[np.ndarray]]],
+              vectors: Optional[Dict[str, List[float]]]) -> Iterator[Document]:
+        chunk: List[Tuple[Sentence, Optional[np.ndarray]]] = []
+        size = 0
+        distances = deque(maxlen=self.window_sentences * 4)
+        previous: Optional[np.ndarray] = None
+
+        for sentence, vector in embedded:
+            topic_shift = False
+            if vector is not None and previous is not None:
+                distance = 1.0 - float(vector @ previous)
+                distances.append(distance)
+                topic_shift = (len(distances) >= 8
+                               and distance > np.percentile(distances, self.breakpoint_percentile))
+            previous = vector
+
+            if chunk and (sentence.section != chunk[-1][0].section
+                          or size + 1 + len(sentence.text) > self.max_chars
+                          or (topic_shift and size >= self.min_chars)):
+                yield self._document(chunk, vectors)
+                chunk, size = [], 0
+            chunk.append((sentence, vector))
+            size += len(sentence.text) + (1 if len(chunk) > 1 else 0)
+
+        if chunk:
+            yield self._document(chunk, vectors)
+
+    @staticmethod
+    def _document(chunk: List[Tuple[Sentence, Optional[np.ndarray]]],
+                  vectors: Optional[Dict[str, List[float]]]) -> Document:
+        parts = []
+        for i, (sentence, _) in enumerate(chunk):
+            if i:
+                parts.append("\n\n" if sentence.paragraph_start else " ")
+            parts.append(sentence.text)
+        text = "".join(parts)
+
+        metadata = {}
+        pages = [sentence.page for sentence, _ in chunk if sentence.page is not None]
+        if pages:
+            metadata["page"], metadata["page_end"] = pages[0], pages[-1]
+        if chunk[0][0].section:
+            metadata["section"] = chunk[0][0].section
+
+        if vectors is not None and chunk[0][1] is not None:
+            weights = np.asarray([len(sentence.text) for sentence, _ in chunk], dtype=np.float32)
+            pooled = (np.stack([vector for _, vector in chunk]) * weights[:, None]).sum(axis=0)
+            vectors[text] = _unit(pooled).tolist()
+        return Document(page_content=text, metadata=metadata)
+
+
+def split_text_pages(text: str) -> List[Page]:
+    """Pages of plain text split at form feeds (as pdftotext writes them); a single page carries no number."""
+    pages = text.split("\f")
+    if len(pages) == 1:
+        return [(None, text)]
+    return [(number, page) for number, page in enumerate(pages, start=1)]
+
+
+def citation_label(metadata: dict) -> str:
+    """'[p. 3-4, §2.1 Results]' for a chunk's metadata, or '' when it has neither pages nor a section."""
+    parts = []
+    if metadata.get("page") is not None:
+        page, page_end = metadata["page"], metadata.get("page_end", metadata["page"])
+        parts.append(f"p. {page}" if page_end == page else f"p. {page}-{page_end}")
+    if metadata.get("section"):
+        parts.append(f"§{metadata['section']}")
+    return f"[{', '.join(parts)}]" if parts else ""
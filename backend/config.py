@@ -10,4 +10,144 @@ GROQ_API_KEY=os.getenv("GROQ_API_KEY")
 PINECONE_API_KEY=os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME=os.getenv("PINECONE_INDEX_NAME","axonbot-index")
 DOC_SOURCE_DIR=os.getenv("DOC_SOURCE_DIR","data")
-EMBED_MODEL=os.getenv("EMBED_MODEL","sentence-transformers/all-mpnet-base-v2")
\ No newline at end of file
+EMBED_MODEL=os.getenv("EMBED_MODEL","sentence-transformers/all-mpnet-base-v2")
+
+# "pinecone" (managed service) or "local" (in-process NumPy index on disk)
+VECTOR_BACKEND=os.getenv("VECTOR_BACKEND","pinecone")
+LOCAL_INDEX_DIR=os.getenv("LOCAL_INDEX_DIR","data/index")
+# "float32" or "int8" (per-row quantized, 4x smaller)
+LOCAL_INDEX_DTYPE=os.getenv("LOCAL_INDEX_DTYPE","float32")
+
+# Content-addressed embedding cache shared by chunk and query embedding
+EMBED_CACHE_ENABLED=os.getenv("EMBED_CACHE_ENABLED","true").lower()=="true"
+EMBED_CACHE_PATH=os.getenv("EMBED_CACHE_PATH","data/embedding_cache.sqlite")
+EMBED_CACHE_MAX_ENTRIES=int(os.getenv("EMBED_CACHE_MAX_ENTRIES","200000"))
+EMBED_CACHE_HOT_ENTRIES=int(os.getenv("EMBED_CACHE_HOT_ENTRIES","10000"))
+
+# Upload/ingestion pipeline
+UPLOAD_CHUNK_SIZE=int(os.getenv("UPLOAD_CHUNK_SIZE",str(1024*1024)))
+INGEST_WORKERS=int(os.getenv("INGEST_WORKERS",str(os.cpu_count() or 1)))
+INGEST_PAGES_PER_TASK=int(os.getenv("INGEST_PAGES_PER_TASK","16"))
+# How the shared PDF parsing pool starts its workers: "spawn" or "forkserver" (forking a threaded server can deadlock)
+INGEST_MP_START_METHOD=os.getenv("INGEST_MP_START_METHOD","spawn")
+EMBED_BATCH_SIZE=int(os.getenv("EMBED_BATCH_SIZE","64"))
+# Chunking: "semantic" (sentence embeddings find topic shifts), "sentence" (sentence packing
+# only) or "recursive" (fixed 1000-character splits); the first two keep page ranges and sections
+CHUNKING_STRATEGY=os.getenv("CHUNKING_STRATEGY","semantic").lower()
+CHUNK_MAX_CHARS=int(os.getenv("CHUNK_MAX_CHARS","1200"))
+CHUNK_MIN_CHARS=int(os.getenv("CHUNK_MIN_CHARS","200"))
+# A chunk ends where neighbouring sentences are further apart than this percentile of recent distances
+CHUNK_BREAKPOINT_PERCENTILE=float(os.getenv("CHUNK_BREAKPOINT_PERCENTILE","90"))
+# "pooled" (semantic chunks reuse their sentence embeddings) or "embedded" (each chunk embedded again)
+CHUNK_VECTORS=os.getenv("CHUNK_VECTORS","pooled").lower()
+# Background ingestion jobs: uploads return a job id and are indexed by a bounded worker pool
+INGEST_JOBS_DB_PATH=os.getenv("INGEST_JOBS_DB_PATH","data/ingestion_jobs.sqlite")
+INGEST_MAX_CONCURRENT_JOBS=int(os.getenv("INGEST_MAX_CONCURRENT_JOBS","2"))
+INGEST_MAX_PENDING_JOBS=int(os.getenv("INGEST_MAX_PENDING_JOBS","16"))
+INGEST_JOB_RETENTION_SECONDS=float(os.getenv("INGEST_JOB_RETENTION_SECONDS","86400"))
+
+# Multi-document index: per-tenant/session namespaces and the chunk-id registry
+DEFAULT_NAMESPACE=os.getenv("DEFAULT_NAMESPACE","default")
+DOCUMENT_REGISTRY_PATH=os.getenv("DOCUMENT_REGISTRY_PATH","data/documents.sqlite")
+
+# Semantic answer cache in front of the agent graph
+ANSWER_CACHE_ENABLED=os.getenv("ANSWER_CACHE_ENABLED","true").lower()=="true"
+ANSWER_CACHE_THRESHOLD=float(os.getenv("ANSWER_CACHE_THRESHOLD","0.95"))
+ANSWER_CACHE_MAX_ENTRIES=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES","5000"))
+ANSWER_CACHE_TTL_SECONDS=float(os.getenv("ANSWER_CACHE_TTL_SECONDS","86400"))
+ANSWER_CACHE_WEB_TTL_SECONDS=float(os.getenv("ANSWER_CACHE_WEB_TTL_SECONDS","900"))
+
+# Local embedding-based pre-router that can skip the router LLM call
+FAST_ROUTER_ENABLED=os.getenv("FAST_ROUTER_ENABLED","true").lower()=="true"
+FAST_ROUTER_MIN_SIMILARITY=float(os.getenv("FAST_ROUTER_MIN_SIMILARITY","0.6"))
+FAST_ROUTER_MIN_MARGIN=float(os.getenv("FAST_ROUTER_MIN_MARGIN","0.1"))
+
+# Speculative retrieval: start lookups concurrently with the router call (opt-in)
+SPECULATIVE_RETRIEVAL=os.getenv("SPECULATIVE_RETRIEVAL","false").lower()=="true"
+SPECULATIVE_WEB_SEARCH=os.getenv("SPECULATIVE_WEB_SEARCH","false").lower()=="true"
+
+# Score-based RAG sufficiency: clear cases skip the judge LLM
+RAG_SUFFICIENT_SCORE=float(os.getenv("RAG_SUFFICIENT_SCORE","0.75"))
+RAG_INSUFFICIENT_SCORE=float(os.getenv("RAG_INSUFFICIENT_SCORE","0.3"))
+
+# Tavily result cache (normalized query -> results)
+WEB_SEARCH_CACHE_SIZE=int(os.getenv("WEB_SEARCH_CACHE_SIZE","1024"))
+WEB_SEARCH_CACHE_TTL_SECONDS=float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS","300"))
+
+# Persistent, bounded conversation checkpointer (shared by all uvicorn workers)
+CHECKPOINT_DB_PATH=os.getenv("CHECKPOINT_DB_PATH","data/checkpoints.sqlite")
+CHECKPOINT_MAX_THREADS=int(os.getenv("CHECKPOINT_MAX_THREADS","10000"))
+CHECKPOINT_THREAD_TTL_SECONDS=float(os.getenv("CHECKPOINT_THREAD_TTL_SECONDS","604800"))
+CHECKPOINT_MAX_PER_THREAD=int(os.getenv("CHECKPOINT_MAX_PER_THREAD","20"))
+CHECKPOINT_HOT_CACHE_SIZE=int(os.getenv("CHECKPOINT_HOT_CACHE_SIZE","256"))
+
+# Token-budgeted context packing for the judge and answer prompts ("model=tokens,...")
+CONTEXT_TOKEN_BUDGETS=os.getenv("CONTEXT_TOKEN_BUDGETS","llama-3.3-70b-versatile=2000,gemini-2.5-flash=4000")
+CONTEXT_TOKEN_BUDGET_DEFAULT=int(os.getenv("CONTEXT_TOKEN_BUDGET_DEFAULT","3000"))
+
+# Hybrid retrieval: BM25 (SQLite FTS5) fused with dense results by reciprocal rank fusion
+HYBRID_SEARCH_ENABLED=os.getenv("HYBRID_SEARCH_ENABLED","true").lower()=="true"
+LEXICAL_INDEX_DIR=os.getenv("LEXICAL_INDEX_DIR","data/lexical")
+RRF_K=int(os.getenv("RRF_K","60"))
+
+# Optional local cross-encoder rerank of the retrieved candidates
+RERANK_ENABLED=os.getenv("RERANK_ENABLED","false").lower()=="true"
+RERANK_MODEL=os.getenv("RERANK_MODEL","cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES=int(os.getenv("RERANK_CANDIDATES","20"))
+RERANK_TOP_N=int(os.getenv("RERANK_TOP_N","3"))
+RERANK_BATCH_SIZE=int(os.getenv("RERANK_BATCH_SIZE","32"))
+RERANK_CACHE_SIZE=int(os.getenv("RERANK_CACHE_SIZE","10000"))
+
+# Load models and clients in the background at startup (otherwise on first use)
+WARM_UP_ON_STARTUP=os.getenv("WARM_UP_ON_STARTUP","true").lower()=="true"
+
+# Embedding service: micro-batch concurrent calls; optionally run an ONNX/OpenVINO (e.g. int8) export
+EMBED_MICROBATCH_ENABLED=os.getenv("EMBED_MICROBATCH_ENABLED","true").lower()=="true"
+EMBED_MICROBATCH_MAX_SIZE=int(os.getenv("EMBED_MICROBATCH_MAX_SIZE","32"))
+EMBED_MICROBATCH_MAX_WAIT_MS=float(os.getenv("EMBED_MICROBATCH_MAX_WAIT_MS","5"))
+EMBED_MICROBATCH_TIMEOUT_SECONDS=float(os.getenv("EMBED_MICROBATCH_TIMEOUT_SECONDS","60"))
+EMBED_RUNTIME=os.getenv("EMBED_RUNTIME","torch")
+EMBED_RUNTIME_FILE=os.getenv("EMBED_RUNTIME_FILE","")
+
+# Logging and metrics
+LOG_LEVEL=os.getenv("LOG_LEVEL","INFO")
+LOG_JSON=os.getenv("LOG_JSON","false").lower()=="true"
+# USD per million input/output tokens, for the cost metric ("model=input/output,...")
+LLM_PRICES_PER_MTOK=os.getenv("LLM_PRICES_PER_MTOK","gemini-2.5-flash=0.30/2.50,llama-3.3-70b-versatile=0.59/0.79")
+
+# Provider execution layer: rate limits, bounded concurrency, deadlines, retries, hedging
+# "provider=requests per second/burst/max concurrent calls/max queued calls,..."
+PROVIDER_LIMITS=os.getenv("PROVIDER_LIMITS","google=10/20/16/64,groq=0.5/5/4/32,tavily=5/10/8/32")
+PROVIDER_LIMIT_DEFAULT=os.getenv("PROVIDER_LIMIT_DEFAULT","10/20/16/64")
+# End-to-end deadline of one logical call (queueing and retries included), by role
+CALL_DEADLINES_SECONDS=os.getenv("CALL_DEADLINES_SECONDS","router=10,judge=10,answer=60,web=15")
+CALL_DEADLINE_DEFAULT_SECONDS=float(os.getenv("CALL_DEADLINE_DEFAULT_SECONDS","30"))
+PROVIDER_MAX_ATTEMPTS=int(os.getenv("PROVIDER_MAX_ATTEMPTS","3"))
+PROVIDER_RETRY_BASE_SECONDS=float(os.getenv("PROVIDER_RETRY_BASE_SECONDS","0.25"))
+PROVIDER_RETRY_MAX_SECONDS=float(os.getenv("PROVIDER_RETRY_MAX_SECONDS","4"))
+# Send a duplicate request when a call outlives the role's observed p95 latency (never for the streamed answer role)
+HEDGE_ENABLED=os.getenv("HEDGE_ENABLED","false").lower()=="true"
+HEDGE_ROLES=os.getenv("HEDGE_ROLES","router,judge,web")
+HEDGE_PERCENTILE=float(os.getenv("HEDGE_PERCENTILE","95"))
+HEDGE_MIN_SAMPLES=int(os.getenv("HEDGE_MIN_SAMPLES","20"))
+# Model cascade for the judge and answer roles: a small tier first, escalating to larger ones (opt-in)
+CASCADE_ENABLED=os.getenv("CASCADE_ENABLED","false").lower()=="true"
+# Tiers from small to large, comma separated; each is "provider:model", with "|" before failover alternates
+JUDGE_CASCADE=os.getenv("JUDGE_CASCADE","groq:llama-3.1-8b-instant,groq:llama-3.3-70b-versatile|google:gemini-2.5-flash")
+ANSWER_CASCADE=os.getenv("ANSWER_CASCADE","google:gemini-2.5-flash-lite,google:gemini-2.5-flash|groq:llama-3.3-70b-versatile")
+# Escalate past a judge verdict whose self-reported confidence is below this
+JUDGE_CASCADE_MIN_CONFIDENCE=float(os.getenv("JUDGE_CASCADE_MIN_CONFIDENCE","0.7"))
+# Confidence assumed for a verdict that leaves it out
+JUDGE_DEFAULT_CONFIDENCE=float(os.getenv("JUDGE_DEFAULT_CONFIDENCE","0.8"))
+# Skip the small tier when the packed context exceeds this many tokens, by role (below the packing budgets)
+CASCADE_SMALL_TIER_MAX_TOKENS=os.getenv("CASCADE_SMALL_TIER_MAX_TOKENS","judge=1200,answer=3000")
+# Fail over to a tier's alternate while the primary's observed latency percentile exceeds the role's SLO
+LATENCY_SLO_SECONDS=os.getenv("LATENCY_SLO_SECONDS","judge=3,answer=20")
+LATENCY_SLO_PERCENTILE=float(os.getenv("LATENCY_SLO_PERCENTILE","95"))
+# Share of calls still sent to a primary that is over its SLO, so its latency statistics recover
+LATENCY_SLO_PROBE_RATIO=float(os.getenv("LATENCY_SLO_PROBE_RATIO","0.05"))
+# /execute-batch: items per request, and items run at once by default (capped by AGENT_MAX_INFLIGHT)
+BATCH_MAX_ITEMS=int(os.getenv("BATCH_MAX_ITEMS","1000"))
+BATCH_DEFAULT_CONCURRENCY=int(os.getenv("BATCH_DEFAULT_CONCURRENCY","8"))
+# Requests /execute and /execute-stream run at once before new ones get a 503 (0: unlimited)
+AGENT_MAX_INFLIGHT=int(os.getenv("AGENT_MAX_INFLIGHT","100"))
@@ -0,0 +1,187 @@
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken when its encoding can be loaded, otherwise
+    falls back to a ~4 characters per token estimate. The deployed models are
+    Gemini and Llama, so either way this is an approximation used for budgeting,
+    not billing.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get_encoding(self):
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                try:
+                    import tiktoken
+                    self._encoding = tiktoken.get_encoding(self.encoding_name)
+                except Exception as e:
+                    logger.warning("tiktoken encoding unavailable (%s); estimating tokens from characters.", type(e).__name__)
+            return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return -(-len(text) // self.CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        encoding = self._get_encoding()
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            cut = encoding.decode(tokens[:max_tokens])
+        else:
+            limit = max_tokens * self.CHARS_PER_TOKEN
+            if len(text) <= limit:
+                return text
+            cut = text[:limit]
+        # Don't end mid-word.
+        boundary = cut.rfind(" ")
+        return (cut[:boundary] if boundary > len(cut) // 2 else cut).rstrip() + " ..."
+
+
+token_counter = TokenCounter()
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """Parses 'model-a=2000,model-b=4000' into {'model-a': 2000, 'model-b': 4000}."""
+    budgets = {}
+    for item in spec.split(","):
+        if "=" in item:
+            model, tokens = item.split("=", 1)
+            budgets[model.strip()] = int(tokens)
+    return budgets
+
+
+def _overlap_length(head: str, tail: str, min_overlap: int, max_overlap: int) -> int:
+    """Length of the longest suffix of `head` that is also a prefix of `tail`."""
+    for size in range(min(len(head), len(tail), max_overlap), min_overlap - 1, -1):
+        if head.endswith(tail[:size]):
+            return size
+    return 0
+
+
+def remove_overlaps(passages: Sequence[str], min_overlap: int = 32, max_overlap: int = 1000,
+                    labels: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Drops text a passage repeats from a passage earlier in the list: exact
+    duplicates and contained passages are removed, and spans shared with a
+    neighbour through the splitter's chunk_overlap are trimmed. Order is kept,
+    so pass passages best first and the more relevant copy survives.
+
+    labels (one per passage, such as a page citation) are put in front of the
+    passages that survive, after the overlaps are compared.
+    """
+    kept: List[str] = []
+    kept_labels: List[str] = []
+    for index, text in enumerate(passages):
+        text = text.strip()
+        for other in kept:
+            if not text or text in other:
+                text = ""
+                break
+            # `other` precedes `text` in the source: drop the repeated head of `text`.
+            size = _overlap_length(other, text, min_overlap, max_overlap)
+            if size:
+                text = text[size:].lstrip()
+            # `text` precedes `other` in the source: drop the repeated tail of `text`.
+            size = _overlap_length(text, other, min_overlap, max_overlap)
+            if size:
+                text = text[:-size].rstrip()
+        if text:
+            kept.append(text)
+            kept_labels.append(labels[index] if labels else "")
+    return [f"{label} {text}" if label else text for label, text in zip(kept_labels, kept)]
+
+
+def split_web_results(web: str) -> List[str]:
+    """Splits web_search_tool output back into one passage per result, in relevance order."""
+    if not web.strip():
+        return []
+    return [p if i == 0 else "Title: " + p for i, p in enumerate(re.split(r"\n\nTitle: ", web.strip()))]
+
+
+@dataclass
+class PackedContext:
+    sections: Dict[str, List[str]] = field(default_factory=dict)
+    tokens: int = 0
+    dropped: int = 0
+    truncated: int = 0
+
+    def render(self, labels: Optional[Dict[str, str]] = None) -> str:
+        parts = []
+        for name, passages in self.sections.items():
+            if passages:
+                body = "\n\n".join(passages)
+                parts.append(f"{labels[name]}\n{body}" if labels and name in labels else body)
+        return "\n\n".join(parts)
+
+
+def pack_context(sections: Sequence[Tuple[str, Sequence[str]]], budget: int,
+                 counter: TokenCounter = token_counter, min_truncated_tokens: int = 64) -> PackedContext:
+    """
+    Fills a token budget from ranked sections of passages (each list best first).
+
+    Every non-empty section is first given an equal share of the budget, so one
+    source cannot crowd out the other; whatever a section leaves unused is then
+    handed out to the remaining passages in rank order. In that second pass a
+    passage that does not fit is cut to the remaining budget if at least
+    min_truncated_tokens remain.
+    """
+    sections = [(name, list(passages)) for name, passages in sections]
+    packed = PackedContext(sections={name: [] for name, _ in sections})
+    pending = {name: [(text, counter.count(text)) for text in passages] for name, passages in sections}
+    remaining = budget
+
+    def take(name: str, allowance: int, allow_truncation: bool) -> int:
+        nonlocal remaining
+        used = 0
+        queue = pending[name]
+        while queue and used < allowance:
+            text, tokens = queue[0]
+            if tokens <= allowance - used:
+                queue.pop(0)
+            elif allow_truncation and allowance - used >= min_truncated_tokens:
+                queue.pop(0)
+                text = counter.truncate(text, allowance - used - 2)
+                tokens = counter.count(text)
+                packed.truncated += 1
+            else:
+                break
+            packed.sections[name].append(text)
+            used += tokens
+        remaining -= used
+        return used
+
+    active = [name for name, _ in sections if pending[name]]
+    if active:
+        share = budget // len(active)
+        for name in active:
+            take(name, share, allow_truncation=False)
+        for name in active:
+            if remaining <= 0:
+                break
+            take(name, remaining, allow_truncation=True)
+
+    packed.tokens = budget - remaining
+    packed.dropped = sum(len(queue) for queue in pending.values())
+    return packed
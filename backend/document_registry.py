@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Set
+
+
+class DocumentRegistry:
+    """
+    Tracks which chunk ids belong to which document in each namespace, so a
+    re-upload can be diffed against what is already in the vector store.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                namespace TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                filename TEXT,
+                chunk_count INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, document_id)
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                namespace TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                PRIMARY KEY (namespace, document_id, chunk_id)
+            );
+            CREATE TABLE IF NOT EXISTS namespaces (
+                namespace TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def get_chunk_ids(self, namespace: str, document_id: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE namespace = ? AND document_id = ?", (namespace, document_id)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def replace(self, namespace: str, document_id: str, filename: Optional[str], chunk_ids: Set[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE namespace = ? AND document_id = ?", (namespace, document_id))
+            self._conn.executemany(
+                "INSERT INTO chunks (namespace, document_id, chunk_id) VALUES (?, ?, ?)",
+                [(namespace, document_id, chunk_id) for chunk_id in chunk_ids],
+            )
+            self._conn.execute(
+                "INSERT INTO documents (namespace, document_id, filename, chunk_count, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(namespace, document_id) DO UPDATE SET "
+                "filename = excluded.filename, chunk_count = excluded.chunk_count, updated_at = excluded.updated_at",
+                (namespace, document_id, filename, len(chunk_ids), now, now),
+            )
+            self._conn.commit()
+
+    def get_version(self, namespace: str) -> int:
+        """Knowledge-base version of a namespace; bumped on every content change."""
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM namespaces WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, namespace: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO namespaces (namespace, version) VALUES (?, 1) "
+                "ON CONFLICT(namespace) DO UPDATE SET version = version + 1",
+                (namespace,),
+            )
+            self._conn.commit()
+
+    def list_documents(self, namespace: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document_id, filename, chunk_count, created_at, updated_at FROM documents "
+                "WHERE namespace = ? ORDER BY updated_at DESC",
+                (namespace,),
+            ).fetchall()
+        return [
+            {"document_id": r[0], "filename": r[1], "chunk_count": r[2], "created_at": r[3], "updated_at": r[4]}
+            for r in rows
+        ]
+
+    def delete(self, namespace: str, document_id: str) -> Optional[Set[str]]:
+        """Removes the document and returns its chunk ids, or None if it was unknown."""
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM documents WHERE namespace = ? AND document_id = ?", (namespace, document_id)
+            ).fetchone()
+            if not exists:
+                return None
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE namespace = ? AND document_id = ?", (namespace, document_id)
+            ).fetchall()
+            self._conn.execute("DELETE FROM chunks WHERE namespace = ? AND document_id = ?", (namespace, document_id))
+            self._conn.execute("DELETE FROM documents WHERE namespace = ? AND document_id = ?", (namespace, document_id))
+            self._conn.commit()
+        return {row[0] for row in rows}
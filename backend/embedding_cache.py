@@ -0,0 +1,182 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from metrics import CACHE_REQUESTS
+
+
+def embedding_cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier, content-addressed store for embedding vectors.
+
+    The hot tier is an in-process LRU dict; the cold tier is a SQLite table on
+    disk bounded to max_entries, evicting the least recently used rows.
+
+    Lookups stay off the write path: access times are buffered in memory and
+    written in batches of access_flush_size (or every access_flush_seconds),
+    and rows are only counted and evicted once inserts push the table
+    evict_slack rows past max_entries, then back down to max_entries.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200_000, hot_entries: int = 10_000,
+                 evict_slack: Optional[int] = None, access_flush_size: int = 256,
+                 access_flush_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.hot_entries = hot_entries
+        self.evict_slack = max(1, max_entries // 20) if evict_slack is None else evict_slack
+        self.access_flush_size = access_flush_size
+        self.access_flush_seconds = access_flush_seconds
+        self._hot: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> last access time not yet written to SQLite
+        self._pending_access: Dict[str, float] = {}
+        self._last_access_flush = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        # Approximate: other processes sharing the file also insert, so it is re-read before evicting.
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._hot[key] = vector
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_entries:
+            self._hot.popitem(last=False)
+
+    def _touch_locked(self, keys: List[str]):
+        now = time.time()
+        for key in keys:
+            self._pending_access[key] = now
+        if (len(self._pending_access) >= self.access_flush_size
+                or time.monotonic() - self._last_access_flush >= self.access_flush_seconds):
+            self._flush_access_locked()
+            self._conn.commit()
+
+    def _flush_access_locked(self):
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(at, key) for key, at in self._pending_access.items()],
+            )
+            self._pending_access.clear()
+        self._last_access_flush = time.monotonic()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._hot:
+                    self._hot.move_to_end(key)
+                    found[key] = self._hot[key]
+                else:
+                    missing.append(key)
+
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f", blob).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+
+            # Hot hits count as accesses too, so their rows are not evicted as cold.
+            if found:
+                self._touch_locked(list(found))
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            # Keys are content-addressed, so an existing row already holds the same vector.
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+            )
+            self._count += max(cursor.rowcount, 0)
+            if self._count > self.max_entries + self.evict_slack:
+                self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        self._flush_access_locked()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = self._count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+            self._count -= overflow
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model so that documents and queries whose
+    (model name, text) pair was already embedded skip the forward pass.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, cache: EmbeddingCache):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [embedding_cache_key(self.model_name, text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once, even if it repeats in the batch.
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        CACHE_REQUESTS.inc("embedding", "hit", amount=len(texts) - len(missing))
+        CACHE_REQUESTS.inc("embedding", "miss", amount=len(missing))
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = embedding_cache_key(self.model_name, text)
+        cached: Optional[List[float]] = self.cache.get_many([key]).get(key)
+        if cached is not None:
+            CACHE_REQUESTS.inc("embedding", "hit")
+            return cached
+
+        CACHE_REQUESTS.inc("embedding", "miss")
+        vector = self.underlying.embed_query(text)
+        self.cache.put_many({key: vector})
+        return vector
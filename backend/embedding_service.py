@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Coalesces concurrent embed_query/embed_documents calls into one batched
+    forward pass of the underlying model.
+
+    Callers block on a future while a single worker thread drains the queue:
+    it waits at most max_wait_ms after the first request for others to arrive,
+    up to max_batch_size texts, embeds them in one call and hands each caller
+    its slice. Calls that already fill a batch (ingestion) skip the queue.
+
+    Queries are embedded through embed_documents, which is only equivalent for
+    symmetric models without a query instruction, such as all-mpnet-base-v2.
+    Set queries_as_documents=False for asymmetric models; their queries then
+    bypass batching.
+
+    Whatever the model raises is handed to every caller of that batch and the
+    worker carries on; callers give up after timeout_seconds regardless.
+    """
+
+    def __init__(self, underlying: Embeddings, max_batch_size: int = 32, max_wait_ms: float = 5,
+                 queries_as_documents: bool = True, timeout_seconds: float = 60):
+        self.underlying = underlying
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.timeout_seconds = timeout_seconds
+        self.queries_as_documents = queries_as_documents
+        self.batches = 0
+        self.batched_texts = 0
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            # Also replaces a worker that died, so queued requests are never stranded.
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-microbatcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[_Request]:
+        requests = [self._queue.get()]
+        size = len(requests[0].texts)
+        deadline = time.monotonic() + self.max_wait_seconds
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            requests.append(request)
+            size += len(request.texts)
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            texts = [text for request in requests for text in request.texts]
+            try:
+                vectors = self.underlying.embed_documents(texts)
+            except BaseException as e:
+                # BaseException too (KeyboardInterrupt, SystemExit from the model):
+                # the worker must outlive it, or every later caller waits forever.
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_texts += len(texts)
+            offset = 0
+            for request in requests:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+    def _submit(self, texts: List[str]) -> List[List[float]]:
+        self._ensure_worker()
+        request = _Request(texts=list(texts))
+        self._queue.put(request)
+        return request.future.result(timeout=self.timeout_seconds)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return round(self.batched_texts / self.batches, 2) if self.batches else 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch_size:
+            return self.underlying.embed_documents(texts)
+        return self._submit(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        if not self.queries_as_documents:
+            return self.underlying.embed_query(text)
+        return self._submit([text])[0]
@@ -0,0 +1,136 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+@dataclass
+class Intent:
+    route: str
+    examples: List[str]
+    reply: Optional[str] = None
+
+
+# Seeded from the examples in the router system prompt (agent.AxonBotAgent._router_messages).
+INTENTS: Dict[str, Intent] = {
+    "greeting": Intent(
+        route="end",
+        reply="Hello! How can I assist you today?",
+        examples=[
+            "Hi", "Hello", "Hello there!", "Hey", "Hey there", "Good morning", "Good evening",
+            "How are you?", "How are you doing today?", "What's up?", "Thanks!", "Thank you so much",
+            "Bye", "See you later", "Nice to meet you",
+        ],
+    ),
+    "identity": Intent(
+        route="end",
+        reply=(
+            "I'm AxonBot, an AI RAG agent. I answer your questions using the documents in my knowledge "
+            "base and, when it's enabled, live web search."
+        ),
+        examples=[
+            "Who are you?", "What are you?", "What is your name?", "Tell me about yourself",
+            "Are you a bot?", "What can you do?", "Introduce yourself",
+        ],
+    ),
+    "rag": Intent(
+        route="rag",
+        examples=[
+            "What are the treatment of diabetes?", "What is the capital of France?",
+            "How do I submit an expense report?", "Tell me about quantum computing.",
+            "Explain the refund policy", "How does the onboarding process work?",
+            "What does the document say about security requirements?", "Summarize the uploaded report",
+        ],
+    ),
+    "web": Intent(
+        route="web",
+        examples=[
+            "Who won the NBA finals last night?", "Who won the election yesterday?",
+            "What is the weather in London?", "Latest news on technology", "What is the stock price of Apple today?",
+            "What happened in the news this morning?", "Live score of the cricket match",
+        ],
+    ),
+}
+
+
+@dataclass
+class FastRouteDecision:
+    route: str
+    intent: str
+    confidence: float
+    margin: float
+    reply: Optional[str] = None
+
+
+class FastRouter:
+    """
+    Nearest-centroid classifier over labeled example utterances, using the
+    same sentence embedding model as the vector store. It only answers when
+    the best intent is both similar enough and clearly ahead of the closest
+    intent with a different route; otherwise the LLM router decides.
+    """
+
+    def __init__(self, embedding: Embeddings, min_similarity: float = 0.6, min_margin: float = 0.1,
+                 intents: Dict[str, Intent] = INTENTS):
+        self.embedding = embedding
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.intents = intents
+        self._centroids: Optional[np.ndarray] = None
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+
+    def _get_centroids(self) -> np.ndarray:
+        with self._lock:
+            if self._centroids is None:
+                names, centroids = [], []
+                for name, intent in self.intents.items():
+                    vectors = np.asarray(self.embedding.embed_documents(intent.examples), dtype=np.float32)
+                    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                    centroid = vectors.mean(axis=0)
+                    centroids.append(centroid / np.linalg.norm(centroid))
+                    names.append(name)
+                self._names = names
+                self._centroids = np.stack(centroids)
+            return self._centroids
+
+    def warm_up(self):
+        self._get_centroids()
+
+    def route(self, query: str, web_search_enabled: bool = True) -> Optional[FastRouteDecision]:
+        if not query.strip():
+            return None
+
+        centroids = self._get_centroids()
+        vector = np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        scores = centroids @ (vector / norm)
+
+        candidates = [
+            i for i, name in enumerate(self._names)
+            if web_search_enabled or self.intents[name].route != "web"
+        ]
+        candidates.sort(key=lambda i: scores[i], reverse=True)
+        best = candidates[0]
+        best_intent = self.intents[self._names[best]]
+        runner_up = next(
+            (scores[i] for i in candidates[1:] if self.intents[self._names[i]].route != best_intent.route),
+            -1.0,
+        )
+
+        confidence = float(scores[best])
+        margin = float(confidence - runner_up)
+        if confidence < self.min_similarity or margin < self.min_margin:
+            return None
+
+        return FastRouteDecision(
+            route=best_intent.route,
+            intent=self._names[best],
+            confidence=confidence,
+            margin=margin,
+            reply=best_intent.reply,
+        )
@@ -0,0 +1,137 @@
+import logging
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import UploadFile
+from pypdf import PdfReader
+
+from config import INGEST_WORKERS, INGEST_PAGES_PER_TASK, INGEST_MP_START_METHOD, UPLOAD_CHUNK_SIZE, DEFAULT_NAMESPACE
+from lazy import LazyComponent
+from vectorstore import ProgressCallback, index_document, split_pages
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionResult:
+    pages: int
+    preview: str
+    index_stats: dict
+
+
+async def save_upload_to_disk(file: UploadFile, suffix: str = ".pdf") -> str:
+    """Copies the upload to a temp file in fixed-size chunks instead of reading it whole."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                tmp_file.write(chunk)
+        except BaseException:
+            # The caller never gets the path, so nobody else could remove the file.
+            tmp_file.close()
+            os.unlink(tmp_file.name)
+            raise
+        return tmp_file.name
+
+
+def _create_parse_pool() -> ProcessPoolExecutor:
+    # Workers are started with spawn/forkserver, never forked from this
+    # multi-threaded server process, and are shared by every upload. They are
+    # started here (during warm-up) so the first upload does not pay for it.
+    pool = ProcessPoolExecutor(max_workers=max(1, INGEST_WORKERS), mp_context=get_context(INGEST_MP_START_METHOD))
+    # With a single worker pages are parsed in-process and the pool stays empty.
+    for future in [pool.submit(os.getpid) for _ in range(INGEST_WORKERS if INGEST_WORKERS > 1 else 0)]:
+        future.result()
+    return pool
+
+parse_pool=LazyComponent("pdf_parse_pool", _create_parse_pool)
+
+
+def shutdown_parse_pool():
+    if parse_pool.initialized:
+        parse_pool.get().shutdown(wait=True, cancel_futures=True)
+
+
+def _extract_pages(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    # Runs in a worker process: each worker opens its own reader over the file.
+    reader = PdfReader(path)
+    return [(page_number, reader.pages[page_number].extract_text() or "") for page_number in range(start, end)]
+
+
+def pdf_page_count(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def iter_pdf_pages(path: str, page_count: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (page_number, text) in page order, parsing page ranges across the
+    shared process pool. At most 2 ranges per worker are in flight, so memory
+    stays flat regardless of the document length.
+    """
+    if page_count is None:
+        page_count = pdf_page_count(path)
+    ranges = [(start, min(start + INGEST_PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, INGEST_PAGES_PER_TASK)]
+
+    if len(ranges) <= 1 or INGEST_WORKERS <= 1:
+        for start, end in ranges:
+            yield from _extract_pages(path, start, end)
+        return
+
+    pool = parse_pool.get()
+    pending = deque()
+    remaining = iter(ranges)
+    try:
+        for start, end in remaining:
+            pending.append(pool.submit(_extract_pages, path, start, end))
+            if len(pending) >= INGEST_WORKERS * 2:
+                break
+
+        while pending:
+            pages = pending.popleft().result()
+            next_range = next(remaining, None)
+            if next_range:
+                pending.append(pool.submit(_extract_pages, path, *next_range))
+            yield from pages
+    finally:
+        # A cancelled or failed ingestion leaves no work behind in the shared pool.
+        for future in pending:
+            future.cancel()
+
+
+def ingest_pdf(path: str, document_id: str, namespace: str = DEFAULT_NAMESPACE,
+               filename: str | None = None, progress: Optional[ProgressCallback] = None) -> IngestionResult:
+    """
+    Page-streaming ingestion: pages are parsed lazily, chunked by split_pages
+    (chunks cite the pages they come from) and handed to the vector store as a
+    stream. Only chunks that are new for this document are upserted, in
+    fixed-size batches, with the vectors pooled while chunking where there are.
+
+    progress, if given, is called with ("pages_total", n) once, then with
+    ("pages_parsed", 1) per page and the vector store's stage counts.
+    """
+    stats = {"pages": 0}
+    preview_parts: List[str] = []
+    page_count = pdf_page_count(path)
+    if progress:
+        progress("pages_total", page_count)
+
+    def page_stream() -> Iterator[Tuple[int, str]]:
+        for page_number, text in iter_pdf_pages(path, page_count):
+            stats["pages"] += 1
+            if progress:
+                progress("pages_parsed", 1)
+            if sum(len(p) for p in preview_parts) < 500:
+                preview_parts.append(text)
+            yield page_number + 1, text
+
+    documents, vectors = split_pages(page_stream())
+    index_stats = index_document(documents, document_id, namespace=namespace, filename=filename,
+                                 progress=progress, vectors=vectors)
+    preview = "\n\n".join(preview_parts)[:500]
+    logger.info("Ingested %d pages into %d chunks from %s", stats["pages"], index_stats["chunks_total"], os.path.basename(path))
+    return IngestionResult(pages=stats["pages"], preview=preview, index_stats=index_stats)
@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("pages_total", "pages_parsed", "chunks_split", "chunks_embedded", "vectors_upserted")
+
+# Reported by index_document right before the new version replaces the old one. Past it a job
+# can no longer be cancelled (its status is "finalizing") and DELETE /jobs/{id} answers 409.
+COMMIT_STAGE = "committing"
+ACTIVE_STATUSES = ("queued", "running", "finalizing")
+
+# Progress is written to SQLite (and the cancel flag read back) at most this often per job.
+PROGRESS_FLUSH_SECONDS = 0.5
+
+
+class IngestionCancelled(Exception):
+    """Raised from the progress callback to abort a job whose cancellation was requested."""
+
+
+class JobQueueFull(Exception):
+    """Every worker is busy and the pending queue is at its limit."""
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_file(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+        logger.debug("Cleaned up temporary file: %s", path)
+
+
+class JobStore:
+    """
+    Ingestion job records in SQLite, so every API worker process can report
+    and cancel any job, whichever process runs it.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT,
+                document_id TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                progress TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                owner_pid INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+            """
+        )
+        self._conn.commit()
+
+    def create(self, job_id: str, filename: Optional[str], document_id: str, namespace: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, filename, document_id, namespace, created_at, progress, owner_pid) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, document_id, namespace, time.time(),
+                 json.dumps(dict.fromkeys(STAGES, 0)), os.getpid()),
+            )
+            self._conn.commit()
+
+    def update(self, job_id: str, **fields):
+        for key in ("progress", "result"):
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key])
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+            row = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Flags an active job for cancellation; False if it is unknown or already finished."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status IN ('queued', 'running')",
+                (job_id,),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def begin_finalizing(self, job_id: str) -> bool:
+        """
+        Moves a running job past the point where it can be cancelled; False if
+        a cancellation was requested first. Atomic with request_cancel, so a
+        request can no longer slip in between the last check and completion.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'finalizing' WHERE job_id = ? AND status = 'running' "
+                "AND cancel_requested = 0",
+                (job_id,),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def fail_orphaned(self) -> int:
+        """
+        Marks active jobs whose owning process is gone (a crash or restart) as
+        failed. Runs before this process queues anything, so a job carrying our
+        own pid comes from an earlier process that had the same pid (containers).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, owner_pid FROM jobs WHERE status IN ('queued', 'running', 'finalizing')"
+            ).fetchall()
+            orphaned = [job_id for job_id, pid in rows if pid == os.getpid() or not _pid_alive(pid)]
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted by a server restart.', finished_at = ? "
+                "WHERE job_id = ?",
+                [(time.time(), job_id) for job_id in orphaned],
+            )
+            self._conn.commit()
+        return len(orphaned)
+
+    def purge_finished(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN ('queued', 'running', 'finalizing') AND finished_at < ?",
+                (older_than,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+
+class JobProgress:
+    """
+    The progress callback handed to ingest_pdf. Counts per stage are kept in
+    memory and flushed to the store at most every PROGRESS_FLUSH_SECONDS; each
+    flush also picks up a cancellation request and raises IngestionCancelled.
+    The COMMIT_STAGE report is the job's last chance to be cancelled: it
+    either moves the job to "finalizing" or raises IngestionCancelled, so
+    index_document rolls back. Called from both the ingestion thread and the
+    upsert thread.
+    """
+
+    def __init__(self, store: JobStore, job_id: str):
+        self._store = store
+        self._job_id = job_id
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = dict.fromkeys(STAGES, 0)
+        self._last_flush = 0.0
+
+    def __call__(self, stage: str, count: int):
+        if stage == COMMIT_STAGE:
+            self.flush()
+            if not self._store.begin_finalizing(self._job_id):
+                raise IngestionCancelled(self._job_id)
+            return
+        with self._lock:
+            if stage == "pages_total":
+                self.counts[stage] = count
+            else:
+                self.counts[stage] = self.counts.get(stage, 0) + count
+            now = time.monotonic()
+            if now - self._last_flush < PROGRESS_FLUSH_SECONDS:
+                return
+            self._last_flush = now
+            snapshot = dict(self.counts)
+        self._store.update(self._job_id, progress=snapshot)
+        if self._store.cancel_requested(self._job_id):
+            raise IngestionCancelled(self._job_id)
+
+    def flush(self):
+        with self._lock:
+            snapshot = dict(self.counts)
+        self._store.update(self._job_id, progress=snapshot)
+
+
+class IngestionJobManager:
+    """
+    Runs uploads as background jobs on a bounded thread pool: at most
+    max_concurrent ingest at once and at most max_pending wait behind them.
+    The uploaded file is owned by the job and removed when it finishes.
+    """
+
+    def __init__(self, store: JobStore, run: Callable[..., object], max_concurrent: int, max_pending: int,
+                 retention_seconds: float):
+        self.store = store
+        self._run = run
+        self._max_active = max(1, max_concurrent) + max(0, max_pending)
+        self._retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent), thread_name_prefix="ingest-job")
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        orphaned = store.fail_orphaned()
+        if orphaned:
+            logger.warning("Marked %d interrupted ingestion jobs as failed", orphaned)
+
+    def submit(self, path: str, document_id: str, namespace: str, filename: Optional[str]) -> dict:
+        with self._lock:
+            self._futures = {job_id: f for job_id, f in self._futures.items() if not f.done()}
+            if len(self._futures) >= self._max_active:
+                raise JobQueueFull(f"{len(self._futures)} ingestion jobs are already queued or running.")
+            job_id = uuid.uuid4().hex
+            self.store.create(job_id, filename, document_id, namespace)
+            future = self._executor.submit(self._execute, job_id, path, document_id, namespace, filename)
+            # A job cancelled before a worker picked it up never runs _execute, so clean up its file here.
+            future.add_done_callback(lambda f: f.cancelled() and _remove_file(path))
+            self._futures[job_id] = future
+        self.store.purge_finished(time.time() - self._retention_seconds)
+        logger.info("Queued ingestion job %s for %s", job_id, filename)
+        return self.store.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Requests cancellation. A queued job is dropped right away; a running
+        one stops at its next progress flush and rolls back what it indexed.
+        A finished or finalizing job is returned unchanged, with
+        cancel_requested still false.
+        """
+        if self.store.get(job_id) is None:
+            return None
+        if self.store.request_cancel(job_id):
+            with self._lock:
+                future = self._futures.get(job_id)
+            # Only succeeds while the job is still waiting for a worker.
+            if future is not None and future.cancel():
+                self.store.update(job_id, status="cancelled", finished_at=time.time())
+        return self.store.get(job_id)
+
+    def shutdown(self):
+        with self._lock:
+            active = list(self._futures)
+        for job_id in active:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True)
+
+    def _execute(self, job_id: str, path: str, document_id: str, namespace: str, filename: Optional[str]):
+        progress = JobProgress(self.store, job_id)
+        try:
+            if self.store.cancel_requested(job_id):
+                raise IngestionCancelled(job_id)
+            self.store.update(job_id, status="running", started_at=time.time())
+            result = self._run(path, document_id, namespace, filename, progress=progress)
+            progress.flush()
+            self.store.update(job_id, status="succeeded", finished_at=time.time(), result=result)
+            logger.info("Ingestion job %s finished: %s", job_id, result)
+        except IngestionCancelled:
+            progress.flush()
+            self.store.update(job_id, status="cancelled", finished_at=time.time())
+            logger.info("Ingestion job %s cancelled", job_id)
+        except Exception as e:
+            progress.flush()
+            self.store.update(job_id, status="failed", finished_at=time.time(), error=f"{type(e).__name__}: {e}")
+            logger.exception("Ingestion job %s failed: %s", job_id, e)
+        finally:
+            _remove_file(path)
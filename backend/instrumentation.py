@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from metrics import LLM_COST, LLM_DURATION, LLM_TOKENS, NODE_DURATION
+from config import LLM_PRICES_PER_MTOK
+
+
+def parse_prices(spec: str) -> Dict[str, Tuple[float, float]]:
+    """Parses 'model-a=0.30/2.50,...' into {'model-a': (input USD, output USD)} per million tokens."""
+    prices = {}
+    for item in spec.split(","):
+        if "=" in item and "/" in item:
+            model, pair = item.split("=", 1)
+            input_price, output_price = pair.split("/", 1)
+            prices[model.strip()] = (float(input_price), float(output_price))
+    return prices
+
+
+PRICES_PER_MTOK = parse_prices(LLM_PRICES_PER_MTOK)
+
+
+def _model_name(serialized: Optional[dict], metadata: Optional[dict], invocation_params: Optional[dict]) -> str:
+    for source in (metadata or {}, invocation_params or {}):
+        for key in ("ls_model_name", "model_name", "model"):
+            if source.get(key):
+                return str(source[key])
+    return (serialized or {}).get("name") or "unknown"
+
+
+def _token_usage(response: LLMResult) -> Tuple[int, int]:
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+    if not (input_tokens or output_tokens):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        input_tokens = usage.get("prompt_tokens", 0)
+        output_tokens = usage.get("completion_tokens", 0)
+    return input_tokens, output_tokens
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Feeds the metrics registry from LangChain callbacks: per-model LLM token
+    counts, estimated cost and call latency, and the wall time of every graph
+    node. Create one per request and pass it in the run config's callbacks;
+    the node timings it collects are also used for that request's trace events.
+
+    With record_updates, it also keeps each finished node's output in
+    node_updates, in completion order, for runs (like batches) that are not
+    streamed node by node.
+    """
+
+    # Handlers are cheap and thread-safe, so run them inline instead of in an executor.
+    run_inline = True
+
+    def __init__(self, record_updates: bool = False):
+        self.started_at = time.perf_counter()
+        self.record_updates = record_updates
+        self.node_updates: List[Tuple[str, Any]] = []
+        self._llm_runs: Dict[UUID, Tuple[float, str]] = {}
+        self._node_runs: Dict[UUID, Tuple[float, str]] = {}
+        self._node_timings: Dict[str, List[Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    # ---- LLM calls ----
+
+    def _llm_started(self, serialized, run_id, metadata, kwargs):
+        model = _model_name(serialized, metadata, kwargs.get("invocation_params"))
+        with self._lock:
+            self._llm_runs[run_id] = (time.perf_counter(), model)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID,
+                            metadata: Optional[dict] = None, **kwargs: Any):
+        self._llm_started(serialized, run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, *, run_id: UUID,
+                     metadata: Optional[dict] = None, **kwargs: Any):
+        self._llm_started(serialized, run_id, metadata, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        started, model = run
+        LLM_DURATION.observe(time.perf_counter() - started, model)
+
+        input_tokens, output_tokens = _token_usage(response)
+        LLM_TOKENS.inc(model, "input", amount=input_tokens)
+        LLM_TOKENS.inc(model, "output", amount=output_tokens)
+        if model in PRICES_PER_MTOK:
+            input_price, output_price = PRICES_PER_MTOK[model]
+            LLM_COST.inc(model, amount=(input_tokens * input_price + output_tokens * output_price) / 1_000_000)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._llm_runs.pop(run_id, None)
+
+    # ---- graph nodes ----
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs, *, run_id: UUID,
+                       metadata: Optional[dict] = None, **kwargs: Any):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run, not the runnables nested inside it.
+        if node and kwargs.get("name") == node:
+            with self._lock:
+                self._node_runs[run_id] = (time.perf_counter(), node)
+
+    def _node_finished(self, run_id: UUID, outputs: Any = None):
+        with self._lock:
+            run = self._node_runs.pop(run_id, None)
+            if run is None:
+                return
+            started, node = run
+            now = time.perf_counter()
+            self._node_timings.setdefault(node, []).append((now - started, now - self.started_at))
+            if self.record_updates and isinstance(outputs, dict):
+                self.node_updates.append((node, outputs))
+        NODE_DURATION.observe(now - started, node)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        self._node_finished(run_id, outputs)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._node_finished(run_id)
+
+    def pop_node_timing(self, node: str) -> Tuple[Optional[float], Optional[float]]:
+        """(duration_ms, elapsed_ms since the request started) of the node's oldest unreported run."""
+        with self._lock:
+            timings = self._node_timings.get(node)
+            if not timings:
+                return None, None
+            duration, elapsed = timings.pop(0)
+        return round(duration * 1000, 2), round(elapsed * 1000, 2)
@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class LazyComponent(Generic[T]):
+    """
+    A process-wide singleton created on first use instead of at import time.
+
+    Creation runs once under a lock, so concurrent first callers share a
+    single instance. A failed creation is recorded and retried on the next
+    call rather than killing the process. Every component registers itself
+    so warm_up() and readiness() can report on all of them; only required
+    ones gate is_ready(), so an optional feature (web search without a key,
+    say) cannot keep the service from becoming ready.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T], required: bool = True):
+        self.name = name
+        self._factory = factory
+        self.required = required
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        _registry[name] = self
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        if self._instance is not None:
+            return self._instance
+        with self._lock:
+            if self._instance is None:
+                start = time.perf_counter()
+                try:
+                    instance = self._factory()
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    logger.error("Failed to initialize %s: %s", self.name, self.error)
+                    raise
+                self.init_seconds = round(time.perf_counter() - start, 3)
+                self.error = None
+                self._instance = instance
+                logger.info("Initialized %s in %ss", self.name, self.init_seconds)
+            return self._instance
+
+    def set(self, instance: T):
+        """Installs a ready-made instance instead of calling the factory, e.g. a stand-in for benchmarks."""
+        with self._lock:
+            self._instance = instance
+            self.init_seconds = 0.0
+            self.error = None
+
+    def status(self) -> dict:
+        return {"ready": self.initialized, "required": self.required, "init_seconds": self.init_seconds,
+                "error": self.error}
+
+
+_registry: Dict[str, LazyComponent] = {}
+
+
+def warm_up(names: Optional[List[str]] = None) -> Dict[str, dict]:
+    """Initializes the given components (all registered ones by default), in registration order."""
+    for name, component in list(_registry.items()):
+        if names is not None and name not in names:
+            continue
+        try:
+            component.get()
+        except Exception:
+            # Already recorded on the component; keep warming the others.
+            pass
+    return readiness()
+
+
+def readiness() -> Dict[str, dict]:
+    return {name: component.status() for name, component in _registry.items()}
+
+
+def is_ready(components: Dict[str, dict]) -> bool:
+    """True once every required component in a readiness() report is initialized."""
+    return all(component["ready"] for component in components.values() if component["required"])
@@ -0,0 +1,111 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Tuple
+
+from langchain_core.documents import Document
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+# Tokens such as ERR-404, v2.3.1, AB1234 or config_path: codes users quote verbatim.
+_IDENTIFIER_RE = re.compile(r"\w*\d[\w\-./]*|\w+(?:[\-./_]\w+)+", re.UNICODE)
+
+
+def identifier_terms(query: str) -> List[str]:
+    return [m.group(0).strip("-./").lower() for m in _IDENTIFIER_RE.finditer(query) if len(m.group(0)) > 1]
+
+
+def _match_expression(query: str) -> str:
+    """
+    Builds an FTS5 MATCH expression that ORs every query term, plus each
+    identifier as a phrase so its parts score higher when they appear together.
+    """
+    clauses = {f'"{term}"' for term in _TERM_RE.findall(query.lower())}
+    for identifier in identifier_terms(query):
+        parts = _TERM_RE.findall(identifier)
+        if len(parts) > 1:
+            clauses.add('"' + " ".join(parts) + '"')
+    return " OR ".join(sorted(clauses))
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over chunk texts, one SQLite file per namespace.
+
+    Chunk text and metadata live once in a plain table keyed by chunk id; an
+    external-content FTS5 table holds only the inverted index over it and is
+    kept in sync by triggers, so upserts and deletes by chunk id are cheap.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                rowid INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                text, content='chunks', content_rowid='rowid', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+                INSERT INTO chunks_fts(rowid, text) VALUES (new.rowid, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+                INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+            END;
+            """
+        )
+        self._conn.commit()
+
+    def upsert(self, ids: List[str], texts: List[str], metadatas: List[dict]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+            self._conn.executemany(
+                "INSERT INTO chunks (chunk_id, text, metadata) VALUES (?, ?, ?)",
+                [(chunk_id, text, json.dumps(metadata)) for chunk_id, text, metadata in zip(ids, texts, metadatas)],
+            )
+            self._conn.commit()
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('rebuild')")
+            self._conn.commit()
+
+    def optimize(self):
+        """Merges the FTS5 segment b-trees into one; worth running after large ingests."""
+        with self._lock:
+            self._conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('optimize')")
+            self._conn.commit()
+
+    def search(self, query: str, top_k: int) -> List[Tuple[Document, float]]:
+        """Returns up to top_k (chunk, BM25 score) pairs, best first. Higher scores are better."""
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.chunk_id, c.text, c.metadata, bm25(chunks_fts) AS rank "
+                "FROM chunks_fts JOIN chunks c ON c.rowid = chunks_fts.rowid "
+                "WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?",
+                (expression, top_k),
+            ).fetchall()
+        # FTS5 reports BM25 negated so that ascending order is best first.
+        return [
+            (Document(id=chunk_id, page_content=text, metadata=json.loads(metadata)), -rank)
+            for chunk_id, text, metadata, rank in rows
+        ]
@@ -5,12 +5,29 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+CHAT_MODEL_CLASSES = {
+    "google": ChatGoogleGenerativeAI,
+    "groq": ChatGroq,
+}
+
+def create_chat_model(provider: str, model_name: str, temperature: float):
+    if provider not in CHAT_MODEL_CLASSES:
+        raise ValueError(f"Unknown LLM provider '{provider}'. Expected one of: {', '.join(CHAT_MODEL_CLASSES)}")
+    return CHAT_MODEL_CLASSES[provider](model=model_name, temperature=temperature)
+
 class LLMModel:
     def __init__(self,
                  router_model_name="gemini-2.5-flash",
                  judge_model_name='llama-3.3-70b-versatile',
                  answer_model_name='gemini-2.5-flash'
                  ):
+        self.router_model_name=router_model_name
+        self.judge_model_name=judge_model_name
+        self.answer_model_name=answer_model_name
+        # Which provider's rate limits and concurrency bound each model's calls.
+        self.router_provider="google"
+        self.judge_provider="groq"
+        self.answer_provider="google"
         self.router_model= ChatGoogleGenerativeAI(model=router_model_name,temperature=0.1).with_structured_output(RouteDecision)
         self.judge_model= ChatGroq(model=judge_model_name,temperature=0).with_structured_output(RagJudge)
         self.answer_model= ChatGoogleGenerativeAI(model=answer_model_name,temperature=0.5)
@@ -0,0 +1,368 @@
+import json
+import os
+import re
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+DOCSTORE_FILE = "docstore.json"
+# Array files of every generation, e.g. vectors.npy (before generations) or scales.12.npy.
+_ARRAY_FILE = re.compile(r"^(?:vectors|scales)(?:\.\d+)?\.npy$")
+
+
+def _generation_file(name: str, generation: int) -> str:
+    """'vectors.npy' -> 'vectors.3.npy'; generation 0 is the unnumbered layout."""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{generation}{ext}" if generation else name
+
+
+class LocalVectorIndex:
+    """
+    In-process dense index that keeps L2-normalised embeddings in a NumPy
+    matrix persisted as a memory-mapped .npy file next to a JSON docstore.
+
+    With dtype="int8" every row is stored symmetrically quantized with its own
+    float32 scale, which cuts the on-disk and resident size by 4x at a small
+    recall cost.
+
+    Writes go to an in-memory matrix with spare capacity, so adding rows does
+    not copy the whole index. With persist=False they reach disk only on the
+    next persist() call; batched writers such as index_document persist once
+    at the end instead of rewriting the files for every batch.
+
+    Each persist() writes the arrays under a new generation number and then
+    swaps in the docstore that names that generation, so a crash at any point
+    leaves either the old or the new snapshot whole.
+    """
+
+    def __init__(self, directory: str, dtype: str = "float32"):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported local index dtype: {dtype}")
+
+        self.directory = directory
+        self.dtype = dtype
+        self._lock = threading.RLock()
+        # Serialises persist() calls, which write outside _lock.
+        self._persist_lock = threading.Lock()
+        self._dirty = False
+        self._generation = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self.ids: List[str] = []
+        # id -> row, for lookups by id
+        self._rows: Dict[str, int] = {}
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        # Rows [0, len(ids)) are live; rows past them are spare capacity.
+        # Live rows are never modified in place: deletes build new arrays.
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        docstore_path = self._path(DOCSTORE_FILE)
+        if not os.path.exists(docstore_path):
+            return
+
+        with open(docstore_path, "r", encoding="utf-8") as f:
+            docstore = json.load(f)
+
+        if docstore.get("dtype", "float32") != self.dtype:
+            raise ValueError(
+                f"Local index at {self.directory} was built with dtype={docstore.get('dtype')}, "
+                f"but dtype={self.dtype} was requested. Rebuild the index or change LOCAL_INDEX_DTYPE."
+            )
+
+        self._generation = docstore.get("generation", 0)
+        self.ids = docstore["ids"]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.texts = docstore["texts"]
+        self.metadatas = docstore["metadatas"]
+        if self.ids:
+            self._vectors = np.load(self._path(_generation_file(VECTORS_FILE, self._generation)), mmap_mode="r")
+            if self.dtype == "int8":
+                self._scales = np.load(self._path(_generation_file(SCALES_FILE, self._generation)), mmap_mode="r")
+
+        counts = {
+            "ids": len(self.ids),
+            "texts": len(self.texts),
+            "metadatas": len(self.metadatas),
+            "vectors": len(self._vectors) if self._vectors is not None else 0,
+        }
+        if self.dtype == "int8":
+            counts["scales"] = len(self._scales) if self._scales is not None else 0
+        if len(set(counts.values())) > 1:
+            raise ValueError(
+                f"Local index at {self.directory} is inconsistent ({counts}); rows would map to the wrong "
+                "documents. Restore the directory from a backup or delete it and re-ingest the documents."
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dtype == "float32":
+            return vectors.astype(np.float32), None
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _dequantize(self, rows: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+        if self.dtype == "float32":
+            return np.asarray(rows, dtype=np.float32)
+        return rows.astype(np.float32) * scales[:, None]
+
+    def _write_array(self, name: str, array: np.ndarray):
+        # Write to a temp file and swap it in, so readers holding the old
+        # memory map keep a consistent view until they reload.
+        tmp_path = self._path(name + ".tmp")
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=array.dtype, shape=array.shape)
+        out[:] = array
+        out.flush()
+        del out
+        os.replace(tmp_path, self._path(name))
+
+    def persist(self):
+        """Writes the index to disk if it changed since the last write."""
+        with self._persist_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                count = len(self.ids)
+                vectors = self._vectors[:count] if count else None
+                scales = self._scales[:count] if count and self._scales is not None else None
+                self._generation += 1
+                generation = self._generation
+                docstore = {"dtype": self.dtype, "generation": generation, "ids": list(self.ids),
+                            "texts": list(self.texts), "metadatas": list(self.metadatas)}
+                self._dirty = False
+
+            try:
+                if vectors is not None:
+                    self._write_array(_generation_file(VECTORS_FILE, generation), vectors)
+                    if scales is not None:
+                        self._write_array(_generation_file(SCALES_FILE, generation), scales)
+
+                # The docstore names the generation to load, so swapping it in commits the snapshot.
+                tmp_path = self._path(DOCSTORE_FILE + ".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(docstore, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self._path(DOCSTORE_FILE))
+            except BaseException:
+                with self._lock:
+                    self._dirty = True
+                raise
+            self._remove_old_generations(generation)
+
+    def _remove_old_generations(self, generation: int):
+        current = {_generation_file(VECTORS_FILE, generation), _generation_file(SCALES_FILE, generation)}
+        for name in os.listdir(self.directory):
+            if _ARRAY_FILE.match(name) and name not in current:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    # Still memory-mapped on a platform that forbids removing it; retried next time.
+                    pass
+
+    def _append_locked(self, rows: np.ndarray, scales: Optional[np.ndarray]):
+        count = len(self.ids)
+        needed = count + len(rows)
+        if self._vectors is None or needed > len(self._vectors) or not self._vectors.flags.writeable:
+            # Grow geometrically (the loaded memory map is read-only, so the first write copies it).
+            capacity = max(needed, 2 * count)
+            vectors = np.empty((capacity, rows.shape[1]), dtype=rows.dtype)
+            vectors[:count] = self._vectors[:count] if count else 0
+            self._vectors = vectors
+            if scales is not None:
+                grown = np.empty(capacity, dtype=np.float32)
+                grown[:count] = self._scales[:count] if count else 0
+                self._scales = grown
+        self._vectors[count:needed] = rows
+        if scales is not None:
+            self._scales[count:needed] = scales
+
+    def add(self, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict],
+            persist: bool = True):
+        if not ids:
+            return
+
+        new_vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(new_vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        new_rows, new_scales = self._quantize(new_vectors / norms)
+
+        with self._lock:
+            # Upsert semantics: re-adding an existing id replaces its row.
+            replaced = {doc_id for doc_id in ids if doc_id in self._rows}
+            if replaced:
+                self._delete_locked(replaced)
+
+            self._append_locked(new_rows, new_scales)
+            self._rows.update((doc_id, len(self.ids) + n) for n, doc_id in enumerate(ids))
+            self.ids.extend(ids)
+            self.texts.extend(texts)
+            self.metadatas.extend(metadatas)
+            self._dirty = True
+        if persist:
+            self.persist()
+
+    def _delete_locked(self, ids: Iterable[str]):
+        ids = set(ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in ids]
+        if len(keep) == len(self.ids):
+            return
+
+        if keep:
+            self._vectors = np.asarray(self._vectors)[keep]
+            self._scales = np.asarray(self._scales)[keep] if self._scales is not None else None
+        else:
+            self._vectors, self._scales = None, None
+        self.ids = [self.ids[i] for i in keep]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.texts = [self.texts[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self._dirty = True
+
+    def delete(self, ids: Optional[Iterable[str]] = None, delete_all: bool = False, persist: bool = True):
+        with self._lock:
+            if delete_all:
+                self.ids, self.texts, self.metadatas = [], [], []
+                self._rows = {}
+                self._vectors, self._scales = None, None
+                self._dirty = True
+            elif ids:
+                self._delete_locked(ids)
+        if persist:
+            self.persist()
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """The stored (dequantized) vectors of the given ids; unknown ids are left out."""
+        with self._lock:
+            found = [(doc_id, self._rows[doc_id]) for doc_id in ids if doc_id in self._rows]
+            if not found:
+                return {}
+            rows = [row for _, row in found]
+            vectors = self._dequantize(np.asarray(self._vectors)[rows],
+                                       np.asarray(self._scales)[rows] if self._scales is not None else None)
+        return {doc_id: vectors[n] for n, (doc_id, _) in enumerate(found)}
+
+    def query(self, vector: List[float], top_k: int) -> List[Tuple[Document, float, np.ndarray]]:
+        """
+        The top_k closest rows as (document, cosine similarity, dequantized
+        vector), best first. Rows are ranked and read under one lock
+        acquisition, so a concurrent add or delete cannot shift the row
+        numbers between ranking them and reading their documents.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self._lock:
+            count = len(self.ids)
+            if not count or top_k <= 0:
+                return []
+            vectors = self._vectors[:count]
+            scales = self._scales[:count] if self._scales is not None else None
+
+            if self.dtype == "float32":
+                scores = vectors @ query
+            else:
+                scores = (vectors @ query) * scales
+
+            top_k = min(top_k, len(scores))
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            top = top[np.argsort(-scores[top])]
+            rows = self._dequantize(np.asarray(vectors)[top], np.asarray(scales)[top] if scales is not None else None)
+            return [
+                (Document(id=self.ids[i], page_content=self.texts[i], metadata=dict(self.metadatas[i])),
+                 float(scores[i]), rows[n])
+                for n, i in enumerate(top)
+            ]
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain VectorStore over a LocalVectorIndex, so it plugs into as_retriever()."""
+
+    def __init__(self, embedding: Embeddings, directory: str, dtype: str = "float32"):
+        self._embedding = embedding
+        self.index = LocalVectorIndex(directory, dtype=dtype)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_embeddings(texts, vectors, metadatas=metadatas, ids=ids)
+
+    def add_embeddings(self, texts: List[str], vectors: List[List[float]],
+                       metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None) -> List[str]:
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        self.index.add(ids, texts, vectors, metadatas)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        self.index.delete(ids=ids, delete_all=kwargs.get("delete_all", False))
+        return True
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        return [(doc, score) for doc, score, _ in self.index.query(embedding, k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        candidates = self.index.query(embedding, fetch_k)
+        if not candidates:
+            return []
+
+        selected = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32),
+            np.stack([vector for _, _, vector in candidates]),
+            lambda_mult=lambda_mult,
+            k=k,
+        )
+        return [candidates[i][0] for i in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding.embed_query(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+        )
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, directory: str = "data/index", dtype: str = "float32",
+                   **kwargs: Any) -> "LocalVectorStore":
+        store = cls(embedding, directory, dtype=dtype)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,43 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload)
+
+
+def configure_logging(level: str = "INFO", json_format: bool = False):
+    """
+    Routes all records through a queue to a single background writer, so
+    request handlers never block on stdout. Safe to call more than once.
+    """
+    root = logging.getLogger()
+    if getattr(configure_logging, "_listener", None) is not None:
+        root.setLevel(level.upper())
+        return
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(
+        JsonFormatter() if json_format
+        else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    configure_logging._listener = listener
+
+    root.handlers = [logging.handlers.QueueHandler(records)]
+    root.setLevel(level.upper())
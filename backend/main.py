@@ -1,167 +1,665 @@
 import os
-import tempfile
-import traceback
-from typing import List
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_community.document_loaders import PyPDFLoader
-from vectorstore import add_document_to_vectorstore
-from schemas import DocumentUploadResponse, AgentResponse, QueryRequest, TraceEvent
-from agent import AxonBotAgent
-from fastapi import FastAPI, UploadFile, File, HTTPException, status
+import json
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, List
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
+from ingestion import ingest_pdf, save_upload_to_disk, shutdown_parse_pool
+from ingestion_jobs import IngestionJobManager, JobQueueFull, JobStore
+from vectorstore import (get_embedding, delete_document, get_kb_version, list_documents, make_document_id,
+                         validate_namespace)
+from answer_cache import SemanticAnswerCache
+from config import (DEFAULT_NAMESPACE, ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_ENTRIES,
+                    ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_WEB_TTL_SECONDS, WARM_UP_ON_STARTUP, LOG_LEVEL, LOG_JSON,
+                    AGENT_MAX_INFLIGHT, INGEST_JOBS_DB_PATH, INGEST_MAX_CONCURRENT_JOBS, INGEST_MAX_PENDING_JOBS,
+                    INGEST_JOB_RETENTION_SECONDS, BATCH_MAX_ITEMS, BATCH_DEFAULT_CONCURRENCY, EMBED_CACHE_ENABLED)
+from schemas import (DocumentUploadResponse, DocumentListResponse, DocumentDeleteResponse, IngestionJob,
+                     AgentResponse, QueryRequest, TraceEvent, ReadinessResponse, BatchQueryRequest, BatchItemResult)
+from agent import AxonBotAgent, memory
+from tools import normalize_query
+from lazy import LazyComponent, is_ready, warm_up, readiness
+from logging_setup import configure_logging
+from instrumentation import MetricsCallbackHandler
+from metrics import CACHE_REQUESTS, REQUEST_DURATION
+from resilience import AdmissionController, ProviderOverloaded, ProviderTimeout
+import metrics
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 
-app=FastAPI(title="Langgraph Ai Agent")
+configure_logging(LOG_LEVEL, LOG_JSON)
+logger=logging.getLogger(__name__)
 
-agent=AxonBotAgent()
-app_graph=agent.workflow()
+def _create_agent_graph():
+    agent=AxonBotAgent()
+    if agent.fast_router is not None:
+        agent.fast_router.warm_up()
+    return agent.workflow()
+
+agent_graph=LazyComponent("agent_graph", _create_agent_graph)
+
+async def get_app_graph():
+    if agent_graph.initialized:
+        return agent_graph.get()
+    # First use before warm-up finished: build it without blocking the event loop.
+    return await run_in_threadpool(agent_graph.get)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the process accepts connections (and passes
+    # liveness checks) immediately; /ready turns 200 once everything is loaded.
+    if WARM_UP_ON_STARTUP:
+        app.state.warm_up=asyncio.get_running_loop().run_in_executor(None, warm_up)
+    yield
+    # Running jobs stop at their next progress flush and roll back what they indexed.
+    await run_in_threadpool(ingestion_jobs.shutdown)
+    await run_in_threadpool(shutdown_parse_pool)
+
+app=FastAPI(title="Langgraph Ai Agent",lifespan=lifespan)
+
+answer_cache=SemanticAnswerCache(
+    threshold=ANSWER_CACHE_THRESHOLD,
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    web_ttl_seconds=ANSWER_CACHE_WEB_TTL_SECONDS
+) if ANSWER_CACHE_ENABLED else None
+
+admission=AdmissionController(AGENT_MAX_INFLIGHT)
+
+def _run_ingestion_job(path: str, document_id: str, namespace: str, filename: str | None, progress) -> dict:
+    result = ingest_pdf(path, document_id, namespace, filename, progress=progress)
+    return DocumentUploadResponse(
+        message=f"PDF '{filename}' successfully uploaded and indexed.",
+        filename=filename,
+        processed_chunks=result.pages,
+        document=f'{result.preview}....',
+        document_id=document_id,
+        namespace=namespace,
+        chunks_added=result.index_stats["chunks_added"],
+        chunks_removed=result.index_stats["chunks_removed"],
+        chunks_unchanged=result.index_stats["chunks_unchanged"]
+    ).model_dump()
+
+ingestion_jobs=IngestionJobManager(
+    JobStore(INGEST_JOBS_DB_PATH),
+    _run_ingestion_job,
+    max_concurrent=INGEST_MAX_CONCURRENT_JOBS,
+    max_pending=INGEST_MAX_PENDING_JOBS,
+    retention_seconds=INGEST_JOB_RETENTION_SECONDS
+)
+
+def build_job_response(job: dict) -> IngestionJob:
+    return IngestionJob(**job, status_url=f"/jobs/{job['job_id']}")
+
+def provider_error_status(error: Exception) -> int | None:
+    """HTTP status for errors the provider execution layer raises on purpose, None for anything else."""
+    if isinstance(error, ProviderOverloaded):
+        return status.HTTP_503_SERVICE_UNAVAILABLE
+    if isinstance(error, ProviderTimeout):
+        return status.HTTP_504_GATEWAY_TIMEOUT
+    return None
+
+def build_agent_config(request: QueryRequest, metrics_handler: MetricsCallbackHandler | None = None) -> dict:
+    return {
+        "callbacks": [metrics_handler] if metrics_handler is not None else [],
+        "configurable": {
+            "thread_id": request.session_id,
+            "web_search_enabled": request.enable_web_search,
+            "namespace": request.namespace,
+            "web_query_variants": request.web_query_variants,
+            **({"speculative_retrieval": request.speculative_retrieval} if request.speculative_retrieval is not None else {})
+        }
+    }
+
+def build_trace_event(step: int, current_node_name: str, node_output_state: dict | None,
+                      metrics_handler: MetricsCallbackHandler | None = None) -> TraceEvent:
+    node_output_state = node_output_state or {}
+
+    event_description = f"Executing node: {current_node_name}"
+    event_details = {}
+    event_type = "generic_node_execution"
+
+    if current_node_name == "router":
+        route_decision = node_output_state.get('route')
+        initial_decision = node_output_state.get('initial_router_decision', route_decision)
+        override_reason = node_output_state.get('router_override_reason', None)
+
+        if override_reason:
+            event_description = f"Router initially decided: '{initial_decision}'. Overridden to: '{route_decision}' because {override_reason}."
+            event_details = {"initial_decision": initial_decision, "final_decision": route_decision, "override_reason": override_reason}
+        else:
+            event_description = f"Router decided: '{route_decision}'"
+            event_details = {"decision": route_decision, "reason": "Based on initial query analysis."}
+
+        router_source = node_output_state.get("router_source", "llm")
+        event_details["router_source"] = router_source
+        if router_source == "fast_path":
+            event_description += " (local fast-path classifier)"
+            event_details["reason"] = "High-confidence match from the local pre-router; LLM router skipped."
+            event_details["confidence"] = node_output_state.get("router_confidence")
+        event_type = "router_decision"
+
+    elif current_node_name == "rag_lookup":
+        rag_content_summary = node_output_state.get("rag", "")[:200] + "..."
+
+        rag_sufficient = node_output_state.get("route") == "answer"
+
+        if rag_sufficient:
+            event_description = f"RAG Lookup performed. Content found and deemed sufficient. Proceeding to answer."
+            event_details = {"retrieved_content_summary": rag_content_summary, "sufficiency_verdict": "Sufficient"}
+        else:
+            event_description = f"RAG Lookup performed. Content NOT sufficient. Diverting to web search."
+            event_details = {"retrieved_content_summary": rag_content_summary, "sufficiency_verdict": "Not Sufficient"}
+
+        sufficiency = node_output_state.get("sufficiency")
+        if sufficiency:
+            event_details["sufficiency_decided_by"] = sufficiency.get("decided_by")
+            event_details["top_score"] = sufficiency.get("top_score")
+            event_details["sufficiency_reason"] = sufficiency.get("reason")
+        event_type = "rag_action"
+
+    elif current_node_name == "web_search":
+        web_content_summary = node_output_state.get("web", "")[:200] + "..."
+        event_description = f"Web Search performed. Results retrieved. Proceeding to answer."
+        event_details = {"retrieved_content_summary": web_content_summary}
+        event_type = "web_action"
+
+    elif current_node_name == "answer":
+        event_description = "Generating final answer using gathered context."
+        event_type = "answer_generation"
+
+    elif current_node_name == "__end__":
+        event_description = "Agent process completed."
+        event_type = "process_end"
+
+    model_tier = node_output_state.get("model_tier")
+    if model_tier:
+        event_details["model_tier"] = model_tier
+        if model_tier["tiers"] > 1 or model_tier["failover_because"]:
+            event_description += f" ({model_tier['role']} served by {model_tier['model']}, tier {model_tier['tier']}/{model_tier['tiers']})"
+
+    speculation = node_output_state.get("speculation")
+    if speculation:
+        event_details["speculation"] = speculation
+        if speculation.get("outcome") == "hit":
+            event_description += f" (used speculative {speculation['kind']} results)"
+
+    duration_ms, elapsed_ms = metrics_handler.pop_node_timing(current_node_name) if metrics_handler else (None, None)
+
+    return TraceEvent(
+        step=step,
+        node_name=current_node_name,
+        description=event_description,
+        details=event_details,
+        event_type=event_type,
+        duration_ms=duration_ms,
+        elapsed_ms=elapsed_ms
+    )
+
+def extract_final_message(node_output_state: dict | None) -> str:
+    if node_output_state and "messages" in node_output_state:
+        for msg in reversed(node_output_state["messages"]):
+            if isinstance(msg, AIMessage):
+                return msg.content
+    return ""
+
+def _probe_answer_cache(request: QueryRequest) -> tuple:
+    vector = get_embedding().embed_query(request.query)
+    return vector, get_kb_version(request.namespace)
+
+async def lookup_cached_answer(request: QueryRequest, config: dict) -> tuple[AgentResponse | None, dict | None]:
+    """
+    Checks the semantic answer cache. Returns (response, None) on a hit, or
+    (None, cache_key) on a miss, where cache_key is what store_cached_answer needs.
+    """
+    if answer_cache is None:
+        return None, None
+
+    vector, kb_version = await run_in_threadpool(_probe_answer_cache, request)
+    cached = answer_cache.lookup(vector, request.namespace, kb_version, request.enable_web_search)
+    if cached is None:
+        CACHE_REQUESTS.inc("answer", "miss")
+        return None, {"vector": vector, "kb_version": kb_version}
+
+    CACHE_REQUESTS.inc("answer", "hit")
+    logger.info("Semantic cache hit (similarity %.3f) for query: %s", cached.similarity, request.query)
+    trace_events = [TraceEvent(**event) for event in cached.trace_events]
+    trace_events.append(TraceEvent(
+        step=len(trace_events) + 1,
+        node_name="answer_cache",
+        description=f"Answered from semantic cache (similarity {cached.similarity:.3f} to '{cached.query}').",
+        details={"cached_query": cached.query, "similarity": round(cached.similarity, 4)},
+        event_type="cache_hit"
+    ))
+
+    # Keep the conversation history complete even though the graph did not run.
+    app_graph = await get_app_graph()
+    await app_graph.aupdate_state(
+        config,
+        {"messages": [HumanMessage(content=request.query), AIMessage(content=cached.response)]},
+        as_node="answer"
+    )
+    return AgentResponse(response=cached.response, trace_events=trace_events), None
+
+def store_cached_answer(request: QueryRequest, cache_key: dict | None, response: AgentResponse):
+    if answer_cache is None or cache_key is None:
+        return
+    answer_cache.store(
+        request.query,
+        cache_key["vector"],
+        request.namespace,
+        cache_key["kb_version"],
+        request.enable_web_search,
+        response.response,
+        [event.model_dump() for event in response.trace_events],
+        used_web=any(event.node_name == "web_search" for event in response.trace_events)
+    )
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @app.get("/health")
 
 def health():
     return {"status":"OK"}
 
-@app.post("/upload-document",response_model=DocumentUploadResponse)
-async def upload_document(file: UploadFile= File(...)):
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready",response_model=ReadinessResponse)
+def ready():
+    """Readiness probe: 200 once every required lazily created component is initialized, 503 before."""
+    components = readiness()
+    ready_now = is_ready(components)
+    body = ReadinessResponse(status="ready" if ready_now else "warming_up", components=components)
+    if not ready_now:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body.model_dump())
+    return body
+
+@app.post("/upload-document",response_model=IngestionJob,status_code=status.HTTP_202_ACCEPTED)
+async def upload_document(file: UploadFile= File(...),
+                          namespace: str = Form(DEFAULT_NAMESPACE),
+                          document_id: str | None = Form(None)):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only PDF files are supported."
         )
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        file_content = await file.read()
-        tmp_file.write(file_content)
-        temp_file_path = tmp_file.name
+    try:
+        validate_namespace(namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    print(f"Received PDF for upload: {file.filename}. Saved temporarily to {temp_file_path}")
+    # Re-uploading the same filename into a namespace updates that document in place.
+    document_id = document_id or make_document_id(file.filename)
 
+    temp_file_path = await save_upload_to_disk(file)
+
+    logger.info("Received PDF for upload: %s. Saved temporarily to %s", file.filename, temp_file_path)
+
+    # Parsing, embedding and upserting run as a background job; the client polls /jobs/{job_id}.
     try:
-        loader = PyPDFLoader(temp_file_path)
-        documents = loader.load()
-
-        total_chunks_added = 0
-        if documents:
-            full_text_content = "\n\n".join([doc.page_content for doc in documents])
-            add_document_to_vectorstore(full_text_content)
-            total_chunks_added = len(documents)
-        
-        return DocumentUploadResponse(
-            message=f"PDF '{file.filename}' successfully uploaded and indexed.",
-            filename=file.filename,
-            processed_chunks=total_chunks_added,
-            document=f'{full_text_content[:500]}....'
-        )
+        job = await run_in_threadpool(ingestion_jobs.submit, temp_file_path, document_id, namespace, file.filename)
+    except JobQueueFull as e:
+        os.remove(temp_file_path)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail=f"Too many uploads in progress, retry shortly. {e}", headers={"Retry-After": "5"})
+    return build_job_response(job)
 
+@app.get("/jobs/{job_id}",response_model=IngestionJob)
+async def get_ingestion_job(job_id: str):
+    job = await run_in_threadpool(ingestion_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job '{job_id}' not found.")
+    return build_job_response(job)
 
-    except Exception as e:
-        print(f"Error processing PDF document: {e}")
+@app.delete("/jobs/{job_id}",response_model=IngestionJob)
+async def cancel_ingestion_job(job_id: str):
+    job = await run_in_threadpool(ingestion_jobs.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job '{job_id}' not found.")
+    if not job["cancel_requested"]:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f"Job '{job_id}' is {job['status']} and can no longer be cancelled.")
+    return build_job_response(job)
+
+@app.get("/documents",response_model=DocumentListResponse)
+async def get_documents(namespace: str = DEFAULT_NAMESPACE):
+    try:
+        documents = await run_in_threadpool(list_documents, namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return DocumentListResponse(namespace=namespace, documents=documents)
+
+@app.delete("/documents/{document_id}",response_model=DocumentDeleteResponse)
+async def remove_document(document_id: str, namespace: str = DEFAULT_NAMESPACE):
+    try:
+        chunks_deleted = await run_in_threadpool(delete_document, document_id, namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if chunks_deleted is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to process PDF: {e}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document '{document_id}' not found in namespace '{namespace}'."
         )
-    finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            print(f"Cleaned up temporary file: {temp_file_path}")
+    return DocumentDeleteResponse(
+        message=f"Document '{document_id}' deleted.",
+        document_id=document_id,
+        namespace=namespace,
+        chunks_deleted=chunks_deleted
+    )
 
 @app.post("/execute",response_model=AgentResponse)
 async def execute_agent(request: QueryRequest):
     trace_events_for_frontend: List[TraceEvent] = []
+    if not admission.try_enter():
+        REQUEST_DURATION.observe(0.0, "execute", "rejected")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Server is at capacity, retry shortly.", headers={"Retry-After": "1"})
+
+    metrics_handler = MetricsCallbackHandler()
+    outcome = "error"
 
     try:
-        config = {
-            "configurable": {
-                "thread_id": request.session_id,
-                "web_search_enabled": request.enable_web_search
-            }
-        }
+        config = build_agent_config(request, metrics_handler)
         inputs = {"messages": [HumanMessage(content=request.query)]}
-        final_message = ""
 
-        print(f"--- Starting Agent Stream for session {request.session_id} ---")
-        print(f"Web Search Enabled: {request.enable_web_search}")
+        cached_response, cache_key = await lookup_cached_answer(request, config)
+        if cached_response is not None:
+            outcome = "cache_hit"
+            return cached_response
 
-        for i, s in enumerate(app_graph.stream(inputs, config=config)):
-            current_node_name = None
-            node_output_state = None
+        logger.info("Starting agent run for session %s (web search enabled: %s)",
+                    request.session_id, request.enable_web_search)
 
-            # current_node_name, node_output_state = next(iter(s.items())) -> ok
+        node_output_state = None
+        step = 0
+        app_graph = await get_app_graph()
+        async for s in app_graph.astream(inputs, config=config):
+            step += 1
+            current_node_name, node_output_state = next(iter(s.items()))
+            trace_event = build_trace_event(step, current_node_name, node_output_state, metrics_handler)
+            trace_events_for_frontend.append(trace_event)
+            logger.debug("Step %d - Node: %s - %s", step, current_node_name, trace_event.description)
 
-            current_node_name = list(s.keys())[0] 
-            node_output_state = s[current_node_name]
+        final_message = extract_final_message(node_output_state)
 
-            event_description = f"Executing node: {current_node_name}"
-            event_details = {}
-            event_type = "generic_node_execution"
+        if not final_message:
+            logger.error("Agent finished, but no final AIMessage found in the final state after stream completion.")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Agent did not return a valid response (final AI message not found).")
 
-            if current_node_name == "router":
-                route_decision = node_output_state.get('route')
-                initial_decision = node_output_state.get('initial_router_decision', route_decision)
-                override_reason = node_output_state.get('router_override_reason', None)
+        logger.info("Agent run ended. Final response: %s...", final_message[:200])
 
-                if override_reason:
-                    event_description = f"Router initially decided: '{initial_decision}'. Overridden to: '{route_decision}' because {override_reason}."
-                    event_details = {"initial_decision": initial_decision, "final_decision": route_decision, "override_reason": override_reason}
-                else:
-                    event_description = f"Router decided: '{route_decision}'"
-                    event_details = {"decision": route_decision, "reason": "Based on initial query analysis."}
-                event_type = "router_decision"
-
-            elif current_node_name == "rag_lookup":
-                rag_content_summary = node_output_state.get("rag", "")[:200] + "..."
-                
-                rag_sufficient = node_output_state.get("route") == "answer" 
-                
-                if rag_sufficient:
-                    event_description = f"RAG Lookup performed. Content found and deemed sufficient. Proceeding to answer."
-                    event_details = {"retrieved_content_summary": rag_content_summary, "sufficiency_verdict": "Sufficient"}
-                else:
-                    event_description = f"RAG Lookup performed. Content NOT sufficient. Diverting to web search."
-                    event_details = {"retrieved_content_summary": rag_content_summary, "sufficiency_verdict": "Not Sufficient"}
-                
-                event_type = "rag_action"
-
-            elif current_node_name == "web_search":
-                web_content_summary = node_output_state.get("web", "")[:200] + "..."
-                event_description = f"Web Search performed. Results retrieved. Proceeding to answer."
-                event_details = {"retrieved_content_summary": web_content_summary}
-                event_type = "web_action"
-            
-            elif current_node_name == "answer":
-                event_description = "Generating final answer using gathered context."
-                event_type = "answer_generation"
-            
-            elif current_node_name == "__end__":
-                event_description = "Agent process completed."
-                event_type = "process_end"
-
-            trace_events_for_frontend.append(
-                TraceEvent(
-                    step=i + 1,
-                    node_name=current_node_name,
-                    description=event_description,
-                    details=event_details,
-                    event_type=event_type
-                )
-            )
-            print(f"Streamed Event: Step {i+1} - Node: {current_node_name} - Desc: {event_description}")
+        response = AgentResponse(response=final_message, trace_events=trace_events_for_frontend)
+        store_cached_answer(request, cache_key, response)
+        outcome = "ok"
+        return response
+    except (ProviderOverloaded, ProviderTimeout) as e:
+        outcome = "rejected" if isinstance(e, ProviderOverloaded) else "timeout"
+        logger.warning("Agent run shed for session %s: %s", request.session_id, e)
+        raise HTTPException(status_code=provider_error_status(e), detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.exception("Error during agent invocation: %s", e)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
+    finally:
+        admission.leave()
+        REQUEST_DURATION.observe(time.perf_counter() - metrics_handler.started_at, "execute", outcome)
 
-            
-            
-        if node_output_state and "messages" in node_output_state:
-            for msg in reversed(node_output_state["messages"]):
-                if isinstance(msg, AIMessage):
-                    final_message = msg.content
-                    break
+@app.post("/execute-stream")
+async def execute_agent_stream(request: QueryRequest):
+    """
+    Streams the agent run as Server-Sent Events instead of one JSON body.
 
-        if not final_message:
-            print("Agent finished, but no final AIMessage found in the final state after stream completion.")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Agent did not return a valid response (final AI message not found).")
+    Events:
+        trace: a TraceEvent, sent as soon as its node completes.
+        token: {"content": ...} for each answer_llm token as it is generated.
+        final: the complete AgentResponse once the graph has finished.
+        error: {"detail": ..., "status": ...} if the run fails midway; status is 503
+               when the server or a provider is at capacity and 504 on a deadline.
+    """
+    metrics_handler = MetricsCallbackHandler()
+    config = build_agent_config(request, metrics_handler)
+    inputs = {"messages": [HumanMessage(content=request.query)]}
+
+    async def event_stream():
+        trace_events_for_frontend: List[TraceEvent] = []
+        node_output_state = None
+        step = 0
+        outcome = "error"
+
+        if not admission.try_enter():
+            REQUEST_DURATION.observe(0.0, "execute_stream", "rejected")
+            yield sse_event("error", {"detail": "Server is at capacity, retry shortly.",
+                                      "status": status.HTTP_503_SERVICE_UNAVAILABLE})
+            return
+
+        logger.info("Starting agent SSE stream for session %s", request.session_id)
+        try:
+            cached_response, cache_key = await lookup_cached_answer(request, config)
+            if cached_response is not None:
+                outcome = "cache_hit"
+                for trace_event in cached_response.trace_events:
+                    yield sse_event("trace", trace_event.model_dump())
+                yield sse_event("token", {"content": cached_response.response})
+                yield sse_event("final", cached_response.model_dump())
+                return
+
+            app_graph = await get_app_graph()
+            async for mode, chunk in app_graph.astream(inputs, config=config, stream_mode=["updates", "messages"]):
+                if mode == "messages":
+                    message_chunk, metadata = chunk
+                    if metadata.get("langgraph_node") == "answer" and isinstance(message_chunk, AIMessageChunk) and message_chunk.content:
+                        yield sse_event("token", {"content": message_chunk.content})
+                    continue
+
+                step += 1
+                current_node_name, node_output_state = next(iter(chunk.items()))
+                trace_event = build_trace_event(step, current_node_name, node_output_state, metrics_handler)
+                trace_events_for_frontend.append(trace_event)
+                yield sse_event("trace", trace_event.model_dump())
 
-        print(f"--- Agent Stream Ended. Final Response: {final_message[:200]}... ---")
+            final_message = extract_final_message(node_output_state)
+            if not final_message:
+                yield sse_event("error", {"detail": "Agent did not return a valid response (final AI message not found).",
+                                          "status": status.HTTP_500_INTERNAL_SERVER_ERROR})
+                return
 
-        return AgentResponse(response=final_message, trace_events=trace_events_for_frontend)
+            logger.info("Agent SSE stream ended. Final response: %s...", final_message[:200])
+            response = AgentResponse(response=final_message, trace_events=trace_events_for_frontend)
+            store_cached_answer(request, cache_key, response)
+            outcome = "ok"
+            yield sse_event("final", response.model_dump())
+        except (ProviderOverloaded, ProviderTimeout) as e:
+            outcome = "rejected" if isinstance(e, ProviderOverloaded) else "timeout"
+            logger.warning("Agent stream shed for session %s: %s", request.session_id, e)
+            yield sse_event("error", {"detail": str(e), "status": provider_error_status(e)})
+        except Exception as e:
+            logger.exception("Error during agent stream: %s", e)
+            yield sse_event("error", {"detail": f"Internal Server Error: {e}",
+                                      "status": status.HTTP_500_INTERNAL_SERVER_ERROR})
+        finally:
+            admission.leave()
+            REQUEST_DURATION.observe(time.perf_counter() - metrics_handler.started_at, "execute_stream", outcome)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _embed_batch_queries(queries: List[str]):
+    # One forward pass for the whole batch. With the embedding cache on, every
+    # later embed_query for these texts (answer cache probe, fast router,
+    # retrieval) is a cache hit instead of a model call.
+    if not EMBED_CACHE_ENABLED or not queries:
+        return
+    try:
+        get_embedding().embed_documents(queries)
     except Exception as e:
-        traceback.print_exc()
-        error_details = f"Error during agent invocation: {e}"
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Internal Server Error: {e}")
+        logger.warning("Shared embedding pass for the batch failed, items embed their own queries: %s", e)
+
+def group_batch_items(batch: BatchQueryRequest) -> Dict[int, List[int]]:
+    """
+    Maps the index of each item that has to run to the indexes of the items
+    that just reuse its result. Items with a session_id always run, since
+    their answer depends on that conversation's history.
+    """
+    groups: Dict[int, List[int]] = {}
+    first_by_query: Dict[str, int] = {}
+    for index, item in enumerate(batch.items):
+        if item.session_id is None:
+            first = first_by_query.setdefault(normalize_query(item.query), index)
+            if first != index:
+                groups[first].append(index)
+                continue
+        groups[index] = []
+    return groups
+
+def batch_result_lines(batch: BatchQueryRequest, index: int, duplicates: List[int], started: float,
+                       response: AgentResponse | None = None, error: str | None = None,
+                       status_code: int = status.HTTP_200_OK) -> List[str]:
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    lines = []
+    for item_index in [index, *duplicates]:
+        item = batch.items[item_index]
+        result = BatchItemResult(
+            index=item_index,
+            id=item.id,
+            query=item.query,
+            status=status_code,
+            response=response.response if response else None,
+            trace_events=response.trace_events if response else [],
+            error=error,
+            duplicate_of=index if item_index != index else None,
+            elapsed_ms=elapsed_ms
+        )
+        lines.append(result.model_dump_json() + "\n")
+    return lines
+
+@app.post("/execute-batch")
+async def execute_agent_batch(batch: BatchQueryRequest):
+    """
+    Runs many queries through the compiled graph's abatch_as_completed and
+    streams one BatchItemResult per line (NDJSON) as each item finishes, in
+    completion order; match results to items by index or id. Each item has
+    its own status: 503 when the server or a provider is at capacity (for
+    every item if the batch could not start), 504 on a deadline.
+
+    Work is shared across the batch: all distinct queries are embedded in one
+    call up front, session-less items asking the same (normalized) question
+    run once, and identical retrievals and web searches running at the same
+    time are coalesced. Items run max_concurrency at a time, but never on
+    more slots than AGENT_MAX_INFLIGHT has free when the batch starts.
+    """
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"A batch holds at most {BATCH_MAX_ITEMS} items, got {len(batch.items)}.")
+    try:
+        validate_namespace(batch.namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    groups = group_batch_items(batch)
+    batch_id = uuid.uuid4().hex[:12]
+    requests = {
+        index: QueryRequest(
+            session_id=batch.items[index].session_id or f"batch-{batch_id}-{index}",
+            query=batch.items[index].query,
+            enable_web_search=batch.enable_web_search,
+            namespace=batch.namespace
+        )
+        for index in groups
+    }
+
+    async def result_lines():
+        started = time.perf_counter()
+        slots = admission.try_enter_many(min(batch.max_concurrency or BATCH_DEFAULT_CONCURRENCY, len(groups)))
+        if not slots:
+            REQUEST_DURATION.observe(0.0, "execute_batch", "rejected")
+            for index in groups:
+                for line in batch_result_lines(batch, index, groups[index], started,
+                                               error="Server is at capacity, retry shortly.",
+                                               status_code=status.HTTP_503_SERVICE_UNAVAILABLE):
+                    yield line
+            return
+
+        logger.info("Starting batch %s: %d items, %d distinct runs, concurrency %d",
+                    batch_id, len(batch.items), len(requests), slots)
+        # Checkpoints of the batch's own session ids, deleted as soon as their item is
+        # answered: left in the checkpointer they would evict real conversations.
+        batch_threads = set()
+        try:
+            await run_in_threadpool(_embed_batch_queries, list(dict.fromkeys(r.query for r in requests.values())))
+
+            handlers = {index: MetricsCallbackHandler(record_updates=True) for index in requests}
+            configs = {index: build_agent_config(requests[index], handlers[index]) for index in requests}
+            lookups = await asyncio.gather(
+                *(lookup_cached_answer(requests[index], configs[index]) for index in requests),
+                return_exceptions=True
+            )
+
+            to_run, cache_keys = [], {}
+            for index, lookup in zip(requests, lookups):
+                if isinstance(lookup, Exception):
+                    logger.warning("Answer cache lookup failed for batch item %d: %s", index, lookup)
+                    lookup = (None, None)
+                cached_response, cache_keys[index] = lookup
+                if cached_response is None:
+                    to_run.append(index)
+                    continue
+                REQUEST_DURATION.observe(time.perf_counter() - started, "execute_batch", "cache_hit")
+                for line in batch_result_lines(batch, index, groups[index], started, response=cached_response):
+                    yield line
+
+            if not to_run:
+                return
+            app_graph = await get_app_graph()
+            batch_threads.update(requests[index].session_id for index in to_run if not batch.items[index].session_id)
+            inputs = [{"messages": [HumanMessage(content=requests[index].query)]} for index in to_run]
+            run_configs = [{**configs[index], "max_concurrency": slots} for index in to_run]
+            async for position, output in app_graph.abatch_as_completed(inputs, run_configs, return_exceptions=True):
+                index = to_run[position]
+                handler = handlers[index]
+                outcome, response, error, status_code = "error", None, None, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+                if isinstance(output, Exception):
+                    status_code = provider_error_status(output) or status_code
+                    outcome = {503: "rejected", 504: "timeout"}.get(status_code, "error")
+                    error = str(output)
+                    logger.warning("Batch %s item %d failed: %s", batch_id, index, output)
+                else:
+                    trace_events = [build_trace_event(step, node, update, handler)
+                                    for step, (node, update) in enumerate(handler.node_updates, start=1)]
+                    last_update = handler.node_updates[-1][1] if handler.node_updates else None
+                    final_message = extract_final_message(last_update)
+                    if final_message:
+                        response = AgentResponse(response=final_message, trace_events=trace_events)
+                        store_cached_answer(requests[index], cache_keys.get(index), response)
+                        outcome, status_code = "ok", status.HTTP_200_OK
+                    else:
+                        error = "Agent did not return a valid response (final AI message not found)."
+
+                REQUEST_DURATION.observe(time.perf_counter() - handler.started_at, "execute_batch", outcome)
+                for line in batch_result_lines(batch, index, groups[index], started, response=response,
+                                               error=error, status_code=status_code):
+                    yield line
+                if requests[index].session_id in batch_threads:
+                    batch_threads.discard(requests[index].session_id)
+                    await memory.adelete_thread(requests[index].session_id)
+        finally:
+            admission.leave(slots)
+            for thread_id in batch_threads:
+                await memory.adelete_thread(thread_id)
+            logger.info("Batch %s finished in %.2fs", batch_id, time.perf_counter() - started)
 
+    return StreamingResponse(
+        result_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
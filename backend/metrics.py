@@ -0,0 +1,146 @@
+import math
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits to slow LLM calls.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, values: Tuple) -> Tuple[str, ...]:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        return tuple(str(v) for v in values)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, one series per label combination."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with _bucket, _sum and _count series, as Prometheus expects."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        with self._lock:
+            # [count per bucket..., sum, count]
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format (version 0.0.4)."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+NODE_DURATION = Histogram(
+    "axonbot_node_duration_seconds", "Wall time of each agent graph node.", ["node"])
+REQUEST_DURATION = Histogram(
+    "axonbot_request_duration_seconds", "End-to-end latency of agent requests.", ["endpoint", "outcome"])
+LLM_TOKENS = Counter(
+    "axonbot_llm_tokens_total", "LLM tokens consumed, by model and direction (input/output).", ["model", "direction"])
+LLM_COST = Counter(
+    "axonbot_llm_cost_usd_total", "Estimated LLM spend in USD from LLM_PRICES_PER_MTOK.", ["model"])
+LLM_DURATION = Histogram(
+    "axonbot_llm_duration_seconds", "Latency of individual LLM calls.", ["model"])
+RETRIEVAL_DURATION = Histogram(
+    "axonbot_retrieval_duration_seconds", "Latency of knowledge-base and web retrieval.", ["source"])
+RETRIEVALS = Counter(
+    "axonbot_retrievals_total", "Retrieval outcomes (hit, empty, error) by source.", ["source", "outcome"])
+CACHE_REQUESTS = Counter(
+    "axonbot_cache_requests_total", "Cache lookups by cache and outcome (hit/miss).", ["cache", "outcome"])
+ROUTES = Counter(
+    "axonbot_routes_total", "Router decisions by route and by what decided it.", ["route", "source"])
+JUDGE_VERDICTS = Counter(
+    "axonbot_judge_verdicts_total", "RAG sufficiency verdicts by verdict and by what decided it.", ["verdict", "decided_by"])
+PROVIDER_CALLS = Counter(
+    "axonbot_provider_calls_total",
+    "Provider call attempts by outcome (ok, error, timeout, rejected, retried, hedged).", ["provider", "role", "outcome"])
+MODEL_TIERS = Counter(
+    "axonbot_model_tier_total",
+    "Calls served per cascade model, by why it served them (first_tier, escalated, failover, fallback).", ["role", "model", "reason"])
+PROVIDER_WAIT = Histogram(
+    "axonbot_provider_wait_seconds", "Time calls spent waiting for a rate-limit token and a concurrency slot.", ["provider"])
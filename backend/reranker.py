@@ -0,0 +1,70 @@
+import hashlib
+import threading
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+from search_cache import TTLCache
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores retrieved chunks with a small local cross-encoder, which reads
+    query and chunk together and ranks far better than bi-encoder similarity.
+
+    All uncached (query, chunk) pairs of a call go through the model in one
+    batched forward pass. Scores are cached per (query, chunk id); chunk ids
+    are derived from chunk content, so a cached score never goes stale.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 32, cache_size: int = 10_000,
+                 cache_ttl_seconds: float = 3600):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._cache = TTLCache(max_entries=cache_size, ttl_seconds=cache_ttl_seconds)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                # Imported here so the module stays importable without sentence-transformers.
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name, device="cpu")
+            return self._model
+
+    def warm_up(self):
+        self._get_model()
+
+    @staticmethod
+    def _chunk_key(document: Document) -> str:
+        return document.id or hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()
+
+    def score(self, query: str, documents: List[Document]) -> List[float]:
+        keys = [(query, self._chunk_key(d)) for d in documents]
+        scores: List[Optional[float]] = [self._cache.get(key) for key in keys]
+        missing = [i for i, s in enumerate(scores) if s is None]
+        if missing:
+            predicted = self._get_model().predict(
+                [(query, documents[i].page_content) for i in missing],
+                batch_size=max(self.batch_size, len(missing)),
+                show_progress_bar=False,
+            )
+            for i, value in zip(missing, predicted):
+                scores[i] = float(value)
+                self._cache.set(keys[i], scores[i])
+        return scores
+
+    def rerank(self, query: str, scored_chunks: List[Tuple[Document, float]],
+               top_n: int) -> List[Tuple[Document, float]]:
+        """
+        Orders chunks by cross-encoder score and keeps the top_n. The returned
+        score stays the cosine similarity, which the sufficiency thresholds are
+        calibrated for; the cross-encoder score goes to metadata["rerank_score"].
+        """
+        if not scored_chunks:
+            return []
+        scores = self.score(query, [d for d, _ in scored_chunks])
+        for (document, _), score in zip(scored_chunks, scores):
+            document.metadata["rerank_score"] = round(score, 4)
+        ranked = sorted(zip(scored_chunks, scores), key=lambda pair: pair[1], reverse=True)
+        return [pair for pair, _ in ranked[:top_n]]
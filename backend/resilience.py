@@ -0,0 +1,565 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait as wait_futures
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, TypeVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+
+from metrics import PROVIDER_CALLS, PROVIDER_WAIT
+from config import (PROVIDER_LIMITS, PROVIDER_LIMIT_DEFAULT, CALL_DEADLINES_SECONDS, CALL_DEADLINE_DEFAULT_SECONDS,
+                    PROVIDER_MAX_ATTEMPTS, PROVIDER_RETRY_BASE_SECONDS, PROVIDER_RETRY_MAX_SECONDS, HEDGE_ENABLED,
+                    HEDGE_ROLES, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = ("RateLimit", "Timeout", "ServiceUnavailable", "InternalServer", "APIConnection",
+                    "ResourceExhausted", "DeadlineExceeded", "Overloaded")
+
+
+class ProviderError(Exception):
+    pass
+
+
+class ProviderOverloaded(ProviderError):
+    """The provider's queue is full, or its rate limit cannot be met within the deadline; shed the call."""
+
+
+class ProviderTimeout(ProviderError, TimeoutError):
+    """The call did not finish within its deadline."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, 429s and 5xx are worth another attempt; everything else is not."""
+    if isinstance(error, ProviderOverloaded):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        status = error.code
+    if status in _RETRYABLE_STATUS:
+        return True
+    return any(name in type(error).__name__ for name in _RETRYABLE_NAMES)
+
+
+@dataclass
+class ProviderLimits:
+    rate_per_second: float
+    burst: int
+    max_concurrency: int
+    max_queue: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "ProviderLimits":
+        rate, burst, concurrency, queue = spec.split("/")
+        return cls(float(rate), int(burst), int(concurrency), int(queue))
+
+
+def parse_provider_limits(spec: str) -> Dict[str, ProviderLimits]:
+    """Parses 'google=10/20/16/64,...' (rate per second/burst/max concurrency/max queue) into limits per provider."""
+    limits = {}
+    for item in spec.split(","):
+        if "=" in item:
+            provider, values = item.split("=", 1)
+            limits[provider.strip()] = ProviderLimits.parse(values)
+    return limits
+
+
+# Roles whose output is streamed to the client: a hedged duplicate would stream its tokens too.
+STREAMING_ROLES = {"answer"}
+
+
+def parse_hedge_roles(spec: str) -> Set[str]:
+    """Parses 'router,judge,web' into a set of roles, leaving out streaming roles, which are never hedged."""
+    roles = {role.strip() for role in spec.split(",") if role.strip()}
+    for role in sorted(roles & STREAMING_ROLES):
+        logger.warning("Ignoring '%s' in HEDGE_ROLES: its output is streamed, so a hedged call would "
+                       "duplicate it.", role)
+    return roles - STREAMING_ROLES
+
+
+def parse_deadlines(spec: str) -> Dict[str, float]:
+    """Parses 'router=10,answer=60' into seconds per role."""
+    deadlines = {}
+    for item in spec.split(","):
+        if "=" in item:
+            role, seconds = item.split("=", 1)
+            deadlines[role.strip()] = float(seconds)
+    return deadlines
+
+
+class TokenBucket:
+    """Allows rate_per_second calls on average and bursts of up to `burst`. A rate of 0 means unlimited."""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill_locked(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Takes a token, going into debt if none is left, and returns how long the
+        caller must wait before using it. Callers that will not wait must refund().
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill_locked()
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill_locked()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def refund(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+
+class _Waiter:
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, event=None, loop=None, future=None):
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.granted = False
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` calls in flight; up to `max_queue` more wait in FIFO order
+    and any beyond that are rejected at once, which is the backpressure signal.
+
+    Works for threads and coroutines alike, so the sync and async graph paths
+    and the thread-pooled Tavily calls all share one bound. A released slot is
+    handed straight to the oldest waiter.
+    """
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = max(limit, 1)
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return True
+            return False
+
+    def _enqueue_locked(self, waiter: _Waiter):
+        if len(self._waiters) >= self.max_queue:
+            raise ProviderOverloaded(f"{len(self._waiters)} calls already queued")
+        self._waiters.append(waiter)
+
+    def acquire(self, timeout: float):
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = _Waiter(event=threading.Event())
+            self._enqueue_locked(waiter)
+        if waiter.event.wait(max(timeout, 0)):
+            return
+        with self._lock:
+            if waiter.granted:
+                return
+            self._waiters.remove(waiter)
+        raise ProviderTimeout("timed out waiting for a concurrency slot")
+
+    async def aacquire(self, timeout: float):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = _Waiter(loop=loop, future=loop.create_future())
+            self._enqueue_locked(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), max(timeout, 0))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted and isinstance(e, asyncio.TimeoutError):
+                return
+            if granted:
+                self.release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise ProviderTimeout("timed out waiting for a concurrency slot") from None
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                if waiter.event is not None:
+                    waiter.event.set()
+                else:
+                    waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                return
+            self.active -= 1
+
+
+class _LatencyWindow:
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class ProviderGuard:
+    """
+    Everything AxonBot calls on one provider (Gemini, Groq, Tavily) goes
+    through its guard, shared by all roles that use that provider:
+
+    - admission: a token bucket for the provider's rate limit and a bounded
+      concurrency limiter whose full queue rejects calls (ProviderOverloaded);
+    - a deadline covering queueing, every attempt and the backoff between them;
+    - retries of transient failures with full-jitter exponential backoff;
+    - optional hedging: once a call outlives the role's observed p95 latency,
+      a duplicate is sent if capacity is free, and the first result wins.
+    """
+
+    def __init__(self, name: str, limits: ProviderLimits, max_attempts: int = 3,
+                 retry_base_seconds: float = 0.25, retry_max_seconds: float = 4.0,
+                 hedge_percentile: float = 95, hedge_min_samples: int = 20):
+        self.name = name
+        self.limits = limits
+        self.bucket = TokenBucket(limits.rate_per_second, limits.burst)
+        self.limiter = ConcurrencyLimiter(limits.max_concurrency, limits.max_queue)
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: Dict[str, _LatencyWindow] = {}
+        # Sync calls run here so they can be abandoned at their deadline; the
+        # limiter already bounds how many run at once.
+        self._executor = ThreadPoolExecutor(max_workers=self.limiter.limit, thread_name_prefix=f"provider-{name}")
+
+    def _latency(self, role: str) -> _LatencyWindow:
+        window = self._latencies.get(role)
+        if window is None:
+            window = self._latencies.setdefault(role, _LatencyWindow())
+        return window
+
+    def observed_latency(self, role: str, percentile: float) -> Optional[float]:
+        """
+        The role's latency percentile over recent calls, None until there are
+        enough samples. Failed and timed-out calls count with the time they
+        took to fail, so a hanging provider pushes the percentile up too.
+        """
+        return self._latency(role).percentile(percentile, self.hedge_min_samples)
+
+    def _hedge_after(self, role: str, hedge: bool) -> Optional[float]:
+        if not hedge:
+            return None
+        return self._latency(role).percentile(self.hedge_percentile, self.hedge_min_samples)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+
+    def _rate_wait(self, remaining: float) -> float:
+        wait = self.bucket.reserve()
+        if wait > remaining:
+            self.bucket.refund()
+            raise ProviderOverloaded(f"{self.name} rate limit cannot be met within the deadline")
+        return wait
+
+    def _try_admit_hedge(self) -> bool:
+        if not self.limiter.try_acquire():
+            return False
+        if not self.bucket.try_take():
+            self.limiter.release()
+            return False
+        return True
+
+    # ---- sync ----
+
+    def _submit(self, fn: Callable[[], T]) -> "Future[T]":
+        # Copy the context so LangChain callbacks (tracing, token streaming) follow the call.
+        future = self._executor.submit(contextvars.copy_context().run, fn)
+        future.add_done_callback(lambda _: self.limiter.release())
+        return future
+
+    def _attempt(self, fn: Callable[[], T], role: str, deadline_at: float, hedge: bool) -> T:
+        remaining = deadline_at - time.monotonic()
+        started = time.monotonic()
+        time.sleep(self._rate_wait(remaining))
+        self.limiter.acquire(deadline_at - time.monotonic())
+        PROVIDER_WAIT.observe(time.monotonic() - started, self.name)
+
+        started = time.monotonic()
+        futures = {self._submit(fn)}
+        hedge_after = self._hedge_after(role, hedge)
+        if hedge_after is not None and started + hedge_after < deadline_at:
+            done, _ = wait_futures(futures, timeout=hedge_after)
+            if not done and self._try_admit_hedge():
+                PROVIDER_CALLS.inc(self.name, role, "hedged")
+                futures.add(self._submit(fn))
+
+        error: Optional[BaseException] = None
+        while futures:
+            done, futures = wait_futures(futures, timeout=max(deadline_at - time.monotonic(), 0),
+                                         return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    self._latency(role).add(time.monotonic() - started)
+                    return future.result()
+                error = future.exception()
+        self._latency(role).add(time.monotonic() - started)
+        # Abandoned calls keep their slot until they actually return.
+        if error is not None and not futures:
+            raise error
+        raise ProviderTimeout(f"{self.name} {role} call exceeded its deadline")
+
+    def call(self, fn: Callable[[], T], role: str, deadline: float, hedge: bool = False,
+             can_retry: Callable[[], bool] = lambda: True) -> T:
+        deadline_at = time.monotonic() + deadline
+        for attempt in range(self.max_attempts):
+            try:
+                result = self._attempt(fn, role, deadline_at, hedge)
+            except Exception as e:
+                backoff = self._backoff(attempt)
+                if (attempt + 1 >= self.max_attempts or not is_retryable(e) or not can_retry()
+                        or time.monotonic() + backoff >= deadline_at):
+                    PROVIDER_CALLS.inc(self.name, role, _outcome(e))
+                    raise
+                PROVIDER_CALLS.inc(self.name, role, "retried")
+                logger.warning("%s %s call failed (%s); retrying in %.2fs", self.name, role, e, backoff)
+                time.sleep(backoff)
+            else:
+                PROVIDER_CALLS.inc(self.name, role, "ok")
+                return result
+
+    # ---- async ----
+
+    def _spawn(self, afn: Callable[[], Awaitable[T]]) -> "asyncio.Task[T]":
+        task = asyncio.ensure_future(afn())
+        # A done callback, not a finally block: it also runs for a task cancelled before it started.
+        task.add_done_callback(lambda _: self.limiter.release())
+        return task
+
+    async def _aattempt(self, afn: Callable[[], Awaitable[T]], role: str, deadline_at: float, hedge: bool) -> T:
+        remaining = deadline_at - time.monotonic()
+        started = time.monotonic()
+        await asyncio.sleep(self._rate_wait(remaining))
+        await self.limiter.aacquire(deadline_at - time.monotonic())
+        PROVIDER_WAIT.observe(time.monotonic() - started, self.name)
+
+        started = time.monotonic()
+        tasks = {self._spawn(afn)}
+        try:
+            hedge_after = self._hedge_after(role, hedge)
+            if hedge_after is not None and started + hedge_after < deadline_at:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done and self._try_admit_hedge():
+                    PROVIDER_CALLS.inc(self.name, role, "hedged")
+                    tasks.add(self._spawn(afn))
+
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, timeout=max(deadline_at - time.monotonic(), 0),
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        self._latency(role).add(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            self._latency(role).add(time.monotonic() - started)
+            if error is not None and not tasks:
+                raise error
+            raise ProviderTimeout(f"{self.name} {role} call exceeded its deadline")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def acall(self, afn: Callable[[], Awaitable[T]], role: str, deadline: float, hedge: bool = False,
+                    can_retry: Callable[[], bool] = lambda: True) -> T:
+        deadline_at = time.monotonic() + deadline
+        for attempt in range(self.max_attempts):
+            try:
+                result = await self._aattempt(afn, role, deadline_at, hedge)
+            except Exception as e:
+                backoff = self._backoff(attempt)
+                if (attempt + 1 >= self.max_attempts or not is_retryable(e) or not can_retry()
+                        or time.monotonic() + backoff >= deadline_at):
+                    PROVIDER_CALLS.inc(self.name, role, _outcome(e))
+                    raise
+                PROVIDER_CALLS.inc(self.name, role, "retried")
+                logger.warning("%s %s call failed (%s); retrying in %.2fs", self.name, role, e, backoff)
+                await asyncio.sleep(backoff)
+            else:
+                PROVIDER_CALLS.inc(self.name, role, "ok")
+                return result
+
+
+def _outcome(error: BaseException) -> str:
+    if isinstance(error, ProviderOverloaded):
+        return "rejected"
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    return "error"
+
+
+class OutputWatcher(BaseCallbackHandler):
+    """Notices when a model has started streaming tokens, after which a retry would duplicate output."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.produced = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any):
+        self.produced = True
+
+
+def with_callback_handler(config: RunnableConfig, handler: BaseCallbackHandler) -> RunnableConfig:
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        callbacks = [handler]
+    elif isinstance(callbacks, list):
+        callbacks = [*callbacks, handler]
+    else:
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+    return {**config, "callbacks": callbacks}
+
+
+class GuardedModel:
+    """
+    Wraps a model (or any Runnable) so invoke/ainvoke go through its provider's
+    guard. A call is not retried once it has streamed tokens to the client.
+    """
+
+    def __init__(self, runnable: Runnable, guard: ProviderGuard, role: str, deadline: float, hedge: bool = False):
+        self.runnable = runnable
+        self.guard = guard
+        self.role = role
+        self.deadline = deadline
+        self.hedge = hedge
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        watcher = OutputWatcher()
+        config = with_callback_handler(ensure_config(config), watcher)
+        return self.guard.call(lambda: self.runnable.invoke(input, config, **kwargs), self.role, self.deadline,
+                               hedge=self.hedge, can_retry=lambda: not watcher.produced)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        watcher = OutputWatcher()
+        config = with_callback_handler(ensure_config(config), watcher)
+        return await self.guard.acall(lambda: self.runnable.ainvoke(input, config, **kwargs), self.role,
+                                      self.deadline, hedge=self.hedge, can_retry=lambda: not watcher.produced)
+
+
+_limits = parse_provider_limits(PROVIDER_LIMITS)
+_deadlines = parse_deadlines(CALL_DEADLINES_SECONDS)
+_hedge_roles = parse_hedge_roles(HEDGE_ROLES)
+_guards: Dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(provider: str) -> ProviderGuard:
+    """The process-wide guard for a provider, configured from PROVIDER_LIMITS."""
+    with _guards_lock:
+        if provider not in _guards:
+            _guards[provider] = ProviderGuard(
+                provider,
+                _limits.get(provider) or ProviderLimits.parse(PROVIDER_LIMIT_DEFAULT),
+                max_attempts=PROVIDER_MAX_ATTEMPTS,
+                retry_base_seconds=PROVIDER_RETRY_BASE_SECONDS,
+                retry_max_seconds=PROVIDER_RETRY_MAX_SECONDS,
+                hedge_percentile=HEDGE_PERCENTILE,
+                hedge_min_samples=HEDGE_MIN_SAMPLES,
+            )
+        return _guards[provider]
+
+
+def call_deadline(role: str) -> float:
+    return _deadlines.get(role, CALL_DEADLINE_DEFAULT_SECONDS)
+
+
+def hedging_enabled(role: str) -> bool:
+    return HEDGE_ENABLED and role in _hedge_roles
+
+
+def guard_model(runnable: Runnable, provider: str, role: str, label: Optional[str] = None) -> GuardedModel:
+    """
+    Deadline and hedging follow the role; label (default: the role) names the
+    call in metrics and keys its latency statistics, e.g. per cascade tier.
+    """
+    return GuardedModel(runnable, get_guard(provider), label or role, call_deadline(role), hedge=hedging_enabled(role))
+
+
+class AdmissionController:
+    """Caps the number of agent requests in flight; callers over the cap are turned away at once."""
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self) -> bool:
+        return self.try_enter_many(1) == 1
+
+    def try_enter_many(self, wanted: int) -> int:
+        """Takes up to `wanted` slots at once and returns how many were free (possibly 0)."""
+        with self._lock:
+            granted = wanted if not self.max_inflight else max(0, min(wanted, self.max_inflight - self.inflight))
+            self.inflight += granted
+            return granted
+
+    def leave(self, count: int = 1):
+        with self._lock:
+            self.inflight -= count
@@ -9,17 +9,70 @@ class RouteDecision(BaseModel):
 class RagJudge(BaseModel):
     sufficient: bool = Field(..., 
                     description="True if retrieved information is sufficient to answer the user's question, False otherwise.")
+    confidence: float | None = Field(None, ge=0, le=1, 
+                    description="How certain the verdict is, from 0 (a guess) to 1 (certain).")
 
 class DocumentUploadResponse(BaseModel):
     message: str
     filename: str
     processed_chunks: int
     document: str
+    document_id: str | None = None
+    namespace: str | None = None
+    chunks_added: int = 0
+    chunks_removed: int = 0
+    chunks_unchanged: int = 0
+
+class IngestionProgress(BaseModel):
+    pages_total: int = 0
+    pages_parsed: int = 0
+    chunks_split: int = 0
+    chunks_embedded: int = Field(0, 
+                    description="New or changed chunks embedded; unchanged chunks are skipped.")
+    vectors_upserted: int = 0
+
+class IngestionJob(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "finalizing", "succeeded", "failed", "cancelled"]
+    filename: str | None = None
+    document_id: str
+    namespace: str
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    cancel_requested: bool = False
+    progress: IngestionProgress = Field(default_factory=IngestionProgress)
+    result: DocumentUploadResponse | None = None
+    error: str | None = None
+    status_url: str | None = None
+
+class DocumentInfo(BaseModel):
+    document_id: str
+    filename: str | None = None
+    chunk_count: int
+    created_at: float
+    updated_at: float
+
+class DocumentListResponse(BaseModel):
+    namespace: str
+    documents: List[DocumentInfo] = Field(default_factory=list)
+
+class DocumentDeleteResponse(BaseModel):
+    message: str
+    document_id: str
+    namespace: str
+    chunks_deleted: int
 
 class QueryRequest(BaseModel):
     session_id: str
     query: str
     enable_web_search: bool = True
+    namespace: str = Field("default", 
+                    description="Knowledge-base namespace (tenant or session) to search.")
+    speculative_retrieval: bool | None = Field(None, 
+                    description="Start retrieval in parallel with routing; defaults to SPECULATIVE_RETRIEVAL.")
+    web_query_variants: List[str] = Field(default_factory=list, 
+                    description="Extra phrasings searched in parallel with the query when web search runs.")
 
 class TraceEvent(BaseModel):
     step: int
@@ -27,7 +80,47 @@ class TraceEvent(BaseModel):
     description: str
     details: Dict[str, Any] = Field(default_factory=dict)
     event_type: str
+    duration_ms: float | None = None
+    elapsed_ms: float | None = None
 
 class AgentResponse(BaseModel):
     response: str
-    trace_events: List[TraceEvent] = Field(default_factory=list)
\ No newline at end of file
+    trace_events: List[TraceEvent] = Field(default_factory=list)
+
+class BatchQueryItem(BaseModel):
+    query: str
+    id: str | None = Field(None, 
+                    description="Caller's identifier, echoed back in the item's result.")
+    session_id: str | None = Field(None, 
+                    description="Continue this conversation; without one the item runs in a fresh thread "
+                                "and identical queries in the batch share a single run.")
+
+class BatchQueryRequest(BaseModel):
+    items: List[BatchQueryItem] = Field(..., min_length=1)
+    enable_web_search: bool = True
+    namespace: str = "default"
+    max_concurrency: int | None = Field(None, ge=1, 
+                    description="Items run at once; defaults to BATCH_DEFAULT_CONCURRENCY.")
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: str | None = None
+    query: str
+    status: int
+    response: str | None = None
+    trace_events: List[TraceEvent] = Field(default_factory=list)
+    error: str | None = None
+    duplicate_of: int | None = Field(None, 
+                    description="Index of the identical item whose run produced this result.")
+    elapsed_ms: float | None = Field(None, 
+                    description="Time from the start of the batch until this item finished.")
+
+class ComponentStatus(BaseModel):
+    ready: bool
+    required: bool = True
+    init_seconds: float | None = None
+    error: str | None = None
+
+class ReadinessResponse(BaseModel):
+    status: str
+    components: Dict[str, ComponentStatus]
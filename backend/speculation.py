@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Dict, List, Optional
+
+
+class SpeculationStats:
+    """Process-wide counters of how often speculative lookups were actually used."""
+
+    def __init__(self):
+        self._launched = Counter()
+        self._hits = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, hit: bool):
+        with self._lock:
+            self._launched[kind] += 1
+            if hit:
+                self._hits[kind] += 1
+
+    def hit_rate(self, kind: str) -> Optional[float]:
+        with self._lock:
+            launched = self._launched[kind]
+            return round(self._hits[kind] / launched, 4) if launched else None
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                kind: {"launched": self._launched[kind], "hits": self._hits[kind]}
+                for kind in self._launched
+            }
+
+
+@dataclass
+class _Speculation:
+    query: str
+    started: float
+    tasks: Dict[str, asyncio.Task] = field(default_factory=dict)
+
+
+class SpeculativeRetrieval:
+    """
+    Holds retrieval tasks started alongside the router call until a later node
+    of the same run consumes or discards them. Tasks are keyed by a key the
+    router generates for each run (kept in the graph state), not by the
+    conversation thread, so two concurrent runs on one session never cancel
+    or consume each other's lookups. take() also checks the query the lookup
+    was started for.
+
+    Tasks are asyncio tasks, so they never leave this process and are not
+    written to the checkpointer; only their outcome is recorded in the state.
+    A run that fails before consuming its tasks leaves them behind, so they
+    are cancelled once older than max_age_seconds.
+    """
+
+    def __init__(self, max_age_seconds: float = 300.0):
+        self.stats = SpeculationStats()
+        self.max_age_seconds = max_age_seconds
+        self._runs: Dict[str, _Speculation] = {}
+
+    def launch(self, key: str, query: str, lookups: Dict[str, Awaitable[str]]) -> List[str]:
+        now = time.monotonic()
+        for stale in [k for k, run in self._runs.items() if now - run.started > self.max_age_seconds]:
+            self.discard(stale)
+        self.discard(key)
+        self._runs[key] = _Speculation(query, now, {kind: asyncio.ensure_future(coro) for kind, coro in lookups.items()})
+        return list(lookups)
+
+    def keep_only(self, key: str, kinds: List[str]):
+        run = self._runs.get(key)
+        for kind in list(run.tasks) if run else []:
+            if kind not in kinds:
+                self.discard(key, kind)
+
+    def take(self, key: Optional[str], kind: str, query: str) -> Optional[asyncio.Task]:
+        run = self._runs.get(key) if key else None
+        if run is None or kind not in run.tasks:
+            return None
+        if run.query != query:
+            # Not the lookup this run needs: never answer from another query's results.
+            self.discard(key, kind)
+            return None
+        task = run.tasks.pop(kind)
+        if not run.tasks:
+            del self._runs[key]
+        self.stats.record(kind, hit=True)
+        return task
+
+    def discard(self, key: Optional[str], kind: Optional[str] = None):
+        run = self._runs.get(key) if key else None
+        if run is None:
+            return
+        for k in [kind] if kind else list(run.tasks):
+            task = run.tasks.pop(k, None)
+            if task is not None:
+                task.cancel()
+                self.stats.record(k, hit=False)
+        if not run.tasks:
+            del self._runs[key]
+
+    def outcome(self, kind: str, hit: bool) -> dict:
+        return {"kind": kind, "outcome": "hit" if hit else "miss", "hit_rate": self.stats.hit_rate(kind)}
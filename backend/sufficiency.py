@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class SufficiencyDecision:
+    # None means the scores are inconclusive and the judge LLM must decide.
+    sufficient: Optional[bool]
+    reason: str
+    top_score: Optional[float] = None
+
+
+class SufficiencyPolicy:
+    """
+    Decides RAG sufficiency from retrieval similarity scores alone when the
+    case is clear, leaving only the uncertain band to the judge LLM:
+
+        no chunks                      -> not sufficient
+        top score >= sufficient_score  -> sufficient
+        top score <  insufficient_score-> not sufficient, unless a chunk
+                                          quotes an identifier from the query
+        anything in between            -> ask the judge
+    """
+
+    def __init__(self, sufficient_score: float = 0.75, insufficient_score: float = 0.3):
+        if insufficient_score > sufficient_score:
+            raise ValueError("insufficient_score must not be greater than sufficient_score.")
+        self.sufficient_score = sufficient_score
+        self.insufficient_score = insufficient_score
+
+    def decide(self, scores: List[float], exact_match: bool = False) -> SufficiencyDecision:
+        if not scores:
+            return SufficiencyDecision(False, "No chunks were retrieved.")
+
+        top_score = max(scores)
+        if top_score >= self.sufficient_score:
+            return SufficiencyDecision(True, f"Top similarity {top_score:.3f} >= {self.sufficient_score}.", top_score)
+        if top_score < self.insufficient_score and exact_match:
+            # Codes and part numbers embed poorly; a verbatim hit deserves a look from the judge.
+            return SufficiencyDecision(None, f"Top similarity {top_score:.3f} is low but a chunk matches an identifier exactly.", top_score)
+        if top_score < self.insufficient_score:
+            return SufficiencyDecision(False, f"Top similarity {top_score:.3f} < {self.insufficient_score}.", top_score)
+        return SufficiencyDecision(None, f"Top similarity {top_score:.3f} is in the uncertain band.", top_score)
@@ -0,0 +1,31 @@
+"""
+Runs the tests against the offline benchmark stubs: every store goes to a
+temporary directory and no Gemini, Groq, Pinecone or Tavily account is needed.
+Environment variables must be set before config is first imported.
+
+Run from backend/:
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.latency import LatencyProfile  # noqa: E402
+from benchmarks.run import install_stubs, isolate_storage  # noqa: E402
+
+DATA_DIR = tempfile.mkdtemp(prefix="axonbot-tests-")
+isolate_storage(DATA_DIR)
+os.environ.update({
+    "INGEST_JOBS_DB_PATH": os.path.join(DATA_DIR, "ingestion_jobs.sqlite"),
+    "SPECULATIVE_RETRIEVAL": "true",
+})
+
+# Zero latency: the stubs answer at once.
+NO_LATENCY = LatencyProfile(**{name: 0 for name in (
+    "router_ms", "judge_ms", "answer_first_token_ms", "answer_token_ms", "embed_call_ms", "embed_text_ms",
+    "vector_query_ms", "vector_upsert_ms", "web_ms")}, answer_tokens=8)
+install_stubs(NO_LATENCY)
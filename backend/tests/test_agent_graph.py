@@ -0,0 +1,68 @@
+"""Smoke tests of the compiled agent graph, driven by the benchmark stubs installed in conftest."""
+import asyncio
+import uuid
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import vectorstore
+from agent import AxonBotAgent
+from benchmarks.harness import TOPICS, synthetic_document
+
+NAMESPACE = "graph-smoke"
+
+
+@pytest.fixture(scope="module")
+def graph():
+    for i, (topic, fact) in enumerate(TOPICS):
+        vectorstore.add_document_to_vectorstore(synthetic_document(topic, fact, 2000, seed=i),
+                                                document_id=f"doc-{topic}", namespace=NAMESPACE)
+    return AxonBotAgent().workflow()
+
+
+def _config(web_search_enabled: bool = True) -> dict:
+    return {"configurable": {"thread_id": f"test-{uuid.uuid4().hex}", "web_search_enabled": web_search_enabled,
+                             "namespace": NAMESPACE}}
+
+
+async def _arun(graph, query: str, config: dict):
+    nodes = []
+    async for update in graph.astream({"messages": [HumanMessage(content=query)]}, config=config):
+        nodes.extend(update.keys())
+    return nodes, graph.get_state(config).values
+
+
+@pytest.mark.parametrize("query, path", [
+    ("What is the expense policy?", ["router", "rag_lookup", "answer"]),
+    ("What does the obscure travel appendix say?", ["router", "rag_lookup", "web_search", "answer"]),
+    ("What is the latest news on deployment?", ["router", "web_search", "answer"]),
+    ("Hello there!", ["router"]),
+])
+def test_routes(graph, query, path):
+    nodes, state = asyncio.run(_arun(graph, query, _config()))
+    assert nodes == path
+    assert isinstance(state["messages"][-1], AIMessage)
+    assert state["messages"][-1].content
+
+
+def test_rag_answer_uses_the_knowledge_base(graph):
+    _, state = asyncio.run(_arun(graph, "What is the vacation policy?", _config()))
+    assert "vacation" in state["rag"].lower()
+    # SPECULATIVE_RETRIEVAL is on in conftest: the lookup started beside the router is the one used.
+    assert state["speculation"]["kind"] == "rag"
+    assert state["speculation"]["outcome"] == "hit"
+
+
+def test_sync_stream_matches_async(graph):
+    config = _config()
+    nodes = []
+    for update in graph.stream({"messages": [HumanMessage(content="What is the onboarding policy?")]}, config=config):
+        nodes.extend(update.keys())
+    assert nodes == ["router", "rag_lookup", "answer"]
+
+
+def test_conversation_history_is_kept_per_thread(graph):
+    config = _config()
+    asyncio.run(_arun(graph, "What is the expense policy?", config))
+    _, state = asyncio.run(_arun(graph, "Who approves expense requests?", config))
+    assert [type(m) for m in state["messages"]] == [HumanMessage, AIMessage, HumanMessage, AIMessage]
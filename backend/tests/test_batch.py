@@ -0,0 +1,36 @@
+import asyncio
+import json
+import uuid
+
+import httpx
+
+from agent import memory
+from main import app
+
+
+def _threads() -> set:
+    return {t.config["configurable"]["thread_id"] for t in memory.list(None)}
+
+
+async def _post_batch(payload: dict) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        response = await client.post("/execute-batch", json=payload)
+        response.raise_for_status()
+        return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_session_less_items_leave_no_checkpoints():
+    session = f"user-{uuid.uuid4().hex}"
+    tag = uuid.uuid4().hex[:8]
+    results = asyncio.run(_post_batch({
+        "items": [{"query": f"What is the expense policy? ({tag} {i})"} for i in range(3)]
+                 + [{"query": f"What is the travel policy? ({tag})", "session_id": session}],
+        "enable_web_search": False,
+    }))
+
+    assert sorted(r["index"] for r in results) == [0, 1, 2, 3]
+    assert all(r["status"] == 200 for r in results)
+    threads = _threads()
+    assert session in threads
+    assert not any(thread_id.startswith("batch-") for thread_id in threads)
@@ -0,0 +1,45 @@
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+import cascade
+from cascade import ModelCascade, ModelOption, parse_cascade
+from resilience import GuardedModel, ProviderGuard, ProviderLimits
+
+
+def test_parse_cascade():
+    assert parse_cascade("groq:small,groq:large|google:other") == [
+        [("groq", "small")], [("groq", "large"), ("google", "other")]]
+
+
+def test_timing_out_primary_fails_over_once_over_the_slo(monkeypatch):
+    guards = {name: ProviderGuard(name, ProviderLimits(0, 1, 8, 8), max_attempts=1, hedge_min_samples=3)
+              for name in ("slow", "fast")}
+    monkeypatch.setattr(cascade, "get_guard", guards.get)
+    primary_calls = []
+
+    def hang(_):
+        primary_calls.append(1)
+        time.sleep(0.2)
+        return "late"
+
+    options = [
+        ModelOption("slow", "primary", GuardedModel(RunnableLambda(hang), guards["slow"], "judge", deadline=0.05)),
+        ModelOption("fast", "alternate",
+                    GuardedModel(RunnableLambda(lambda _: "ok"), guards["fast"], "judge", deadline=1)),
+    ]
+    judge = ModelCascade("judge", [options], slo_seconds=0.02, probe_ratio=0)
+
+    # Every call times out on the primary first, until it has enough samples to judge it by.
+    for _ in range(3):
+        result = judge.invoke("question")
+        assert result.output == "ok"
+        assert result.tier["failover_because"] == "primary failed (ProviderTimeout)"
+    assert len(primary_calls) == 3
+
+    result = judge.invoke("question")
+    assert result.output == "ok"
+    assert "over the 0.02s SLO" in result.tier["failover_because"]
+    assert len(primary_calls) == 3
+    assert guards["slow"].observed_latency("judge", 95) == pytest.approx(0.05, abs=0.03)
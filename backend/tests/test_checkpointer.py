@@ -0,0 +1,58 @@
+import time
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from checkpointer import BoundedSQLiteSaver
+
+
+def _put(saver: BoundedSQLiteSaver, thread_id: str, parent_id: str = None) -> str:
+    checkpoint = empty_checkpoint()
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": "", "checkpoint_id": parent_id}}
+    saver.put(config, checkpoint, {"source": "loop", "step": 0}, {})
+    return checkpoint["id"]
+
+
+def _thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_keeps_only_the_newest_checkpoints_per_thread(tmp_path):
+    saver = BoundedSQLiteSaver(str(tmp_path / "checkpoints.sqlite"), max_checkpoints_per_thread=3)
+    ids, parent = [], None
+    for _ in range(5):
+        parent = _put(saver, "thread", parent)
+        ids.append(parent)
+
+    kept = [t.config["configurable"]["checkpoint_id"] for t in saver.list(_thread_config("thread"))]
+    assert kept == ids[:-4:-1]
+    assert saver.get_tuple(_thread_config("thread")).config["configurable"]["checkpoint_id"] == ids[-1]
+
+
+def test_compact_evicts_least_recently_used_threads(tmp_path):
+    saver = BoundedSQLiteSaver(str(tmp_path / "checkpoints.sqlite"), max_threads=2)
+    for thread_id in ("oldest", "middle", "newest"):
+        _put(saver, thread_id)
+        time.sleep(0.01)
+
+    assert saver.compact() == 1
+    assert saver.get_tuple(_thread_config("oldest")) is None
+    assert saver.get_tuple(_thread_config("middle")) is not None
+    assert saver.get_tuple(_thread_config("newest")) is not None
+
+
+def test_compact_evicts_idle_threads(tmp_path):
+    saver = BoundedSQLiteSaver(str(tmp_path / "checkpoints.sqlite"), thread_ttl_seconds=0.05)
+    _put(saver, "idle")
+    time.sleep(0.06)
+    _put(saver, "active")
+
+    assert saver.compact() == 1
+    assert saver.get_tuple(_thread_config("idle")) is None
+    assert saver.get_tuple(_thread_config("active")) is not None
+
+
+def test_checkpoints_survive_reopening(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    checkpoint_id = _put(BoundedSQLiteSaver(path), "thread")
+    reopened = BoundedSQLiteSaver(path)
+    assert reopened.get_tuple(_thread_config("thread")).config["configurable"]["checkpoint_id"] == checkpoint_id
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from benchmarks.latency import LatencyProfile
+from benchmarks.stubs import StubEmbeddings
+from chunking import PageAwareChunker, citation_label, heading_title, split_sentences, split_text_pages
+
+
+@pytest.mark.parametrize("line, title", [
+    ("## Results", "Results"),
+    ("2.1 Expense Reports", "2.1 Expense Reports"),
+    ("TRAVEL POLICY", "Travel Policy"),
+    ("The policy applies to everyone.", None),
+    ("NOTE: FILL IN THE FORM.", None),
+    ("", None),
+])
+def test_heading_title(line, title):
+    assert heading_title(line) == title
+
+
+def test_split_sentences_keeps_abbreviated_numbers_together():
+    text = 'Reports are due in 30 days. Late ones need approval! "Ask finance." 3.5 days are allowed.'
+    assert split_sentences(text) == ["Reports are due in 30 days.", "Late ones need approval!",
+                                     '"Ask finance."', "3.5 days are allowed."]
+
+
+def test_split_text_pages():
+    assert split_text_pages("no pages") == [(None, "no pages")]
+    assert split_text_pages("one\ftwo") == [(1, "one"), (2, "two")]
+
+
+def test_chunks_record_pages_and_sections():
+    pages = [
+        (1, "1. Introduction\nThe handbook explains the rules. It applies to all staff and"),
+        (2, "contractors alike. Exceptions need approval.\n2. Travel\nTravel is booked through the travel desk."),
+    ]
+    chunks = list(PageAwareChunker(max_chars=500).split_pages(pages))
+
+    assert [c.page_content for c in chunks] == [
+        "The handbook explains the rules. It applies to all staff and contractors alike. Exceptions need approval.",
+        "Travel is booked through the travel desk.",
+    ]
+    # The paragraph runs across the page break; each sentence counts on the page it starts on.
+    assert chunks[0].metadata == {"page": 1, "page_end": 2, "section": "1. Introduction"}
+    assert chunks[1].metadata == {"page": 2, "page_end": 2, "section": "2. Travel"}
+
+
+def test_chunks_stay_under_max_chars():
+    text = " ".join(f"Sentence number {i} talks about the expense policy." for i in range(100))
+    chunks = list(PageAwareChunker(max_chars=300).split_pages([(None, text)]))
+    assert len(chunks) > 1
+    assert all(len(c.page_content) <= 300 for c in chunks)
+    assert " ".join(c.page_content for c in chunks) == text
+
+
+def test_hyphenated_line_breaks_are_joined():
+    chunks = list(PageAwareChunker().split_pages([(1, "Expense reports need a receipt for reimburse-\nment.")]))
+    assert chunks[0].page_content == "Expense reports need a receipt for reimbursement."
+
+
+def test_pooled_vectors_are_unit_length():
+    text = " ".join(f"Sentence {i} is about {'travel' if i < 20 else 'payroll'} rules." for i in range(40))
+    vectors = {}
+    embedding = StubEmbeddings(LatencyProfile(embed_call_ms=0, embed_text_ms=0), dim=64)
+    chunker = PageAwareChunker(embedding, max_chars=400, min_chars=50)
+    chunks = list(chunker.split_pages([(1, text)], vectors))
+
+    assert set(vectors) == {c.page_content for c in chunks}
+    for vector in vectors.values():
+        assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_citation_label():
+    assert citation_label({"page": 3, "page_end": 4, "section": "2.1 Results"}) == "[p. 3-4, §2.1 Results]"
+    assert citation_label({"page": 3}) == "[p. 3]"
+    assert citation_label({}) == ""
@@ -0,0 +1,74 @@
+from context_packing import TokenCounter, pack_context, parse_budgets, remove_overlaps, split_web_results
+
+
+class WordCounter(TokenCounter):
+    """One token per word, so budgets in the tests are easy to reason about."""
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return " ".join(text.split()[:max_tokens]) + " ..."
+
+
+def _words(prefix: str, n: int) -> str:
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+def test_parse_budgets():
+    assert parse_budgets("model-a=2000, model-b=4000,bad") == {"model-a": 2000, "model-b": 4000}
+
+
+def test_remove_overlaps_drops_duplicates_and_contained_passages():
+    passages = ["alpha beta gamma delta", "alpha beta gamma delta", "beta gamma", "epsilon zeta"]
+    assert remove_overlaps(passages, min_overlap=4) == ["alpha beta gamma delta", "epsilon zeta"]
+
+
+def test_remove_overlaps_trims_shared_chunk_overlap():
+    shared = "the shared sentence carried over by the splitter."
+    first = f"Opening text. {shared}"
+    second = f"{shared} Closing text."
+    assert remove_overlaps([first, second], min_overlap=16) == [first, "Closing text."]
+    assert remove_overlaps([second, first], min_overlap=16) == [second, "Opening text."]
+
+
+def test_remove_overlaps_labels_the_surviving_passages():
+    passages = ["first passage text", "first passage text", "second passage text"]
+    kept = remove_overlaps(passages, labels=["[p. 1]", "[p. 2]", "[p. 3]"])
+    assert kept == ["[p. 1] first passage text", "[p. 3] second passage text"]
+
+
+def test_pack_context_shares_the_budget_between_sections():
+    counter = WordCounter()
+    docs = [_words("d", 30), _words("e", 30)]
+    web = [_words("w", 30), _words("x", 30)]
+    packed = pack_context([("docs", docs), ("web", web)], budget=80, counter=counter, min_truncated_tokens=10)
+
+    assert packed.sections["docs"][0] == docs[0]
+    assert packed.sections["web"][0] == web[0]
+    assert packed.tokens <= 80
+    assert packed.truncated == 1
+    assert packed.dropped == 1
+
+
+def test_pack_context_gives_unused_budget_to_the_other_section():
+    counter = WordCounter()
+    docs = [_words("d", 10)]
+    web = [_words("w", 40), _words("x", 45)]
+    packed = pack_context([("docs", docs), ("web", web)], budget=100, counter=counter, min_truncated_tokens=100)
+
+    # web's second passage does not fit its half of the budget, but fits what docs left over.
+    assert packed.sections == {"docs": docs, "web": web}
+    assert packed.tokens == 95
+    assert packed.dropped == 0
+
+
+def test_render_labels_sections():
+    packed = pack_context([("docs", ["a b"]), ("web", [])], budget=10, counter=WordCounter())
+    assert packed.render({"docs": "Knowledge base:"}) == "Knowledge base:\na b"
+
+
+def test_split_web_results():
+    web = "Title: one\nURL: a\n\nTitle: two\nURL: b"
+    assert split_web_results(web) == ["Title: one\nURL: a", "Title: two\nURL: b"]
+    assert split_web_results("  ") == []
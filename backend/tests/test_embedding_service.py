@@ -0,0 +1,59 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from embedding_service import MicroBatchingEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = []
+        self.fail_with = None
+        self.block = None
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        if self.block is not None:
+            self.block.wait(5)
+        if self.fail_with is not None:
+            error, self.fail_with = self.fail_with, None
+            raise error
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_concurrent_queries_share_one_batch():
+    underlying = CountingEmbeddings()
+    embeddings = MicroBatchingEmbeddings(underlying, max_batch_size=8, max_wait_ms=50)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        vectors = list(pool.map(embeddings.embed_query, ["a", "bb", "ccc", "dddd"]))
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0]]
+    assert len(underlying.calls) < 4
+
+
+def test_worker_survives_a_base_exception_from_the_model():
+    underlying = CountingEmbeddings()
+    underlying.fail_with = KeyboardInterrupt()
+    embeddings = MicroBatchingEmbeddings(underlying, max_wait_ms=1, timeout_seconds=5)
+
+    with pytest.raises(KeyboardInterrupt):
+        embeddings.embed_query("first")
+    assert embeddings.embed_query("second") == [6.0]
+
+
+def test_callers_give_up_after_the_timeout():
+    underlying = CountingEmbeddings()
+    underlying.block = threading.Event()
+    embeddings = MicroBatchingEmbeddings(underlying, max_wait_ms=1, timeout_seconds=0.05)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        embeddings.embed_query("stuck")
+    assert time.monotonic() - started < 1
+    underlying.block.set()
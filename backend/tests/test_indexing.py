@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+import vectorstore
+from chunking import split_text_pages
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _namespace() -> str:
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def _paragraphs(*topics: str) -> str:
+    return "\n\n".join(f"The {topic} policy covers {topic} requests. Every {topic} form needs a manager signature."
+                       for topic in topics)
+
+
+def _chunk_ids(namespace: str) -> set:
+    return set(vectorstore.get_backend().get_vector_store(namespace).index.ids)
+
+
+def test_reindexing_only_touches_changed_chunks():
+    namespace = _namespace()
+    first = vectorstore.add_document_to_vectorstore(_paragraphs("expense", "travel"), document_id="handbook",
+                                                    namespace=namespace)
+    assert first["chunks_added"] == first["chunks_total"] > 0
+    before = _chunk_ids(namespace)
+
+    unchanged = vectorstore.add_document_to_vectorstore(_paragraphs("expense", "travel"), document_id="handbook",
+                                                        namespace=namespace)
+    assert unchanged["chunks_added"] == unchanged["chunks_removed"] == 0
+    assert _chunk_ids(namespace) == before
+
+    changed = vectorstore.add_document_to_vectorstore(_paragraphs("expense", "vacation"), document_id="handbook",
+                                                      namespace=namespace)
+    assert changed["chunks_added"] > 0 and changed["chunks_removed"] > 0
+    after = _chunk_ids(namespace)
+    assert after == vectorstore.get_registry().get_chunk_ids(namespace, "handbook")
+    assert after != before
+
+
+def test_documents_in_a_namespace_are_independent():
+    namespace = _namespace()
+    vectorstore.add_document_to_vectorstore(_paragraphs("expense"), document_id="a", namespace=namespace)
+    vectorstore.add_document_to_vectorstore(_paragraphs("travel"), document_id="b", namespace=namespace)
+    kept = vectorstore.get_registry().get_chunk_ids(namespace, "b")
+
+    assert vectorstore.delete_document("a", namespace=namespace) > 0
+    assert _chunk_ids(namespace) == kept
+    assert vectorstore.delete_document("a", namespace=namespace) is None
+
+
+def test_failed_reindex_keeps_the_previous_version():
+    namespace = _namespace()
+    vectorstore.add_document_to_vectorstore(_paragraphs("expense"), document_id="handbook", namespace=namespace)
+    before = _chunk_ids(namespace)
+    version = vectorstore.get_kb_version(namespace)
+
+    def cancel(stage, count):
+        if stage == "committing":
+            raise RuntimeError("cancelled")
+
+    documents, vectors = vectorstore.split_pages(split_text_pages(_paragraphs("travel")))
+    with pytest.raises(RuntimeError):
+        vectorstore.index_document(documents, "handbook", namespace=namespace, progress=cancel, vectors=vectors)
+
+    assert _chunk_ids(namespace) == before
+    assert vectorstore.get_registry().get_chunk_ids(namespace, "handbook") == before
+    assert vectorstore.get_kb_version(namespace) == version
+
+
+def test_search_finds_the_indexed_passage():
+    namespace = _namespace()
+    vectorstore.add_document_to_vectorstore(_paragraphs("expense", "travel", "vacation"), document_id="handbook",
+                                            namespace=namespace)
+    results = vectorstore.search_with_scores("What is the vacation policy?", namespace=namespace, k=1)
+    assert "vacation" in results[0][0].page_content
+
+
+def test_reupload_refreshes_the_pages_of_moved_chunks():
+    namespace = _namespace()
+    body = f"1. Expenses\n{_paragraphs('expense')}\f{_paragraphs('travel')}"
+    vectorstore.add_document_to_vectorstore(body, document_id="handbook", namespace=namespace)
+    index = vectorstore.get_backend().get_vector_store(namespace).index
+    assert min(metadata["page"] for metadata in index.metadatas) == 1
+
+    # A new cover page pushes the same text one page down; the heading keeps it out of the chunk.
+    stats = vectorstore.add_document_to_vectorstore(f"Cover page.\f{body}", document_id="handbook",
+                                                    namespace=namespace)
+    assert stats["chunks_removed"] > 0
+    moved = [metadata for text, metadata in zip(index.texts, index.metadatas) if "expense" in text]
+    assert moved and all(metadata["page"] >= 2 for metadata in moved)
+    assert set(index.ids) == vectorstore.get_registry().get_chunk_ids(namespace, "handbook")
+
+
+def test_importing_ingestion_opens_no_stores(tmp_path):
+    # What every spawn-started PDF parsing worker does on start-up.
+    env = {**os.environ, "DOCUMENT_REGISTRY_PATH": str(tmp_path / "registry" / "documents.sqlite")}
+    subprocess.run([sys.executable, "-c", "import ingestion"], cwd=BACKEND_DIR, env=env, check=True)
+    assert not (tmp_path / "registry").exists()
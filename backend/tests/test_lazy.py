@@ -0,0 +1,54 @@
+import threading
+import uuid
+
+import pytest
+
+from lazy import LazyComponent, is_ready
+
+
+def _name() -> str:
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def test_concurrent_first_callers_share_one_instance():
+    created = []
+    component = LazyComponent(_name(), lambda: created.append(1) or object())
+    instances = []
+    threads = [threading.Thread(target=lambda: instances.append(component.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert created == [1]
+    assert len({id(instance) for instance in instances}) == 1
+
+
+def test_failed_creation_is_recorded_and_retried():
+    attempts = []
+
+    def create():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("no key")
+        return "client"
+
+    component = LazyComponent(_name(), create)
+    with pytest.raises(RuntimeError):
+        component.get()
+    assert component.status()["error"] == "RuntimeError: no key"
+    assert component.get() == "client"
+    assert component.status()["error"] is None
+
+
+def test_only_required_components_gate_readiness():
+    required = LazyComponent(_name(), lambda: "model")
+    optional = LazyComponent(_name(), lambda: (_ for _ in ()).throw(RuntimeError("no key")), required=False)
+    with pytest.raises(RuntimeError):
+        optional.get()
+
+    components = {c.name: c.status() for c in (required, optional)}
+    assert not is_ready(components)
+    required.get()
+    components = {c.name: c.status() for c in (required, optional)}
+    assert is_ready(components)
@@ -0,0 +1,114 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import local_vectorstore
+from local_vectorstore import LocalVectorIndex
+
+
+def _vector(*hot: int, dim: int = 8) -> list:
+    vector = [0.0] * dim
+    for i in hot:
+        vector[i] = 1.0
+    return vector
+
+
+def _add(index: LocalVectorIndex, ids, persist: bool = True):
+    index.add(ids, [f"text {doc_id}" for doc_id in ids], [_vector(int(doc_id)) for doc_id in ids],
+              [{"n": int(doc_id)} for doc_id in ids], persist=persist)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_upsert_delete_and_query(tmp_path, dtype):
+    index = LocalVectorIndex(str(tmp_path), dtype=dtype)
+    _add(index, ["0", "1", "2", "3"])
+
+    results = index.query(_vector(2), top_k=2)
+    assert [document.id for document, _, _ in results][0] == "2"
+    document, score, vector = results[0]
+    assert document.page_content == "text 2" and document.metadata == {"n": 2}
+    assert score == pytest.approx(1.0, abs=0.01)
+    assert np.allclose(vector, _vector(2), atol=0.01)
+
+    # Re-adding an id replaces its row instead of duplicating it.
+    index.add(["2"], ["moved"], [_vector(5)], [{"n": 5}])
+    assert len(index) == 4
+    assert index.query(_vector(5), top_k=1)[0][0].page_content == "moved"
+
+    index.delete(["0", "2"])
+    assert len(index) == 2
+    assert {document.id for document, _, _ in index.query(_vector(0), top_k=10)} == {"1", "3"}
+    assert set(index.get_vectors(["1", "2", "3"])) == {"1", "3"}
+
+
+def test_persisted_index_reloads(tmp_path):
+    index = LocalVectorIndex(str(tmp_path))
+    _add(index, ["0", "1", "2"])
+    index.delete(["1"])
+
+    reloaded = LocalVectorIndex(str(tmp_path))
+    assert reloaded.ids == ["0", "2"]
+    assert reloaded.query(_vector(2), top_k=1)[0][0].id == "2"
+
+    reloaded.delete(delete_all=True)
+    assert len(LocalVectorIndex(str(tmp_path))) == 0
+
+
+def test_deferred_writes_reach_disk_on_persist(tmp_path):
+    index = LocalVectorIndex(str(tmp_path))
+    _add(index, ["0"])
+    _add(index, ["1", "2"], persist=False)
+    index.delete(["0"], persist=False)
+    assert len(LocalVectorIndex(str(tmp_path))) == 1
+
+    index.persist()
+    assert LocalVectorIndex(str(tmp_path)).ids == ["1", "2"]
+
+
+def test_rows_beyond_capacity_are_appended(tmp_path):
+    index = LocalVectorIndex(str(tmp_path))
+    for start in range(0, 64, 4):
+        index.add([str(start + i) for i in range(4)], ["t"] * 4, [_vector(i, dim=8) for i in range(4)],
+                  [{}] * 4, persist=False)
+    assert len(index) == 64
+    assert len(index.query(_vector(1), top_k=100)) == 64
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_a_crash_before_the_docstore_swap_keeps_the_old_snapshot(tmp_path, monkeypatch, dtype):
+    index = LocalVectorIndex(str(tmp_path), dtype=dtype)
+    _add(index, ["0", "1"])
+    _add(index, ["2"], persist=False)
+
+    def crash(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(local_vectorstore.json, "dump", crash)
+    with pytest.raises(OSError):
+        index.persist()
+    monkeypatch.undo()
+
+    reloaded = LocalVectorIndex(str(tmp_path), dtype=dtype)
+    assert reloaded.ids == ["0", "1"]
+    assert reloaded.query(_vector(1), top_k=1)[0][0].id == "1"
+
+    # The failed write is retried, and only the newest generation's arrays stay on disk.
+    index.persist()
+    assert LocalVectorIndex(str(tmp_path), dtype=dtype).ids == ["0", "1", "2"]
+    arrays = sorted(name for name in os.listdir(tmp_path) if name.endswith(".npy"))
+    assert len(arrays) == (2 if dtype == "int8" else 1)
+
+
+def test_inconsistent_files_are_rejected(tmp_path):
+    index = LocalVectorIndex(str(tmp_path))
+    _add(index, ["0", "1"])
+    with open(tmp_path / local_vectorstore.DOCSTORE_FILE, encoding="utf-8") as f:
+        docstore = json.load(f)
+    docstore["ids"].append("2")
+    with open(tmp_path / local_vectorstore.DOCSTORE_FILE, "w", encoding="utf-8") as f:
+        json.dump(docstore, f)
+
+    with pytest.raises(ValueError, match="inconsistent"):
+        LocalVectorIndex(str(tmp_path))
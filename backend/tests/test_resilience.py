@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from resilience import (ConcurrencyLimiter, ProviderGuard, ProviderLimits, ProviderOverloaded, ProviderTimeout,
+                        TokenBucket, parse_hedge_roles, parse_provider_limits)
+
+
+def test_parse_provider_limits():
+    limits = parse_provider_limits("google=10/20/16/64, groq=0.5/5/4/32")
+    assert limits["google"] == ProviderLimits(10.0, 20, 16, 64)
+    assert limits["groq"] == ProviderLimits(0.5, 5, 4, 32)
+
+
+def test_token_bucket_allows_a_burst_then_charges_the_wait():
+    bucket = TokenBucket(rate_per_second=10, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+    assert not bucket.try_take()
+
+
+def test_token_bucket_refund_returns_the_token():
+    bucket = TokenBucket(rate_per_second=1, burst=1)
+    assert bucket.try_take()
+    assert not bucket.try_take()
+    bucket.refund()
+    assert bucket.try_take()
+
+
+def test_token_bucket_with_zero_rate_is_unlimited():
+    bucket = TokenBucket(rate_per_second=0, burst=1)
+    assert all(bucket.reserve() == 0.0 for _ in range(100))
+
+
+def test_limiter_rejects_beyond_the_queue():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=0)
+    limiter.acquire(timeout=1)
+    with pytest.raises(ProviderOverloaded):
+        limiter.acquire(timeout=1)
+    limiter.release()
+    assert limiter.try_acquire()
+
+
+def test_limiter_times_out_a_queued_waiter():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=1)
+    limiter.acquire(timeout=1)
+    with pytest.raises(ProviderTimeout):
+        limiter.acquire(timeout=0.05)
+    # The timed-out waiter left the queue, so the slot goes back to the pool.
+    limiter.release()
+    assert limiter.active == 0
+
+
+def test_limiter_hands_a_released_slot_to_the_oldest_waiter():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=2)
+    limiter.acquire(timeout=1)
+    order = []
+
+    def wait(name):
+        limiter.acquire(timeout=5)
+        order.append(name)
+        limiter.release()
+
+    first = threading.Thread(target=wait, args=("first",))
+    first.start()
+    time.sleep(0.05)
+    second = threading.Thread(target=wait, args=("second",))
+    second.start()
+    time.sleep(0.05)
+    limiter.release()
+    first.join(5)
+    second.join(5)
+    assert order == ["first", "second"]
+    assert limiter.active == 0
+
+
+def test_limiter_async_waiters_share_the_bound():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=2, max_queue=8)
+        running = peak = 0
+
+        async def call():
+            nonlocal running, peak
+            await limiter.aacquire(timeout=5)
+            try:
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+            finally:
+                limiter.release()
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        return peak, limiter.active
+
+    assert asyncio.run(scenario()) == (2, 0)
+
+
+def test_guard_retries_transient_failures():
+    guard = ProviderGuard("test", ProviderLimits(0, 1, 2, 2), max_attempts=3, retry_base_seconds=0.001)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TimeoutError("slow")
+        return "ok"
+
+    assert guard.call(flaky, "answer", deadline=5) == "ok"
+    assert len(attempts) == 3
+
+
+def test_guard_does_not_retry_other_errors():
+    guard = ProviderGuard("test", ProviderLimits(0, 1, 2, 2), max_attempts=3, retry_base_seconds=0.001)
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        guard.call(broken, "answer", deadline=5)
+    assert len(attempts) == 1
+
+
+def test_timed_out_and_failed_calls_count_towards_observed_latency():
+    guard = ProviderGuard("test", ProviderLimits(0, 1, 4, 4), max_attempts=1, hedge_min_samples=3)
+
+    def hang():
+        time.sleep(0.2)
+
+    for _ in range(3):
+        with pytest.raises(ProviderTimeout):
+            guard.call(hang, "judge", deadline=0.05)
+    assert guard.observed_latency("judge", 95) == pytest.approx(0.05, abs=0.03)
+
+    async def fail():
+        await asyncio.sleep(0.03)
+        raise ValueError("bad request")
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            asyncio.run(guard.acall(fail, "answer", deadline=5))
+    assert guard.observed_latency("answer", 95) >= 0.03
+
+
+def test_streaming_roles_are_never_hedged():
+    assert parse_hedge_roles("router, judge,answer,web") == {"router", "judge", "web"}
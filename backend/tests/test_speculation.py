@@ -0,0 +1,71 @@
+import asyncio
+
+from speculation import SpeculativeRetrieval
+
+
+async def _lookup(value: str, seconds: float = 0) -> str:
+    await asyncio.sleep(seconds)
+    return value
+
+
+def test_take_returns_the_lookup_launched_for_the_run():
+    async def scenario():
+        speculation = SpeculativeRetrieval()
+        assert speculation.launch("run-1", "query", {"rag": _lookup("docs")}) == ["rag"]
+        task = speculation.take("run-1", "rag", "query")
+        assert await task == "docs"
+        assert speculation.take("run-1", "rag", "query") is None
+        assert speculation.stats.snapshot() == {"rag": {"launched": 1, "hits": 1}}
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_runs_do_not_share_lookups():
+    async def scenario():
+        speculation = SpeculativeRetrieval()
+        speculation.launch("run-1", "first", {"rag": _lookup("first docs")})
+        speculation.launch("run-2", "second", {"rag": _lookup("second docs")})
+        assert await speculation.take("run-2", "rag", "second") == "second docs"
+        assert await speculation.take("run-1", "rag", "first") == "first docs"
+
+    asyncio.run(scenario())
+
+
+def test_take_discards_a_lookup_for_another_query():
+    async def scenario():
+        speculation = SpeculativeRetrieval()
+        speculation.launch("run-1", "original", {"rag": _lookup("docs")})
+        assert speculation.take("run-1", "rag", "rewritten") is None
+        assert speculation.take("run-1", "rag", "original") is None
+        assert speculation.stats.hit_rate("rag") == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_keep_only_cancels_the_other_kinds():
+    async def scenario():
+        speculation = SpeculativeRetrieval()
+        speculation.launch("run-1", "query", {"rag": _lookup("docs"), "web": _lookup("web", seconds=10)})
+        web = speculation._runs["run-1"].tasks["web"]
+        speculation.keep_only("run-1", ["rag"])
+        await asyncio.sleep(0)
+        assert web.cancelled()
+        assert speculation.take("run-1", "web", "query") is None
+        assert await speculation.take("run-1", "rag", "query") == "docs"
+
+    asyncio.run(scenario())
+
+
+def test_launch_purges_abandoned_runs():
+    async def scenario():
+        speculation = SpeculativeRetrieval(max_age_seconds=0)
+        speculation.launch("abandoned", "query", {"rag": _lookup("docs", seconds=10)})
+        abandoned = speculation._runs["abandoned"].tasks["rag"]
+        await asyncio.sleep(0.01)
+        speculation.launch("next", "query", {"rag": _lookup("docs")})
+        await asyncio.sleep(0)
+        assert "abandoned" not in speculation._runs
+        assert abandoned.cancelled()
+        speculation.discard("next")
+
+    asyncio.run(scenario())
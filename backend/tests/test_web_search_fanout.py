@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+import tools
+
+
+def _fake_search(responses: dict):
+    def search(query):
+        response = responses[query]
+        if isinstance(response, Exception):
+            raise response
+        return response
+    return search
+
+
+def _fanout(monkeypatch, responses: dict) -> str:
+    monkeypatch.setattr(tools, "search_web", _fake_search(responses))
+    return asyncio.run(tools.web_search_fanout(list(responses)))
+
+
+def test_merges_variants_by_score_without_duplicate_urls(monkeypatch):
+    merged = _fanout(monkeypatch, {
+        "a": {"results": [{"title": "A", "url": "https://a", "content": "a", "score": 0.5}]},
+        "b": {"results": [{"title": "B", "url": "https://b", "content": "b", "score": 0.9},
+                          {"title": "A again", "url": "https://a", "content": "a", "score": 0.4}]},
+    })
+    assert merged.startswith("Title: B")
+    assert merged.count("https://a") == 1
+
+
+@pytest.mark.parametrize("empty", ["", [], {"results": []}, None])
+def test_empty_results_are_not_errors(monkeypatch, empty):
+    assert _fanout(monkeypatch, {"a": empty, "b": empty}) == "No results found"
+
+
+def test_errors_only_when_every_variant_raised(monkeypatch):
+    assert _fanout(monkeypatch, {"a": RuntimeError("down"), "b": ""}) == "No results found"
+    assert _fanout(monkeypatch, {"a": RuntimeError("down"), "b": TimeoutError("slow")}).startswith("WEB_ERROR::down")
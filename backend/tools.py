@@ -1,12 +1,85 @@
 from langchain_core.tools import tool
 from langchain_tavily import TavilySearch
-from vectorstore import get_retriever
+from langchain_core.documents import Document
+from typing import Any, List, Tuple
+import asyncio
+import time
+from vectorstore import search_with_scores
+from chunking import citation_label
+from search_cache import TTLCache, SingleFlight
+from lazy import LazyComponent
+from resilience import get_guard, call_deadline, hedging_enabled
+from metrics import CACHE_REQUESTS, RETRIEVALS, RETRIEVAL_DURATION
+from reranker import CrossEncoderReranker
+from config import (DEFAULT_NAMESPACE, WEB_SEARCH_CACHE_SIZE, WEB_SEARCH_CACHE_TTL_SECONDS, RERANK_ENABLED,
+                    RERANK_MODEL, RERANK_CANDIDATES, RERANK_TOP_N, RERANK_BATCH_SIZE, RERANK_CACHE_SIZE)
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-tavily=TavilySearch(max_results=3,search_depth='basic',topic='general')
+# Optional: web search is off without a Tavily key, which must not hold back /ready.
+tavily=LazyComponent("tavily", lambda: TavilySearch(max_results=3,search_depth='basic',topic='general'),
+                     required=False)
+
+web_search_cache=TTLCache(max_entries=WEB_SEARCH_CACHE_SIZE, ttl_seconds=WEB_SEARCH_CACHE_TTL_SECONDS)
+_web_search_flights=SingleFlight()
+_retrieval_flights=SingleFlight()
+
+def _create_reranker() -> CrossEncoderReranker:
+    model=CrossEncoderReranker(RERANK_MODEL, batch_size=RERANK_BATCH_SIZE, cache_size=RERANK_CACHE_SIZE)
+    model.warm_up()
+    return model
+
+reranker=LazyComponent("reranker", _create_reranker) if RERANK_ENABLED else None
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+def search_web(query: str) -> Any:
+    """
+    Raw Tavily search behind a normalized-query TTL cache. Concurrent calls
+    for the same normalized query share a single Tavily request.
+    """
+    key = normalize_query(query)
+    cached = web_search_cache.get(key)
+    if cached is not None:
+        CACHE_REQUESTS.inc("web_search", "hit")
+        return cached
+    CACHE_REQUESTS.inc("web_search", "miss")
+
+    def run():
+        start = time.perf_counter()
+        try:
+            result = get_guard("tavily").call(
+                lambda: tavily.get().invoke({"query": query}),
+                "web", call_deadline("web"), hedge=hedging_enabled("web")
+            )
+        except Exception:
+            RETRIEVALS.inc("web", "error")
+            raise
+        finally:
+            RETRIEVAL_DURATION.observe(time.perf_counter() - start, "web")
+        if isinstance(result, dict) and 'results' in result:
+            web_search_cache.set(key, result)
+            RETRIEVALS.inc("web", "hit" if result['results'] else "empty")
+        else:
+            RETRIEVALS.inc("web", "empty")
+        return result
+
+    return _web_search_flights.do(key, run)
+
+def format_web_results(result: Any) -> str:
+    if isinstance(result, dict) and 'results' in result:
+        formatted_results = []
+        for item in result['results']:
+            title = item.get('title', 'No title')
+            content = item.get('content', 'No content')
+            url = item.get('url', '')
+            formatted_results.append(f"Title: {title}\nContent: {content}\nURL: {url}")
+        return "\n\n".join(formatted_results) if formatted_results else "No results found"
+    else:
+        return str(result)
 
 @tool
 def web_search_tool(query: str) -> str:
@@ -24,27 +97,54 @@ def web_search_tool(query: str) -> str:
              it returns an error message prefixed with 'WEB_ERROR::'.
     """
     try:
-        result = tavily.invoke({"query": query})
-        if isinstance(result, dict) and 'results' in result:
-            formatted_results = []
-            for item in result['results']:
-                title = item.get('title', 'No title')
-                content = item.get('content', 'No content')
-                url = item.get('url', '')
-                formatted_results.append(f"Title: {title}\nContent: {content}\nURL: {url}")
-            return "\n\n".join(formatted_results) if formatted_results else "No results found"
-        else:
-            return str(result)
+        return format_web_results(search_web(query))
     except Exception as e:
         return f"WEB_ERROR::{e}"
+
+async def web_search_fanout(queries: List[str]) -> str:
+    """
+    Runs several query variants in parallel and merges their results,
+    dropping duplicate URLs and ordering by Tavily's relevance score.
+
+    Args:
+        queries (List[str]): The query variants; duplicates after normalization are searched once.
+
+    Returns:
+        str: The merged results in the same format as web_search_tool, or
+             'WEB_ERROR::...' if every variant raised. A variant that
+             returns nothing usable (an empty string or list) counts as empty.
+    """
+    unique_queries = list({normalize_query(q): q for q in queries if q.strip()}.values())
+    results = await asyncio.gather(*(asyncio.to_thread(search_web, q) for q in unique_queries), return_exceptions=True)
+
+    merged, seen_urls, errors = [], set(), []
+    for result in results:
+        if isinstance(result, BaseException):
+            errors.append(str(result))
+            continue
+        if not (isinstance(result, dict) and 'results' in result):
+            continue
+        for item in result['results']:
+            url = item.get('url', '')
+            if url and url in seen_urls:
+                continue
+            seen_urls.add(url)
+            merged.append(item)
+
+    if errors and len(errors) == len(results):
+        return f"WEB_ERROR::{'; '.join(errors)}"
+
+    merged.sort(key=lambda item: item.get('score') or 0.0, reverse=True)
+    return format_web_results({"results": merged})
     
 @tool
-def rag_search_tool(query: str) -> str:
+def rag_search_tool(query: str, namespace: str = DEFAULT_NAMESPACE) -> str:
     """
     Retrieves the most relevant knowledge base chunks (Top-K) for a given query.
 
     Args:
         query (str): The user query string used to search the knowledge base.
+        namespace (str): The knowledge base namespace (tenant or session) to search.
 
     Returns:
         str: A concatenated string of the retrieved document chunks. 
@@ -52,8 +152,28 @@ def rag_search_tool(query: str) -> str:
              In case of failure, returns an error message prefixed with 'RAG_ERROR::'.
     """
     try:
-        retriever_instance = get_retriever()
-        docs = retriever_instance.invoke(query) 
-        return "\n\n".join(d.page_content for d in docs) if docs else ""
+        return format_chunks(search_knowledge_base(query, namespace))
     except Exception as e:
-        return f"RAG_ERROR::{e}"
\ No newline at end of file
+        return f"RAG_ERROR::{e}"
+
+def search_knowledge_base(query: str, namespace: str = DEFAULT_NAMESPACE) -> List[Tuple[Document, float]]:
+    """
+    Retrieves the Top-K knowledge base chunks together with their similarity
+    scores (cosine, best first). Raises on failure; rag_search_tool wraps it.
+
+    With RERANK_ENABLED, RERANK_CANDIDATES chunks are retrieved instead and
+    the cross-encoder keeps the RERANK_TOP_N best, in its order. Concurrent
+    calls for the same query and namespace (e.g. within a batch) share one lookup.
+    """
+    def run():
+        if reranker is None:
+            return search_with_scores(query, namespace, k=5, fetch_k=20)
+        candidates = search_with_scores(query, namespace, k=RERANK_CANDIDATES, fetch_k=max(20, RERANK_CANDIDATES))
+        return reranker.get().rerank(query, candidates, RERANK_TOP_N)
+
+    return list(_retrieval_flights.do((namespace, query), run))
+
+def format_chunks(scored_chunks: List[Tuple[Document, float]]) -> str:
+    if not scored_chunks:
+        return ""
+    return "\n\n".join(f"{citation_label(d.metadata)} {d.page_content}".lstrip() for d, _ in scored_chunks)
\ No newline at end of file
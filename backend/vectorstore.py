@@ -1,58 +1,586 @@
-from pinecone import Pinecone, ServerlessSpec, Metric
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_pinecone import PineconeVectorStore
+import hashlib
+import logging
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from config import PINECONE_API_KEY, EMBED_MODEL, PINECONE_INDEX_NAME
+from chunking import Page, PageAwareChunker, citation_label, split_text_pages
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from embedding_service import MicroBatchingEmbeddings
+from document_registry import DocumentRegistry
+from lexical_index import LexicalIndex, identifier_terms
+from lazy import LazyComponent
+from config import (PINECONE_API_KEY, EMBED_MODEL, PINECONE_INDEX_NAME, VECTOR_BACKEND,
+                    LOCAL_INDEX_DIR, LOCAL_INDEX_DTYPE, EMBED_CACHE_ENABLED, EMBED_CACHE_PATH,
+                    EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_HOT_ENTRIES, EMBED_BATCH_SIZE,
+                    DEFAULT_NAMESPACE, DOCUMENT_REGISTRY_PATH, LEXICAL_INDEX_DIR,
+                    HYBRID_SEARCH_ENABLED, RRF_K, EMBED_RUNTIME, EMBED_RUNTIME_FILE,
+                    EMBED_MICROBATCH_ENABLED, EMBED_MICROBATCH_MAX_SIZE, EMBED_MICROBATCH_MAX_WAIT_MS,
+                    EMBED_MICROBATCH_TIMEOUT_SECONDS,
+                    CHUNKING_STRATEGY, CHUNK_MAX_CHARS, CHUNK_MIN_CHARS, CHUNK_BREAKPOINT_PERCENTILE,
+                    CHUNK_VECTORS)
 
 
-pc=Pinecone(api_key=PINECONE_API_KEY)
-embedding=HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+logger=logging.getLogger(__name__)
 
-try:
-    if not pc.has_index(PINECONE_INDEX_NAME):
-        pc.create_index(
-            name=PINECONE_INDEX_NAME,
-            dimension=768,
-            metric=Metric.COSINE,
-            spec=ServerlessSpec(cloud="aws", region="us-east-1")
+# Called with (stage, count) as ingestion advances; raising from it aborts the ingestion.
+# index_document reports ("committing", 0) last, before the new version replaces the old one.
+ProgressCallback = Callable[[str, int], None]
+
+# Chunk vectors computed while splitting, by chunk text; indexing embeds only the chunks missing here.
+PrecomputedVectors = Dict[str, List[float]]
+
+# (chunk, cosine similarity to the query, chunk embedding)
+Candidate = Tuple[Document, float, List[float]]
+
+
+class VectorStoreBackend(ABC):
+    """Storage engine behind get_retriever/add_document_to_vectorstore, partitioned by namespace."""
+
+    @abstractmethod
+    def get_vector_store(self, namespace: str) -> VectorStore:
+        ...
+
+    @abstractmethod
+    def clear(self, namespace: str):
+        ...
+
+    @abstractmethod
+    def upsert(self, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict],
+               namespace: str):
+        """Writes pre-computed embeddings, so callers control batching."""
+
+    @abstractmethod
+    def delete(self, ids: List[str], namespace: str):
+        ...
+
+    @abstractmethod
+    def query_candidates(self, vector: List[float], top_k: int, namespace: str) -> List[Candidate]:
+        """Nearest neighbours with their cosine similarity and stored vector, best first."""
+
+    @abstractmethod
+    def fetch_vectors(self, ids: List[str], namespace: str) -> Dict[str, List[float]]:
+        """The stored vectors of the given chunk ids; ids that are not stored are left out."""
+
+    def flush(self, namespace: str):
+        """Makes buffered upserts and deletes durable; called once per indexed or deleted document."""
+
+
+class PineconeBackend(VectorStoreBackend):
+    def __init__(self, embedding: Embeddings):
+        # Imported here so the module stays importable without the Pinecone client.
+        from pinecone import Pinecone, ServerlessSpec, Metric
+        from langchain_pinecone import PineconeVectorStore
+
+        pc=Pinecone(api_key=PINECONE_API_KEY)
+
+        try:
+            if not pc.has_index(PINECONE_INDEX_NAME):
+                pc.create_index(
+                    name=PINECONE_INDEX_NAME,
+                    dimension=768,
+                    metric=Metric.COSINE,
+                    spec=ServerlessSpec(cloud="aws", region="us-east-1")
+                )
+        except Exception as e:
+            logger.warning("Index creation failed: %s. Trying to recreate...", e)
+            pc.create_index(
+                name=PINECONE_INDEX_NAME,
+                dimension=768,
+                metric=Metric.COSINE,
+                spec=ServerlessSpec(cloud="aws", region="us-east-1")
+            )
+
+        self.embedding=embedding
+        self.index=pc.Index(PINECONE_INDEX_NAME)
+        self._store_cls=PineconeVectorStore
+        self._stores: Dict[str, VectorStore]={}
+
+    def get_vector_store(self, namespace: str) -> VectorStore:
+        if namespace not in self._stores:
+            self._stores[namespace]=self._store_cls(self.index, self.embedding, namespace=namespace)
+        return self._stores[namespace]
+
+    def clear(self, namespace: str):
+        self.index.delete(delete_all=True, namespace=namespace)
+
+    def upsert(self, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict],
+               namespace: str):
+        # PineconeVectorStore reads the chunk text back from the "text" metadata key.
+        self.index.upsert(vectors=[
+            {"id": id_, "values": vector, "metadata": {**metadata, "text": text}}
+            for id_, text, vector, metadata in zip(ids, texts, vectors, metadatas)
+        ], namespace=namespace)
+
+    def fetch_vectors(self, ids: List[str], namespace: str) -> Dict[str, List[float]]:
+        vectors={}
+        # Pinecone caps fetch requests at 1000 ids, like deletes.
+        for start in range(0, len(ids), 1000):
+            response=self.index.fetch(ids=ids[start:start + 1000], namespace=namespace)
+            vectors.update({id_: vector.values for id_, vector in response.vectors.items()})
+        return vectors
+
+    def delete(self, ids: List[str], namespace: str):
+        # Pinecone caps delete-by-id requests at 1000 ids.
+        for start in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[start:start + 1000], namespace=namespace)
+
+    def query_candidates(self, vector: List[float], top_k: int, namespace: str) -> List[Candidate]:
+        results=self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_values=True,
+            include_metadata=True,
+            namespace=namespace
         )
-except Exception as e:
-    print(f"Index creation failed: {e}. Trying to recreate...")
-    pc.create_index(
-        name=PINECONE_INDEX_NAME,
-        dimension=768,
-        metric=Metric.COSINE,
-        spec=ServerlessSpec(cloud="aws", region="us-east-1")
+        candidates=[]
+        for match in results["matches"]:
+            metadata=dict(match["metadata"] or {})
+            text=metadata.pop("text", "")
+            candidates.append((Document(id=match["id"], page_content=text, metadata=metadata), match["score"], match["values"]))
+        return candidates
+
+
+class LocalBackend(VectorStoreBackend):
+    def __init__(self, embedding: Embeddings):
+        from local_vectorstore import LocalVectorStore
+
+        self.embedding=embedding
+        self._store_cls=LocalVectorStore
+        self._stores: Dict[str, VectorStore]={}
+        self._lock=threading.Lock()
+
+    def get_vector_store(self, namespace: str) -> VectorStore:
+        with self._lock:
+            if namespace not in self._stores:
+                directory=os.path.join(LOCAL_INDEX_DIR, namespace)
+                self._stores[namespace]=self._store_cls(self.embedding, directory, dtype=LOCAL_INDEX_DTYPE)
+            return self._stores[namespace]
+
+    def clear(self, namespace: str):
+        self.get_vector_store(namespace).delete(delete_all=True)
+
+    def upsert(self, ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict],
+               namespace: str):
+        # Persisted by flush(), once per document rather than once per batch.
+        self.get_vector_store(namespace).index.add(ids, texts, vectors, metadatas, persist=False)
+
+    def delete(self, ids: List[str], namespace: str):
+        self.get_vector_store(namespace).index.delete(ids, persist=False)
+
+    def flush(self, namespace: str):
+        self.get_vector_store(namespace).index.persist()
+
+    def fetch_vectors(self, ids: List[str], namespace: str) -> Dict[str, List[float]]:
+        return self.get_vector_store(namespace).index.get_vectors(ids)
+
+    def query_candidates(self, vector: List[float], top_k: int, namespace: str) -> List[Candidate]:
+        return self.get_vector_store(namespace).index.query(vector, top_k)
+
+
+BACKENDS = {
+    "pinecone": PineconeBackend,
+    "local": LocalBackend,
+}
+
+def create_backend(name: str, embedding: Embeddings) -> VectorStoreBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown VECTOR_BACKEND '{name}'. Expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](embedding)
+
+
+def _create_embedding() -> Embeddings:
+    # Imported here: pulling in sentence-transformers alone takes seconds.
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    model_kwargs={}
+    if EMBED_RUNTIME != "torch":
+        # sentence-transformers loads an ONNX/OpenVINO export instead of the torch
+        # weights; EMBED_RUNTIME_FILE picks a variant such as onnx/model_qint8_avx2.onnx.
+        model_kwargs["backend"]=EMBED_RUNTIME
+        if EMBED_RUNTIME_FILE:
+            model_kwargs["model_kwargs"]={"file_name": EMBED_RUNTIME_FILE}
+    model=HuggingFaceEmbeddings(model_name=EMBED_MODEL, model_kwargs=model_kwargs)
+    # Quantized exports produce slightly different vectors, so they get their own cache keys.
+    model_identity=EMBED_MODEL if EMBED_RUNTIME == "torch" else f"{EMBED_MODEL}|{EMBED_RUNTIME}|{EMBED_RUNTIME_FILE}"
+    return wrap_embedding(model, model_identity)
+
+def wrap_embedding(model: Embeddings, model_identity: str) -> Embeddings:
+    """Puts the configured micro-batching and caching layers in front of a raw embedding model."""
+    if EMBED_MICROBATCH_ENABLED:
+        model=MicroBatchingEmbeddings(
+            model,
+            max_batch_size=EMBED_MICROBATCH_MAX_SIZE,
+            max_wait_ms=EMBED_MICROBATCH_MAX_WAIT_MS,
+            timeout_seconds=EMBED_MICROBATCH_TIMEOUT_SECONDS
+        )
+    if not EMBED_CACHE_ENABLED:
+        return model
+    return CachedEmbeddings(
+        model,
+        model_identity,
+        EmbeddingCache(EMBED_CACHE_PATH, max_entries=EMBED_CACHE_MAX_ENTRIES, hot_entries=EMBED_CACHE_HOT_ENTRIES)
     )
 
-index=pc.Index(PINECONE_INDEX_NAME)
-    
-vector_store = PineconeVectorStore(index, embedding)
+# Created on first use (or by the startup warm-up), not at import time, so
+# importing this module is cheap, including in the ingestion worker processes.
+embedding_model=LazyComponent("embedding", _create_embedding)
+vector_backend=LazyComponent("vector_backend", lambda: create_backend(VECTOR_BACKEND, embedding_model.get()))
+document_registry=LazyComponent("document_registry", lambda: DocumentRegistry(DOCUMENT_REGISTRY_PATH))
+
+def get_embedding() -> Embeddings:
+    return embedding_model.get()
+
+def get_backend() -> VectorStoreBackend:
+    return vector_backend.get()
+
+def get_registry() -> DocumentRegistry:
+    return document_registry.get()
+
+# BM25 indexes are maintained for every backend, whether or not hybrid search
+# is enabled, so turning it on later needs no re-ingestion.
+_lexical_indexes: Dict[str, LexicalIndex]={}
+_lexical_indexes_guard=threading.Lock()
+
+# Re-merge the FTS5 segments after ingests at least this large.
+LEXICAL_OPTIMIZE_MIN_CHUNKS=500
 
-def get_retriever():   
-    return vector_store.as_retriever(
+def get_lexical_index(namespace: str) -> LexicalIndex:
+    with _lexical_indexes_guard:
+        if namespace not in _lexical_indexes:
+            _lexical_indexes[namespace]=LexicalIndex(os.path.join(LEXICAL_INDEX_DIR, f"{namespace}.sqlite"))
+        return _lexical_indexes[namespace]
+
+# Serialises writers of the same (namespace, document), so concurrent
+# re-uploads of one file cannot interleave their diffs.
+_document_locks: Dict[tuple, threading.Lock]={}
+_document_locks_guard=threading.Lock()
+
+def _document_lock(namespace: str, document_id: str) -> threading.Lock:
+    with _document_locks_guard:
+        return _document_locks.setdefault((namespace, document_id), threading.Lock())
+
+def validate_namespace(namespace: str) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_\-]{1,64}", namespace or ""):
+        raise ValueError("Namespace must be 1-64 characters of letters, digits, '-' or '_'.")
+    return namespace
+
+def make_document_id(filename: str) -> str:
+    return hashlib.sha256(filename.encode("utf-8")).hexdigest()[:16]
+
+def get_retriever(namespace: str = DEFAULT_NAMESPACE):
+    return get_backend().get_vector_store(namespace).as_retriever(
         search_type="mmr",
         search_kwargs={'k': 5,"fetch_k": 20}
     )
 
-def add_document_to_vectorstore(text_content: str):
-    if not text_content:
-        raise ValueError("Document content cannot be empty.")
-    
-    try:
-        index.delete(delete_all=True)
-    except Exception as e:
-        print(f"No existing namespace to clear: {e}")
-    
-    text_splitter = RecursiveCharacterTextSplitter(
+def _normalize(vector) -> np.ndarray:
+    array=np.asarray(vector, dtype=np.float32)
+    norm=np.linalg.norm(array, axis=-1, keepdims=True)
+    return array / np.where(norm == 0, 1, norm)
+
+def _fuse_lexical(query: str, vector: List[float], dense: List[Candidate], fetch_k: int,
+                  namespace: str) -> Tuple[List[Candidate], List[float]]:
+    """
+    Reciprocal rank fusion of the dense candidates with the BM25 hits:
+    score(chunk) = sum over both rankings of 1 / (RRF_K + rank). Returns the
+    top fetch_k fused candidates, best first, with their fused scores.
+    """
+    lexical=get_lexical_index(namespace).search(query, fetch_k)
+    fused: Dict[str, float]={}
+    for ranking in ([doc for doc, _, _ in dense], [doc for doc, _ in lexical]):
+        for rank, doc in enumerate(ranking, start=1):
+            fused[doc.id]=fused.get(doc.id, 0.0) + 1.0 / (RRF_K + rank)
+
+    by_id={doc.id: (doc, score, candidate_vector) for doc, score, candidate_vector in dense}
+    lexical_only=[doc for doc, _ in lexical if doc.id not in by_id]
+    if lexical_only:
+        # MMR needs their vectors: read the stored ones (pooled chunk vectors
+        # are in no embedding cache) and only embed chunks the backend lacks.
+        stored=get_backend().fetch_vectors([doc.id for doc in lexical_only], namespace)
+        missing=[doc for doc in lexical_only if doc.id not in stored]
+        if missing:
+            stored.update(zip([doc.id for doc in missing],
+                              get_embedding().embed_documents([doc.page_content for doc in missing])))
+        vectors=[stored[doc.id] for doc in lexical_only]
+        similarities=_normalize(vectors) @ _normalize(vector)
+        for doc, candidate_vector, similarity in zip(lexical_only, vectors, similarities):
+            by_id[doc.id]=(doc, float(similarity), candidate_vector)
+
+    ranked=sorted(by_id.values(), key=lambda candidate: fused[candidate[0].id], reverse=True)[:fetch_k]
+    return ranked, [fused[doc.id] for doc, _, _ in ranked]
+
+def _mmr_by_relevance(relevance: List[float], vectors: List[List[float]], k: int, lambda_mult: float) -> List[int]:
+    """maximal_marginal_relevance with a given relevance per candidate instead of query similarity."""
+    relevance=np.asarray(relevance, dtype=np.float32)
+    relevance=relevance / relevance.max()
+    matrix=_normalize(vectors)
+    selected=[int(np.argmax(relevance))]
+    while len(selected) < min(k, len(relevance)):
+        redundancy=(matrix @ matrix[selected].T).max(axis=1)
+        scores=lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected]=-np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
+
+def _mark_exact_matches(query: str, results: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+    identifiers=identifier_terms(query)
+    for doc, _ in results:
+        text=doc.page_content.lower()
+        doc.metadata["exact_match"]=any(identifier in text for identifier in identifiers)
+    return results
+
+def search_with_scores(query: str, namespace: str = DEFAULT_NAMESPACE, k: int = 5,
+                       fetch_k: int = 20, lambda_mult: float = 0.5) -> List[Tuple[Document, float]]:
+    """
+    Same MMR selection as get_retriever(), but also returns each selected
+    chunk's cosine similarity to the query, best first.
+
+    With HYBRID_SEARCH_ENABLED the BM25 hits are fused into the candidates
+    first, and MMR weighs the fused rank instead of the cosine similarity, so
+    chunks quoting an identifier from the query survive even when their
+    embedding is not close. Chunks containing such an identifier verbatim are
+    flagged with metadata["exact_match"].
+    """
+    vector=get_embedding().embed_query(query)
+    candidates=get_backend().query_candidates(vector, fetch_k, namespace)
+
+    if HYBRID_SEARCH_ENABLED:
+        candidates, fused=_fuse_lexical(query, vector, candidates, fetch_k, namespace)
+        if not candidates:
+            return []
+        selected=_mmr_by_relevance(fused, [candidate_vector for _, _, candidate_vector in candidates], k, lambda_mult)
+        # Already in fused order, which is what "best first" means here.
+        return _mark_exact_matches(query, [(candidates[i][0], float(candidates[i][1])) for i in sorted(selected)])
+
+    if not candidates:
+        return []
+
+    selected=maximal_marginal_relevance(
+        np.asarray(vector, dtype=np.float32),
+        [candidate_vector for _, _, candidate_vector in candidates],
+        k=k,
+        lambda_mult=lambda_mult
+    )
+    results=[(candidates[i][0], float(candidates[i][1])) for i in selected]
+    return _mark_exact_matches(query, sorted(results, key=lambda pair: pair[1], reverse=True))
+
+def get_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,
         add_start_index=True,
     )
 
-    documents=text_splitter.create_documents([text_content])
-    print(f"Splitting document into {len(documents)} chunks for indexing...")
-    
-    vector_store.add_documents(documents)
+def split_pages(pages: Iterable[Page]) -> Tuple[Iterator[Document], Optional[PrecomputedVectors]]:
+    """
+    Lazily chunks a stream of (page number, text) pages with the configured
+    CHUNKING_STRATEGY; chunks carry their page (and, except for "recursive",
+    page_end and section) metadata. Returns the chunks and, with
+    CHUNK_VECTORS=pooled and semantic chunking, the dict their pooled vectors
+    are written to as they are produced, to hand to index_document.
+    """
+    if CHUNKING_STRATEGY == "recursive":
+        splitter=get_text_splitter()
+        documents=(
+            document
+            for page_number, text in pages if text.strip()
+            for document in splitter.create_documents(
+                [text], metadatas=[{"page": page_number}] if page_number is not None else None)
+        )
+        return documents, None
+    if CHUNKING_STRATEGY not in ("semantic", "sentence"):
+        raise ValueError(f"Unknown CHUNKING_STRATEGY '{CHUNKING_STRATEGY}'. Expected semantic, sentence or recursive")
+
+    semantic=CHUNKING_STRATEGY == "semantic"
+    chunker=PageAwareChunker(
+        get_embedding() if semantic else None,
+        max_chars=CHUNK_MAX_CHARS,
+        min_chars=CHUNK_MIN_CHARS,
+        breakpoint_percentile=CHUNK_BREAKPOINT_PERCENTILE,
+        window_sentences=EMBED_BATCH_SIZE
+    )
+    vectors: Optional[PrecomputedVectors]={} if semantic and CHUNK_VECTORS == "pooled" else None
+    return chunker.split_pages(pages, vectors), vectors
+
+def _assign_chunk_ids(documents: Iterable[Document], document_id: str) -> Iterator[Document]:
+    # Ids depend only on the document id, the chunk text and where the chunk
+    # is cited from (pages and section), so an unchanged chunk keeps its id
+    # across uploads while a moved one is re-indexed with its new pages.
+    # Repeated texts get an occurrence suffix.
+    seen: Dict[str, int]={}
+    for document in documents:
+        key=f"{document.page_content}\0{citation_label(document.metadata)}"
+        digest=hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+        occurrence=seen.get(digest, 0)
+        seen[digest]=occurrence + 1
+        document.id=f"{document_id}-{digest}-{occurrence}"
+        document.metadata={**document.metadata, "document_id": document_id}
+        yield document
+
+def _batched(documents: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _upsert_chunks(ids: List[str], texts: List[str], vectors: List[List[float]], metadatas: List[dict],
+                   namespace: str):
+    get_backend().upsert(ids, texts, vectors, metadatas, namespace)
+    get_lexical_index(namespace).upsert(ids, texts, metadatas)
+
+def _delete_chunks(ids: List[str], namespace: str):
+    get_backend().delete(ids, namespace)
+    get_lexical_index(namespace).delete(ids)
+
+def add_documents_batched(documents: Iterable[Document], namespace: str = DEFAULT_NAMESPACE,
+                          batch_size: int = EMBED_BATCH_SIZE, progress: Optional[ProgressCallback] = None,
+                          vectors: Optional[PrecomputedVectors] = None) -> int:
+    """
+    Embeds a stream of chunks (which must carry ids) in fixed-size batches and
+    upserts each batch on a background thread, so the upsert of batch N
+    overlaps the embedding of batch N+1. Only one batch is waiting on the
+    upsert at any time. Chunks with a vector in vectors use it (and it is
+    removed from the dict) instead of being embedded.
+    """
+    report = progress or (lambda stage, count: None)
+
+    def upsert(ids, texts, vectors, metadatas):
+        _upsert_chunks(ids, texts, vectors, metadatas, namespace)
+        report("vectors_upserted", len(ids))
+
+    total = 0
+    pending_upsert = None
+    with ThreadPoolExecutor(max_workers=1) as upsert_pool:
+        for batch in _batched(documents, batch_size):
+            texts = [d.page_content for d in batch]
+            batch_vectors = [vectors.pop(text, None) for text in texts] if vectors is not None else [None] * len(texts)
+            missing = [i for i, vector in enumerate(batch_vectors) if vector is None]
+            if missing:
+                embedded = get_embedding().embed_documents([texts[i] for i in missing])
+                for i, vector in zip(missing, embedded):
+                    batch_vectors[i] = vector
+            report("chunks_embedded", len(batch))
+
+            if pending_upsert is not None:
+                pending_upsert.result()
+            pending_upsert = upsert_pool.submit(
+                upsert,
+                [d.id for d in batch],
+                texts,
+                batch_vectors,
+                [d.metadata for d in batch]
+            )
+            total += len(batch)
+
+        if pending_upsert is not None:
+            pending_upsert.result()
+    return total
+
+def index_document(documents: Iterable[Document], document_id: str, namespace: str = DEFAULT_NAMESPACE,
+                   filename: Optional[str] = None, progress: Optional[ProgressCallback] = None,
+                   vectors: Optional[PrecomputedVectors] = None) -> dict:
+    """
+    Incrementally (re)indexes one document: only chunks whose content-derived
+    id is new get embedded and upserted, and chunks that disappeared from the
+    document are deleted. Other documents in the namespace are untouched.
+    vectors, as returned by split_pages, supplies chunk vectors computed
+    while splitting.
+
+    If indexing fails or is cancelled (progress raised), the chunks it had
+    already upserted are removed again and the previous version stays as it was.
+    """
+    validate_namespace(namespace)
+    with _document_lock(namespace, document_id):
+        existing_ids=get_registry().get_chunk_ids(namespace, document_id)
+        current_ids=set()
+        new_ids=[]
+
+        def new_chunks() -> Iterator[Document]:
+            for document in _assign_chunk_ids(documents, document_id):
+                current_ids.add(document.id)
+                if progress:
+                    progress("chunks_split", 1)
+                if document.id not in existing_ids:
+                    new_ids.append(document.id)
+                    yield document
+                elif vectors is not None:
+                    # Unchanged chunks are not upserted, so their vectors are not needed.
+                    vectors.pop(document.page_content, None)
+
+        try:
+            added=add_documents_batched(new_chunks(), namespace=namespace, progress=progress, vectors=vectors)
+            if progress:
+                # The last point where the new chunks can still be rolled back.
+                progress("committing", 0)
+        except BaseException:
+            if new_ids:
+                _delete_chunks(new_ids, namespace)
+            get_backend().flush(namespace)
+            raise
+
+        stale_ids=sorted(existing_ids - current_ids)
+        if stale_ids:
+            _delete_chunks(stale_ids, namespace)
+        # Before the registry records the chunks, so it never lists chunks the index could lose.
+        get_backend().flush(namespace)
+        get_registry().replace(namespace, document_id, filename, current_ids)
+        if added or stale_ids:
+            get_registry().bump_version(namespace)
+        if added >= LEXICAL_OPTIMIZE_MIN_CHUNKS:
+            get_lexical_index(namespace).optimize()
+
+    stats={
+        "document_id": document_id,
+        "namespace": namespace,
+        "chunks_total": len(current_ids),
+        "chunks_added": added,
+        "chunks_removed": len(stale_ids),
+        "chunks_unchanged": len(current_ids) - added,
+    }
+    logger.info("Indexed document %s in namespace '%s': %s", document_id, namespace, stats)
+    return stats
+
+def get_kb_version(namespace: str = DEFAULT_NAMESPACE) -> int:
+    return get_registry().get_version(namespace)
+
+def list_documents(namespace: str = DEFAULT_NAMESPACE) -> List[dict]:
+    return get_registry().list_documents(validate_namespace(namespace))
+
+def delete_document(document_id: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[int]:
+    """Deletes one document's chunks; returns how many were removed, or None if unknown."""
+    validate_namespace(namespace)
+    with _document_lock(namespace, document_id):
+        chunk_ids=get_registry().delete(namespace, document_id)
+        if chunk_ids is None:
+            return None
+        if chunk_ids:
+            _delete_chunks(sorted(chunk_ids), namespace)
+            get_backend().flush(namespace)
+        get_registry().bump_version(namespace)
+    return len(chunk_ids)
+
+def add_document_to_vectorstore(text_content: str, document_id: Optional[str] = None,
+                                namespace: str = DEFAULT_NAMESPACE, filename: Optional[str] = None) -> dict:
+    if not text_content:
+        raise ValueError("Document content cannot be empty.")
+
+    document_id=document_id or make_document_id(filename or text_content)
+    documents, vectors=split_pages(split_text_pages(text_content))
+
+    stats=index_document(documents, document_id, namespace=namespace, filename=filename, vectors=vectors)
 
-    print("successfully added documents into vectorstore")
+    logger.info("successfully added documents into vectorstore")
+    return stats
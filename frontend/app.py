@@ -3,13 +3,14 @@ import requests
 import streamlit as st
 from config import FRONTEND_CONFIG
 from session_manager import init_session_state
-from backend_api import chat_with_backend_agent
+from backend_api import stream_chat_with_backend_agent
 from ui_components import (
     display_header,
     render_document_upload_section,
     render_agent_settings_section,
     display_chat_history,
-    display_trace_events)
+    create_trace_container,
+    display_trace_event)
 
 fastapi_base_url=FRONTEND_CONFIG['FASTAPI_BASE_URL']
 
@@ -30,34 +31,65 @@ def main():
             st.markdown(prompt)
 
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    agent_response, trace_events = chat_with_backend_agent(
-                        fastapi_base_url,
-                        st.session_state.session_id,
-                        prompt,
-                        st.session_state.web_search_enabled
-                    )
-                    display_trace_events(trace_events)
-                    
-                   
-                    st.markdown(agent_response)
-               
-                    st.session_state.messages.append({"role": "assistant", "content": agent_response})
+            # The trace sits above the answer; both fill in as the events stream in.
+            trace_slot = st.empty()
+            answer_slot = st.empty()
+            answer_slot.markdown("_Thinking..._")
+            trace_container = None
+            agent_response = ""
+            error_detail = None
+
+            try:
+                for event, data in stream_chat_with_backend_agent(
+                    st.session_state.http_session,
+                    fastapi_base_url,
+                    st.session_state.session_id,
+                    prompt,
+                    st.session_state.web_search_enabled
+                ):
+                    if event == "trace":
+                        if trace_container is None:
+                            with trace_slot.container():
+                                trace_container = create_trace_container()
+                        with trace_container:
+                            display_trace_event(data)
+                    elif event == "token":
+                        agent_response += data["content"]
+                        answer_slot.markdown(agent_response + "▌")
+                    elif event == "final":
+                        agent_response = data.get("response") or agent_response
+                    elif event == "error":
+                        error_detail = data.get("detail", "The agent run failed.")
+                        if data.get("status") == 503:
+                            error_detail = f"The agent is busy, please retry in a moment. ({error_detail})"
+                        break
 
-                except requests.exceptions.ConnectionError:
-                    st.error("Could not connect to the FastAPI backend. Please ensure it's running.")
-                    st.session_state.messages.append({"role": "assistant", "content": "Error: Could not connect to the backend."})
-                except requests.exceptions.RequestException as e:
-                    st.error(f"An error occurred with the request: {e}")
-                    st.session_state.messages.append({"role": "assistant", "content": f"Error: {e}"})
-                except json.JSONDecodeError:
-                    st.error("Received an invalid response from the backend.")
-                    st.session_state.messages.append({"role": "assistant", "content": "Error: Invalid response from backend."})
-                except Exception as e:
-                    st.error(f"An unexpected error occurred: {e}")
-                    st.session_state.messages.append({"role": "assistant", "content": f"Unexpected Error: {e}"})
+                if error_detail:
+                    answer_slot.empty()
+                    st.error(error_detail)
+                    st.session_state.messages.append({"role": "assistant", "content": f"Error: {error_detail}"})
+                else:
+                    if not agent_response:
+                        agent_response = "Sorry, I couldn't get a response from the agent."
+                    answer_slot.markdown(agent_response)
+                    st.session_state.messages.append({"role": "assistant", "content": agent_response})
 
+            except requests.exceptions.ConnectionError:
+                answer_slot.empty()
+                st.error("Could not connect to the FastAPI backend. Please ensure it's running.")
+                st.session_state.messages.append({"role": "assistant", "content": "Error: Could not connect to the backend."})
+            except requests.exceptions.RequestException as e:
+                answer_slot.empty()
+                st.error(f"An error occurred with the request: {e}")
+                st.session_state.messages.append({"role": "assistant", "content": f"Error: {e}"})
+            except json.JSONDecodeError:
+                answer_slot.empty()
+                st.error("Received an invalid response from the backend.")
+                st.session_state.messages.append({"role": "assistant", "content": "Error: Invalid response from backend."})
+            except Exception as e:
+                answer_slot.empty()
+                st.error(f"An unexpected error occurred: {e}")
+                st.session_state.messages.append({"role": "assistant", "content": f"Unexpected Error: {e}"})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,27 +1,109 @@
-import requests
 import json
+import time
+from typing import Iterator, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
+
+from config import FRONTEND_CONFIG
+
+
+def create_http_session() -> requests.Session:
+    """
+    A keep-alive session with a connection pool, so chat turns and uploads
+    reuse TCP (and TLS) connections instead of opening one per request.
+    Only connection failures are retried: nothing has reached the backend yet.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=FRONTEND_CONFIG["HTTP_POOL_SIZE"],
+        max_retries=Retry(total=None, connect=2, read=0, status=0, other=0, backoff_factor=0.3),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _timeout(read_timeout: float) -> tuple:
+    return (FRONTEND_CONFIG["CONNECT_TIMEOUT_SECONDS"], read_timeout)
+
 
+def upload_document_to_backend(http: requests.Session, fastapi_base_url: str, uploaded_file) -> dict:
+    """Sends the PDF and returns the ingestion job the backend queued for it."""
+    # MultipartEncoder reads the file in chunks as the body is sent rather
+    # than building the whole multipart body in memory first.
+    uploaded_file.seek(0)
+    encoder = MultipartEncoder(fields={"file": (uploaded_file.name, uploaded_file, uploaded_file.type)})
 
-def upload_document_to_backend(fastapi_base_url: str, uploaded_file):
-    files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
-    
-    response = requests.post(f"{fastapi_base_url}/upload-document", files=files)
+    response = http.post(
+        f"{fastapi_base_url}/upload-document",
+        data=encoder,
+        headers={"Content-Type": encoder.content_type},
+        timeout=_timeout(FRONTEND_CONFIG["UPLOAD_TIMEOUT_SECONDS"]),
+    )
     response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-    
+
+    return response.json()
+
+
+def get_ingestion_job(http: requests.Session, fastapi_base_url: str, job_id: str) -> dict:
+    response = http.get(f"{fastapi_base_url}/jobs/{job_id}", timeout=_timeout(FRONTEND_CONFIG["READ_TIMEOUT_SECONDS"]))
+    response.raise_for_status()
     return response.json()
 
-def chat_with_backend_agent(fastapi_base_url: str, session_id: str, query: str, enable_web_search: bool):
-    payload = {
+
+def wait_for_ingestion_job(http: requests.Session, fastapi_base_url: str, job: dict) -> Iterator[dict]:
+    """Polls the job and yields each snapshot until it has succeeded, failed or been cancelled."""
+    yield job
+    while job["status"] in ("queued", "running", "finalizing"):
+        time.sleep(FRONTEND_CONFIG["JOB_POLL_INTERVAL_SECONDS"])
+        job = get_ingestion_job(http, fastapi_base_url, job["job_id"])
+        yield job
+
+
+def _agent_payload(session_id: str, query: str, enable_web_search: bool) -> dict:
+    return {
         "session_id": session_id,
         "query": query,
         "enable_web_search": enable_web_search
     }
 
-    response = requests.post(f"{fastapi_base_url}/execute", json=payload, stream=False)
-    response.raise_for_status() 
 
-    data = response.json()
-    agent_response = data.get("response", "Sorry, I couldn't get a response from the agent.")
-    trace_events = data.get("trace_events", [])
-    
-    return agent_response, trace_events
\ No newline at end of file
+def stream_chat_with_backend_agent(http: requests.Session, fastapi_base_url: str, session_id: str, query: str,
+                                   enable_web_search: bool) -> Iterator[Tuple[str, dict]]:
+    """
+    Calls /execute-stream and yields (event, data) pairs as the Server-Sent
+    Events arrive: 'trace' per finished node, 'token' per answer token, then
+    'final' with the complete response, or 'error'.
+    """
+    with http.post(
+        f"{fastapi_base_url}/execute-stream",
+        json=_agent_payload(session_id, query, enable_web_search),
+        headers={"Accept": "text/event-stream"},
+        stream=True,
+        timeout=_timeout(FRONTEND_CONFIG["READ_TIMEOUT_SECONDS"]),
+    ) as response:
+        response.raise_for_status()
+        # text/event-stream is UTF-8 by definition; without this requests falls back to Latin-1.
+        response.encoding = "utf-8"
+
+        event, data_lines = "message", []
+        # chunk_size=None hands over each chunk as soon as it arrives instead of filling a buffer first.
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if line:
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "event":
+                    event = value
+                elif field == "data":
+                    data_lines.append(value)
+                continue
+            # A blank line ends the event.
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        if data_lines:
+            yield event, json.loads("\n".join(data_lines))
@@ -6,7 +6,13 @@ load_dotenv()
 def load_frontend_config():
 
     return {
-        "FASTAPI_BASE_URL": os.getenv("FASTAPI_BASE_URL", "http://localhost:8000")
+        "FASTAPI_BASE_URL": os.getenv("FASTAPI_BASE_URL", "http://localhost:8000"),
+        "HTTP_POOL_SIZE": int(os.getenv("HTTP_POOL_SIZE", "4")),
+        "CONNECT_TIMEOUT_SECONDS": float(os.getenv("CONNECT_TIMEOUT_SECONDS", "5")),
+        # Longest gap between two bytes of a response, not the total request time.
+        "READ_TIMEOUT_SECONDS": float(os.getenv("READ_TIMEOUT_SECONDS", "120")),
+        "UPLOAD_TIMEOUT_SECONDS": float(os.getenv("UPLOAD_TIMEOUT_SECONDS", "600")),
+        "JOB_POLL_INTERVAL_SECONDS": float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
     }
 
 FRONTEND_CONFIG = load_frontend_config()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
 import uuid
+from backend_api import create_http_session
 
 def init_session_state():
     if "messages" not in st.session_state:
@@ -10,4 +11,8 @@ def init_session_state():
         st.session_state.messages.append({"role": "assistant", "content": "Hello! How can I help you today?"})
 
     if "web_search_enabled" not in st.session_state:
-        st.session_state.web_search_enabled = True
\ No newline at end of file
+        st.session_state.web_search_enabled = True
+
+    if "http_session" not in st.session_state:
+        # One pooled keep-alive client per browser session, reused across reruns.
+        st.session_state.http_session = create_http_session()
@@ -1,5 +1,5 @@
 import streamlit as st
-from backend_api import upload_document_to_backend
+from backend_api import upload_document_to_backend, wait_for_ingestion_job
 from session_manager import init_session_state
 
 def display_header():
@@ -18,16 +18,41 @@ def render_document_upload_section(fastapi_base_url: str):
             
             if st.button("Upload PDF", key="upload_pdf_button"):
                 if uploaded_file is not None:
-                    with st.spinner(f"Uploading {uploaded_file.name}..."):
-                        try:
-                            upload_data = upload_document_to_backend(fastapi_base_url, uploaded_file)
-                            st.success(f"PDF '{upload_data.get('filename')}' uploaded successfully! Processed {upload_data.get('processed_chunks')} pages.")
-                        except Exception as e:
-                            st.error(f"An error occurred during upload: {e}")
+                    try:
+                        with st.spinner(f"Uploading {uploaded_file.name}..."):
+                            job = upload_document_to_backend(st.session_state.http_session, fastapi_base_url, uploaded_file)
+                        progress_bar = st.progress(0.0, text="Queued for indexing...")
+                        for job in wait_for_ingestion_job(st.session_state.http_session, fastapi_base_url, job):
+                            progress_bar.progress(*describe_job_progress(job))
+                        display_job_outcome(job)
+                    except Exception as e:
+                        st.error(f"An error occurred during upload: {e}")
                 else:
                     st.warning("Please upload a PDF file before clicking 'Upload PDF'.")
         st.markdown("---")
 
+def describe_job_progress(job: dict) -> tuple:
+    """(fraction, label) for an ingestion job; parsing and indexing each count for half the bar."""
+    progress = job.get("progress", {})
+    pages_total = progress.get("pages_total") or 0
+    if job["status"] == "queued" or not pages_total:
+        return 0.0, "Queued for indexing..."
+    parsed = min(progress.get("pages_parsed", 0) / pages_total, 1.0)
+    embedded = progress.get("chunks_embedded", 0)
+    upserted = min(progress.get("vectors_upserted", 0) / embedded, 1.0) if embedded else 0.0
+    fraction = 1.0 if job["status"] == "succeeded" else (parsed + upserted * parsed) / 2
+    return fraction, (f"Parsed {progress.get('pages_parsed', 0)}/{pages_total} pages, "
+                      f"embedded {embedded} chunks, stored {progress.get('vectors_upserted', 0)}")
+
+def display_job_outcome(job: dict):
+    if job["status"] == "succeeded":
+        result = job.get("result") or {}
+        st.success(f"PDF '{job.get('filename')}' uploaded successfully! Processed {result.get('processed_chunks')} pages.")
+    elif job["status"] == "cancelled":
+        st.warning(f"Indexing of '{job.get('filename')}' was cancelled.")
+    else:
+        st.error(f"Indexing of '{job.get('filename')}' failed: {job.get('error')}")
+
 def render_agent_settings_section():
     with st.sidebar:
         st.header("Agent Settings")
@@ -43,37 +68,41 @@ def display_chat_history():
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
-def display_trace_events(trace_events: list):
-    if trace_events:
-        with st.expander("🔬 Agent Workflow Trace"):
-            for event in trace_events:
-                icon_map = {
-                    'router': "➡️",
-                    'rag_lookup': "📚",
-                    'web_search': "🌐",
-                    'answer': "💡",
-                    '__end__': "✅"
-                }
-                icon = icon_map.get(event['node_name'], "⚙️")
-                
-                st.subheader(f"{icon} Step {event['step']}: {event['node_name']}")
-                st.write(f"**Description:** {event['description']}")
-                
-                if event['node_name'] == 'rag_lookup' and 'sufficiency_verdict' in event['details']:
-                    verdict = event['details']['sufficiency_verdict']
-                    if verdict == "Sufficient":
-                        st.success(f"**RAG Verdict:** {verdict} - Relevant info found in Knowledge Base.")
-                    else:
-                        st.warning(f"**RAG Verdict:** {verdict} - No sufficient info in Knowledge Base. Diverting to Web Search.")
-                    
-                    if 'retrieved_content_summary' in event['details']:
-                        st.markdown(f"**Retrieved Content Summary:** `{event['details']['retrieved_content_summary']}`")
-                elif event['node_name'] == 'web_search' and 'retrieved_content_summary' in event['details']:
-                    st.markdown(f"**Web Search Content Summary:** `{event['details']['retrieved_content_summary']}`")
-                elif event['node_name'] == 'router' and 'router_override_reason' in event['details']:
-                    st.info(f"**Router Override:** {event['details']['router_override_reason']}")
-                    st.json({"initial_decision": event['details']['initial_decision'], "final_decision": event['details']['final_decision']})
-                elif event['details']:
-                    st.json(event['details'])
-                
-                st.markdown("---")
\ No newline at end of file
+TRACE_ICONS = {
+    'router': "➡️",
+    'rag_lookup': "📚",
+    'web_search': "🌐",
+    'answer': "💡",
+    'answer_cache': "⚡",
+    '__end__': "✅"
+}
+
+def create_trace_container():
+    """The expander trace events are rendered into, one by one as they stream in."""
+    return st.expander("🔬 Agent Workflow Trace")
+
+def display_trace_event(event: dict):
+    icon = TRACE_ICONS.get(event['node_name'], "⚙️")
+    timing = f" ({event['duration_ms']:.0f} ms)" if event.get('duration_ms') is not None else ""
+
+    st.subheader(f"{icon} Step {event['step']}: {event['node_name']}{timing}")
+    st.write(f"**Description:** {event['description']}")
+
+    if event['node_name'] == 'rag_lookup' and 'sufficiency_verdict' in event['details']:
+        verdict = event['details']['sufficiency_verdict']
+        if verdict == "Sufficient":
+            st.success(f"**RAG Verdict:** {verdict} - Relevant info found in Knowledge Base.")
+        else:
+            st.warning(f"**RAG Verdict:** {verdict} - No sufficient info in Knowledge Base. Diverting to Web Search.")
+
+        if 'retrieved_content_summary' in event['details']:
+            st.markdown(f"**Retrieved Content Summary:** `{event['details']['retrieved_content_summary']}`")
+    elif event['node_name'] == 'web_search' and 'retrieved_content_summary' in event['details']:
+        st.markdown(f"**Web Search Content Summary:** `{event['details']['retrieved_content_summary']}`")
+    elif event['node_name'] == 'router' and 'router_override_reason' in event['details']:
+        st.info(f"**Router Override:** {event['details']['router_override_reason']}")
+        st.json({"initial_decision": event['details']['initial_decision'], "final_decision": event['details']['final_decision']})
+    elif event['details']:
+        st.json(event['details'])
+
+    st.markdown("---")